@@ -0,0 +1,124 @@
+"""
+Accuracy and latency of the quantized classifier against the Keras model.
+
+Replays recorded landmark windows (the classifier inputs of session logs,
+see SessionLog.classifier_windows) through transformer_model.h5 and a TFLite
+export from quantize_classifier.py, one window per call as the engine does.
+Reports how often the top-1 activity agrees, overall and per activity the
+Keras model predicted (activitiesName), and p50/p99 latency per backend.
+Without session logs, --synthetic windows of simulated abduction are used.
+
+    python bench_classifier.py session_logs --tflite transformer_model_int8.tflite
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import engine
+from quantize_classifier import DEFAULT_MODEL, DEFAULT_OUTPUT
+
+
+def recorded_windows(paths, size=16):
+    """Every classifier window of the session logs under ``paths``."""
+    from rescore import find_recordings, is_session_log
+    from session_log import SessionLog
+
+    windows = [
+        SessionLog(path).classifier_windows(size)
+        for path in find_recordings(paths) if is_session_log(path)
+    ]
+    return np.concatenate(windows) if windows else np.empty((0, size, 132), dtype=np.float32)
+
+
+def synthetic_windows(count, size=16, fps=30.0, seed=0):
+    """``count`` sliding windows over a simulated abduction session (synthetic_session.synthetic_landmarks)."""
+    from synthetic_session import synthetic_base, synthetic_landmarks
+
+    rng = np.random.default_rng(seed)
+    base = synthetic_base(rng)
+    rows = np.array([
+        synthetic_landmarks(index, fps, rng, base)[1].ravel() for index in range(count + size - 1)
+    ], dtype=np.float32)
+    return np.ascontiguousarray(np.lib.stride_tricks.sliding_window_view(rows, size, axis=0).transpose(0, 2, 1))
+
+
+def _classify_all(classifier, windows):
+    """Top-1 index and latency in milliseconds of every window, one call each."""
+    labels = np.empty(len(windows), dtype=np.int64)
+    latencies = np.empty(len(windows), dtype=np.float64)
+    for index, window in enumerate(windows):
+        start = time.perf_counter()
+        scores = classifier.predict(window)
+        latencies[index] = (time.perf_counter() - start) * 1000.0
+        labels[index] = np.argmax(scores)
+    return labels, latencies
+
+
+def compare(reference, candidate, windows, classes=None):
+    """
+    Classify every window with both classifiers, one call per window.
+
+    Args:
+        reference: Classifier whose labels count as correct (the Keras model).
+        candidate: Classifier under test.
+        windows (np.ndarray): (N, frames, features) windows.
+        classes (list): Label of each output index (default engine.classifierClasses).
+
+    Returns:
+        dict: Window count, top-1 agreement overall and per reference label,
+        and p50/p99 latency of each backend.
+    """
+    classes = classes or engine.classifierClasses
+    results = {}
+    for classifier in (reference, candidate):
+        classifier.warm_up()
+        results[classifier.backend] = _classify_all(classifier, windows)
+    expected, predicted = results[reference.backend][0], results[candidate.backend][0]
+    agree = expected == predicted
+    per_label = {}
+    for index in np.unique(expected):
+        mask = expected == index
+        per_label[classes[index]] = {"windows": int(mask.sum()), "agreement": float(agree[mask].mean())}
+    latency = {
+        backend: {
+            "p50_ms": float(np.percentile(latencies, 50)) if latencies.size else None,
+            "p99_ms": float(np.percentile(latencies, 99)) if latencies.size else None,
+        }
+        for backend, (_, latencies) in results.items()
+    }
+    return {
+        "windows": int(len(windows)),
+        "agreement": float(agree.mean()) if len(windows) else None,
+        "per_label": per_label,
+        "latency": latency,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("logs", nargs="*", help="Session logs or directories to replay")
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Keras model")
+    parser.add_argument("--tflite", default=DEFAULT_OUTPUT, help="TFLite model to compare")
+    parser.add_argument("--synthetic", type=int, default=2000, help="Simulated windows when no logs are given")
+    parser.add_argument("--threads", type=int, help="TFLite interpreter threads")
+    args = parser.parse_args(argv)
+
+    from activity_model import load_activity_model
+    from inference import CompiledClassifier, TFLiteClassifier
+
+    windows = recorded_windows(args.logs) if args.logs else synthetic_windows(args.synthetic)
+    source = "recorded" if args.logs else "synthetic"
+    print(f"[Benchmark] {len(windows)} {source} windows")
+    reference = CompiledClassifier(load_activity_model(args.model))
+    candidate = TFLiteClassifier(args.tflite, num_threads=args.threads)
+    result = compare(reference, candidate, windows)
+    result.update(source=source, tflite=args.tflite, tflite_kib=os.path.getsize(args.tflite) / 1024)
+    print(json.dumps(result, indent=2))
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Memory benchmark for long engine sessions.
+
+Feeds a synthetic session (arm abduction cycles with idle pauses, at --fps for
+--minutes) through ExerciseCounter and samples traced Python/NumPy memory once
+per simulated minute. Three modes are compared:
+
+    unbounded  every per-frame and per-rep buffer grows for the whole session
+               (the engine's behaviour before bounded histories)
+    bounded    the default ring-buffered motion history and per-rep buffers
+    spill      bounded in memory, with the full motion history spilled to disk
+
+Each mode also reports the time the session-end entropy analytics take when
+requested. Pose estimation is not involved; the classifier is the real model.
+
+    python bench_memory.py --minutes 60 --mode bounded --mode unbounded
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import engine
+from synthetic_session import synthetic_base, synthetic_landmarks
+
+MODES = ("unbounded", "bounded", "spill")
+
+
+def run_session(mode, minutes, fps, classifier_stride, analytics):
+    rng = np.random.default_rng(7)
+    base = synthetic_base(rng)
+    spill_path = None
+    history_limit = engine.MOTION_HISTORY_LIMIT
+    rep_sample_limit = engine.REP_SAMPLE_LIMIT
+    if mode == "unbounded":
+        history_limit = None
+        rep_sample_limit = None
+    elif mode == "spill":
+        spill_path = os.path.join(tempfile.mkdtemp(prefix="rehab_bench_"), "motion_history.f64")
+
+    total_frames = int(minutes * 60 * fps)
+    samples_mb = []
+    tracemalloc.start()
+    try:
+        counter = engine.ExerciseCounter(
+            "standing_shoulder_abduction",
+            classifier_stride=classifier_stride,
+            history_limit=history_limit,
+            history_spill_path=spill_path,
+            rep_sample_limit=rep_sample_limit,
+        )
+        start = time.perf_counter()
+        for frame_index in range(total_frames):
+            image, world = synthetic_landmarks(frame_index, fps, rng, base)
+            counter.process_frame(frame_index / fps, image, world)
+            if frame_index % int(60 * fps) == 0:
+                samples_mb.append(tracemalloc.get_traced_memory()[0] / 1e6)
+        loop_seconds = time.perf_counter() - start
+        samples_mb.append(tracemalloc.get_traced_memory()[0] / 1e6)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+
+        analytics_seconds = None
+        if analytics:
+            start = time.perf_counter()
+            engine.compute_entropy(counter.motion_history_full.to_array(), 200)
+            analytics_seconds = time.perf_counter() - start
+        counter.close()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "mode": mode,
+        "frames": total_frames,
+        "reps": counter.repetition_count,
+        "loop_seconds": loop_seconds,
+        "traced_mb_first_minute": samples_mb[1] if len(samples_mb) > 1 else samples_mb[0],
+        "traced_mb_end": samples_mb[-1],
+        "traced_mb_peak": peak_mb,
+        "growth_mb_after_first_minute": samples_mb[-1] - (samples_mb[1] if len(samples_mb) > 1 else samples_mb[0]),
+        "motion_history_retained": len(counter.motion_history_full.recent()),
+        "analytics_seconds": analytics_seconds,
+        "spill_path": spill_path,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--minutes", type=float, default=60.0, help="Simulated session length")
+    parser.add_argument("--fps", type=float, default=30.0, help="Simulated camera frame rate")
+    parser.add_argument("--classifier-stride", type=int, default=15, help="Run the classifier every N frames")
+    parser.add_argument("--mode", action="append", choices=MODES, help="Mode(s) to run (default: all)")
+    parser.add_argument("--no-analytics", action="store_true", help="Skip timing the session-end entropy")
+    args = parser.parse_args(argv)
+
+    # Load, trace and import everything a session touches once, outside the measurements
+    engine.classifier_loader.get()
+    run_session("bounded", 0.5, args.fps, args.classifier_stride, analytics=True)
+    results = []
+    for mode in args.mode or MODES:
+        print(f"[Benchmark] {mode}: {args.minutes:g} min at {args.fps:g} fps")
+        results.append(run_session(mode, args.minutes, args.fps, args.classifier_stride, not args.no_analytics))
+    print(json.dumps(results, indent=2))
+    return results
+
+
+if __name__ == "__main__":
+    main()
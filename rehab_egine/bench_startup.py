@@ -0,0 +1,90 @@
+"""
+Cold-start benchmark for the rehab engine API.
+
+Each run starts a fresh interpreter and measures how long ``import engine_api``
+takes (the time before the API can answer /health) and, unless --no-model is
+given, how long the classifier then takes to load and warm up. Results are
+printed as JSON; --history appends them to a JSON-lines file so cold-start
+seconds can be tracked across changes.
+
+    python bench_startup.py --runs 5 --history startup_history.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules that should only be imported once a session (or the model loader) needs them
+HEAVY_MODULES = ("tensorflow", "mediapipe", "matplotlib", "pandas", "scipy.signal", "scipy.stats")
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import engine_api
+import_seconds = time.perf_counter() - start
+heavy = [name for name in {heavy!r} if name in sys.modules]
+model_seconds = None
+if {load_model!r}:
+    start = time.perf_counter()
+    engine_api.classifier_loader.start().get()
+    model_seconds = time.perf_counter() - start
+print(json.dumps({{"import_seconds": import_seconds, "model_seconds": model_seconds, "heavy_modules": heavy}}))
+"""
+
+
+def measure_startup(load_model=True):
+    """Run one cold start in a fresh interpreter; returns its timings and the heavy modules it imported."""
+    env = dict(os.environ)
+    env.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    start = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(heavy=HEAVY_MODULES, load_model=load_model)],
+        cwd=ENGINE_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"startup probe failed:\n{completed.stderr}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_seconds"] = time.perf_counter() - start
+    return result
+
+
+def _summarize(values):
+    values = [value for value in values if value is not None]
+    if not values:
+        return None
+    return {"min": min(values), "median": statistics.median(values), "max": max(values)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Number of fresh-interpreter runs")
+    parser.add_argument("--no-model", action="store_true", help="Only measure the import")
+    parser.add_argument("--history", help="Append the summary to this JSON-lines file")
+    args = parser.parse_args(argv)
+
+    runs = [measure_startup(load_model=not args.no_model) for _ in range(args.runs)]
+    summary = {
+        "timestamp": time.time(),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_seconds": _summarize([run["import_seconds"] for run in runs]),
+        "model_seconds": _summarize([run["model_seconds"] for run in runs]),
+        "heavy_modules_at_import": sorted({name for run in runs for name in run["heavy_modules"]}),
+    }
+    print(json.dumps(summary, indent=2))
+    if args.history:
+        with open(args.history, "a") as history:
+            history.write(json.dumps(summary) + "\n")
+    return summary
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import numpy as np
+
+from pose_features import LANDMARK_DIMS
+
+
+class ClassifierSchedule:
+    """
+    Decides when the activity classifier runs, and smooths the label it reports.
+
+    Once the landmark window is full, ``due(row)`` is asked for every new row
+    (one frame with a skeleton). The classifier runs on the first full window,
+    then once ``stride`` rows have arrived since the last run, or earlier when
+    the motion energy moves by more than ``energy_ratio`` from its level at
+    the last run, e.g. when the patient starts or stops moving.
+
+    ``update(scores)`` folds each run into an exponential average of the
+    scores (``smoothing`` is the weight kept from earlier runs) and returns the
+    label index. The label only switches when another class leads it on the
+    smoothed scores by at least ``hysteresis``, so one noisy window does not
+    flip ``current_activity`` between runs.
+
+    The defaults (no energy trigger, smoothing or hysteresis) classify every
+    ``stride`` rows and report the raw argmax.
+
+    Args:
+        stride (int): Rows between scheduled runs.
+        energy_ratio (float | None): Run early when the motion energy changes by
+            this factor since the last run; None disables the trigger.
+        smoothing (float): Weight of the previous smoothed scores, in [0, 1).
+        hysteresis (float): Lead on the smoothed scores needed to switch label.
+        energy_alpha (float): Weight of the newest frame in the motion energy average.
+        energy_floor (float): Energies below this (landmark jitter, m/frame)
+            count as this, so noise at rest does not trigger runs.
+    """
+
+    def __init__(self, stride=1, energy_ratio=None, smoothing=0.0, hysteresis=0.0,
+                 energy_alpha=0.3, energy_floor=0.01):
+        try:
+            self.stride = max(1, int(stride or 1))
+        except (TypeError, ValueError):
+            self.stride = 1
+        self.energy_ratio = energy_ratio
+        self.smoothing = min(max(float(smoothing or 0.0), 0.0), 0.99)
+        self.hysteresis = max(float(hysteresis or 0.0), 0.0)
+        self.energy_alpha = energy_alpha
+        self.energy_floor = energy_floor
+        self.runs = 0
+        self.early_runs = 0
+        self.skipped = 0
+        self.reset()
+
+    def reset(self):
+        self.energy = None
+        self._energy_at_run = None
+        self._previous_row = None
+        self._since_run = None
+        self.smoothed_scores = None
+        self.label = None
+
+    def settings(self):
+        """Constructor arguments, e.g. to build the same schedule in another process."""
+        return {
+            "stride": self.stride,
+            "energy_ratio": self.energy_ratio,
+            "smoothing": self.smoothing,
+            "hysteresis": self.hysteresis,
+            "energy_alpha": self.energy_alpha,
+            "energy_floor": self.energy_floor,
+        }
+
+    def observe(self, row):
+        """Update the motion energy (fastest landmark's speed per row, averaged) with one landmark row."""
+        if row is None:
+            self._previous_row = None
+            return
+        points = np.asarray(row, dtype=np.float32).reshape(-1, LANDMARK_DIMS)[:, :3]
+        if self._previous_row is not None:
+            # Speed of the fastest landmark: one moving limb is not averaged away by the still ones
+            speed = float(np.max(np.sqrt(np.sum((points - self._previous_row) ** 2, axis=1))))
+            if np.isfinite(speed):
+                if self.energy is None:
+                    self.energy = speed
+                else:
+                    self.energy += self.energy_alpha * (speed - self.energy)
+        self._previous_row = points
+
+    def due(self, row):
+        """Record one new row of the full window; returns True if the classifier should run now."""
+        if self.energy_ratio is not None:
+            self.observe(row)
+        if self._since_run is None or self._since_run + 1 >= self.stride:
+            run = True
+        elif self._energy_changed():
+            run = True
+            self.early_runs += 1
+        else:
+            run = False
+        if run:
+            self._since_run = 0
+            self._energy_at_run = self.energy
+            self.runs += 1
+        else:
+            self._since_run += 1
+            self.skipped += 1
+        return run
+
+    def _energy_changed(self):
+        if self.energy_ratio is None or self.energy is None:
+            return False
+        current = max(self.energy, self.energy_floor)
+        # No energy measured yet at the last run counts as rest
+        reference = max(self._energy_at_run or 0.0, self.energy_floor)
+        return max(current, reference) / min(current, reference) >= self.energy_ratio
+
+    def update(self, scores):
+        """Fold one classifier output into the smoothed scores; returns the label index."""
+        scores = np.asarray(scores, dtype=np.float64)
+        if self.smoothed_scores is None or self.smoothing == 0.0:
+            self.smoothed_scores = scores.copy()
+        else:
+            self.smoothed_scores *= self.smoothing
+            self.smoothed_scores += (1.0 - self.smoothing) * scores
+        candidate = int(np.argmax(self.smoothed_scores))
+        if (
+            self.label is None
+            or self.smoothed_scores[candidate] >= self.smoothed_scores[self.label] + self.hysteresis
+        ):
+            self.label = candidate
+        return self.label
+
+    @property
+    def confidence(self):
+        """Smoothed score of the current label."""
+        if self.label is None:
+            return None
+        return float(self.smoothed_scores[self.label])
+
+    def stats(self):
+        return {"runs": self.runs, "early_runs": self.early_runs, "skipped": self.skipped}
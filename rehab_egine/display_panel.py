@@ -0,0 +1,118 @@
+import textwrap
+
+import cv2
+import numpy as np
+
+PANEL_BACKGROUND = (18, 25, 55)
+CARD_BORDER = (0, 0, 255)
+CARD_TITLE = (220, 220, 220)
+CARD_MARGIN_X = 15
+CARD_HEIGHT = 80
+DETECTION_CARD_HEIGHT = 120
+CARD_SPACING = 15
+FIRST_CARD_Y = 30
+
+FOOTER_TEXT = "Press 'Q' to pause and save progress"
+
+DETECTION_OK = "Ensure 1m-2m distance from camera. Skeleton detected. Keep position steady."
+DETECTION_MISSING = "Ensure 1m-2m distance from camera. Please ensure your skeleton is fully visible."
+
+
+class InfoPanelRenderer:
+    """
+    Draws the camera frame with the right-side info panel and footer into one reused buffer.
+
+    The card borders, titles, fixed values (exercise name, time limit) and the
+    footer are rasterized once. Each frame only the camera image is copied in;
+    a card is redrawn only when its text changes (reps on a new rep, the timer
+    once per second, the detection message when tracking is gained or lost).
+
+    ``render`` returns the internal output buffer, which is overwritten by the
+    next call; copy it if it must outlive that.
+    """
+
+    def __init__(self, activity, target_value, duration_minutes, width=520, height=600, panel_width=260):
+        self.width = width
+        self.height = height
+        self.panel_width = panel_width
+        self.target_value = target_value
+
+        self._output = np.empty((height, width + panel_width, 3), dtype=np.uint8)
+        self._resized = np.empty((height, width, 3), dtype=np.uint8)
+        self._panel = self._output[:, width:]
+        self._base_panel = np.full((height, panel_width, 3), PANEL_BACKGROUND, dtype=np.uint8)
+
+        pretty_activity = activity.replace('_', ' ').title() if activity else "Unknown"
+        card_width = panel_width - 2 * CARD_MARGIN_X
+        self._cards = {}
+        card_y = FIRST_CARD_Y
+        for title in ("Exercise", "Reps", "Time", "Time Limit", "Detection"):
+            current_height = DETECTION_CARD_HEIGHT if title == "Detection" else CARD_HEIGHT
+            y1, y2 = card_y, card_y + current_height
+            self._cards[title] = (y1, y2)
+            cv2.rectangle(self._base_panel, (CARD_MARGIN_X, y1), (CARD_MARGIN_X + card_width, y2), CARD_BORDER, 2)
+            cv2.putText(self._base_panel, title, (CARD_MARGIN_X + 10, y1 + 25),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, CARD_TITLE, 1, cv2.LINE_AA)
+            card_y = y2 + CARD_SPACING
+
+        # Values that never change during a session live in the base panel
+        self._draw_value(self._base_panel, "Exercise", pretty_activity, (255, 255, 255))
+        self._draw_value(self._base_panel, "Time Limit", f"{duration_minutes} minutes", (255, 165, 0))
+        self._panel[:] = self._base_panel
+        self._drawn = {}
+
+        self._footer_box, self._footer = self._render_footer()
+
+    def _draw_value(self, panel, title, value, color):
+        y1, _ = self._cards[title]
+        is_detection = title == "Detection"
+        wrap_width = 26 if is_detection else 18
+        max_lines = 3 if is_detection else 2
+        font_scale = 0.45 if is_detection else 0.55
+        line_spacing = 16 if is_detection else 18
+        wrapped_lines = textwrap.wrap(value, width=wrap_width) or [value]
+        for idx, line in enumerate(wrapped_lines[:max_lines]):
+            cv2.putText(panel, line, (CARD_MARGIN_X + 10, y1 + 55 + idx * line_spacing),
+                        cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, 1, cv2.LINE_AA)
+
+    def _render_footer(self):
+        """Rasterize the footer once; it is an opaque box, so a plain copy restores it."""
+        canvas = np.zeros_like(self._output)
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        font_scale = 0.55
+        thickness = 1
+        text_size, _ = cv2.getTextSize(FOOTER_TEXT, font, font_scale, thickness)
+        text_x = canvas.shape[1] - text_size[0] - 20
+        text_y = canvas.shape[0] - 15
+        top_left = (text_x - 8, text_y - text_size[1] - 6)
+        bottom_right = (canvas.shape[1] - 10, text_y + 6)
+        cv2.rectangle(canvas, top_left, bottom_right, (0, 0, 0), -1)
+        cv2.putText(canvas, FOOTER_TEXT, (text_x, text_y), font, font_scale, (255, 255, 255), thickness, cv2.LINE_AA)
+        box = (slice(top_left[1], bottom_right[1] + 1), slice(top_left[0], bottom_right[0] + 1))
+        return box, canvas[box].copy()
+
+    def _update_card(self, title, value, color):
+        if self._drawn.get(title) == (value, color):
+            return
+        y1, y2 = self._cards[title]
+        rows = slice(y1, y2 + 1)
+        self._panel[rows] = self._base_panel[rows]
+        self._draw_value(self._panel, title, value, color)
+        self._drawn[title] = (value, color)
+
+    def render(self, frame, repetition_count, elapsed_time, skeleton_detected):
+        """Composite ``frame`` and the current session values; returns the shared output buffer."""
+        cv2.resize(frame, (self.width, self.height), dst=self._resized)
+        self._output[:, :self.width] = self._resized
+
+        elapsed_seconds = int(elapsed_time)
+        reps_display = f"{repetition_count}/{self.target_value}" if self.target_value else str(repetition_count)
+        self._update_card("Reps", reps_display, (0, 255, 0))
+        self._update_card("Time", f"{elapsed_seconds // 60:02}:{elapsed_seconds % 60:02}", (0, 255, 255))
+        if skeleton_detected:
+            self._update_card("Detection", DETECTION_OK, (0, 255, 0))
+        else:
+            self._update_card("Detection", DETECTION_MISSING, (0, 0, 255))
+
+        self._output[self._footer_box] = self._footer
+        return self._output
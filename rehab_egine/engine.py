@@ -1,33 +1,74 @@
 
 import cv2
-import mediapipe as mp
+import functools
+import queue
 import numpy as np
 from collections import deque
-import glob
+from concurrent.futures import Future
 import os
-import matplotlib.pyplot as plt
-from scipy.signal import find_peaks
-from tensorflow import keras
-import pandas as pd
-from scipy import stats as st
-import statistics
 import time
-import textwrap
-         
-from scipy.stats import differential_entropy
-from scipy.spatial.distance import cdist
-import pandas as pd
-import pickle
-from tensorflow.keras.models import load_model
+import threading
+
+from display_panel import InfoPanelRenderer
+from classifier_schedule import ClassifierSchedule
+from engine_worker import BackgroundLoader
+from frame_transport import InferenceProcess
+from keras_compat import use_legacy_keras
+from lazy_import import LazyModule
+from metrics import stage_metrics
+from motion_signal import (
+    AutocorrelationRepCounter,
+    OnlineRepDetector,
+    RollingMoments,
+    SignalHistory,
+)
+from pipeline import END, FramePipeline
+from pose_quality import (
+    DEFAULT_QUALITY_LEVEL,
+    QUALITY_LEVELS,
+    AdaptivePoseEstimator,
+    PoseQualityController,
+    available_quality_levels,
+)
+from pose_features import (
+    LEFT_SHOULDER,
+    LEFT_SHOULDER_ANGLE,
+    RIGHT_ELBOW,
+    RIGHT_ELBOW_ANGLE,
+    RIGHT_SHOULDER,
+    RIGHT_SHOULDER_ANGLE,
+    RIGHT_WRIST,
+    LandmarkWindow,
+    joint_angles,
+    landmark_motion,
+    pose_results_to_arrays,
+)
+from session_log import SessionLog, SessionLogWriter
+from video_recorder import VideoRecorder
+
+# MediaPipe imports TensorFlow; defer both until a session first needs pose estimation,
+# and pick the Keras the classifier was saved with before either loads
+use_legacy_keras()
+mp = LazyModule("mediapipe")
+landmark_pb2 = LazyModule("mediapipe.framework.formats.landmark_pb2")
 
 counting_results = []  
  
 desired_activity = 'standing_shoulder_internal_external_rotation'
 
 
-headers = ['0_x', '0_y', '0_z', '0_vis', '1_x', '1_y', '1_z', '1_vis', '2_x', '2_y', '2_z', '2_vis', '3_x', '3_y', '3_z', '3_vis', '4_x', '4_y', '4_z', '4_vis', '5_x', '5_y', '5_z', '5_vis', '6_x', '6_y', '6_z', '6_vis', '7_x', '7_y', '7_z', '7_vis', '8_x', '8_y', '8_z', '8_vis', '9_x', '9_y', '9_z', '9_vis', '10_x', '10_y', '10_z', '10_vis', '11_x', '11_y', '11_z', '11_vis', '12_x', '12_y', '12_z','12_vis','13_x', '13_y', '13_z', '13_vis', '14_x', '14_y', '14_z', '14_vis', '15_x', '15_y', '15_z', '15_vis', '16_x', '16_y', '16_z', '16_vis', '17_x', '17_y', '17_z', '17_vis', '18_x', '18_y', '18_z', '18_vis', '19_x', '19_y', '19_z', '19_vis', '20_x', '20_y', '20_z', '20_vis', '21_x', '21_y', '21_z', '21_vis', '22_x', '22_y', '22_z', '22_vis', '23_x', '23_y', '23_z', '23_vis', '24_x', '24_y', '24_z', '24_vis', '25_x', '25_y', '25_z', '25_vis', '26_x', '26_y', '26_z', '26_vis', '27_x', '27_y', '27_z', '27_vis', '28_x', '28_y', '28_z', '28_vis', '29_x', '29_y', '29_z', '29_vis', '30_x', '30_y', '30_z', '30_vis', '31_x', '31_y', '31_z', '31_vis', '32_x', '32_y', '32_z', '32_vis']
-
 save_video = False  # Disable video recording by default
+# "composite" records the frame as shown on screen; "raw" records the camera frame plus a landmark sidecar
+save_video_mode = "composite"
+# Write every session's landmarks and classifier scores to a replayable log (see replay_session_log)
+save_session_log = False
+
+# Per-frame motion history kept for session-end analytics (~5 minutes at 30 fps); None keeps the whole session
+MOTION_HISTORY_LIMIT = 9000
+# Per-rep sample buffers keep at most the last minute at 30 fps, so a long pause cannot grow them without bound
+REP_SAMPLE_LIMIT = 1800
+# Frames queued for the inference process (process_video(inference_process=True)) before capture waits
+INFERENCE_QUEUE_DEPTH = 2
 
 activitiesName = ['hurdle_step', 'idle', 'inline_lunge', 'jump', 'run' ,'side_lunge',
 'sit_to_stand' ,'squats', 'standing_shoulder_abduction',
@@ -36,25 +77,15 @@ activitiesName = ['hurdle_step', 'idle', 'inline_lunge', 'jump', 'run' ,'side_lu
 'standing_shoulder_scapation',
 'custom_elbow_flexion',
 'standing_shoulder_external_rotation_custom']
+# Labels the transformer predicts, in output order; the remaining activities use custom detectors
+classifierClasses = activitiesName[:12]
 
 
-def calculate_angle(a, b, c):
-    """Return angle ABC in degrees using normalized landmark coordinates."""
-    a_vec = np.array([a.x, a.y, a.z])
-    b_vec = np.array([b.x, b.y, b.z])
-    c_vec = np.array([c.x, c.y, c.z])
-
-    ba = a_vec - b_vec
-    bc = c_vec - b_vec
-
-    ba_norm = np.linalg.norm(ba)
-    bc_norm = np.linalg.norm(bc)
-    if ba_norm == 0 or bc_norm == 0:
-        return 0.0
-
-    cos_angle = np.dot(ba, bc) / (ba_norm * bc_norm)
-    cos_angle = np.clip(cos_angle, -1.0, 1.0)
-    return np.degrees(np.arccos(cos_angle))
+# Per-frame ROM angle of the transformer-counted exercises: the largest of these joint_angles entries
+ROM_JOINT_ANGLES = {
+    'standing_shoulder_abduction': (LEFT_SHOULDER_ANGLE, RIGHT_SHOULDER_ANGLE),
+    'standing_shoulder_extension': (RIGHT_SHOULDER_ANGLE,),
+}
 
 
 def calculate_sparc(signal_values, sample_rate=30.0, freq_min=0.1, freq_max=10.0):
@@ -100,7 +131,7 @@ def calculate_sparc(signal_values, sample_rate=30.0, freq_min=0.1, freq_max=10.0
 class ElbowFlexionDetector:
     """Detector for elbow flexion (arm starts down, curls up toward shoulder)."""
 
-    def __init__(self):
+    def __init__(self, rep_sample_limit=REP_SAMPLE_LIMIT):
         self.stage = 'down'  # down = arm extended, up = flexed
         self.flex_threshold = 130  # degrees or less counts as flexed
         self.extend_threshold = 135  # must straighten beyond 135° to reset
@@ -109,12 +140,12 @@ class ElbowFlexionDetector:
         self.max_elbow_shoulder_height_delta = 0.32
         self.max_elbow_shoulder_x_delta = 0.12
         self.last_debug_print = 0
-        self.current_rep_angles = []
+        self.current_rep_angles = deque(maxlen=rep_sample_limit)
 
     def reset(self):
         self.stage = 'down'
         self.last_debug_print = 0
-        self.current_rep_angles = []
+        self.current_rep_angles.clear()
 
     def _log_debug(self, message):
         now = time.time()
@@ -122,30 +153,31 @@ class ElbowFlexionDetector:
             print(f"[ElbowFlexionDetector] {message}")
             self.last_debug_print = now
 
-    def update(self, landmarks):
+    def update(self, landmarks, angles=None):
+        """Advance with one frame's (33, 4) landmarks; ``angles`` are its ``joint_angles`` if already computed."""
         try:
-            shoulder = landmarks[mp.solutions.pose.PoseLandmark.RIGHT_SHOULDER.value]
-            elbow = landmarks[mp.solutions.pose.PoseLandmark.RIGHT_ELBOW.value]
-            wrist = landmarks[mp.solutions.pose.PoseLandmark.RIGHT_WRIST.value]
+            shoulder = landmarks[RIGHT_SHOULDER]
+            elbow = landmarks[RIGHT_ELBOW]
+            wrist = landmarks[RIGHT_WRIST]
         except (IndexError, AttributeError):
             return False, None
 
-        upper_arm_height_delta = abs(elbow.y - shoulder.y)
+        upper_arm_height_delta = abs(elbow[1] - shoulder[1])
         if upper_arm_height_delta > self.max_elbow_shoulder_height_delta:
             self._log_debug(
                 f"Upper arm vertical drift Δ={upper_arm_height_delta:.3f}. Keep upper arm fixed."
             )
             return False
 
-        upper_arm_horizontal_delta = abs(elbow.x - shoulder.x)
+        upper_arm_horizontal_delta = abs(elbow[0] - shoulder[0])
         if upper_arm_horizontal_delta > self.max_elbow_shoulder_x_delta:
             self._log_debug(
                 f"Upper arm horizontal drift Δ={upper_arm_horizontal_delta:.3f}. Keep elbow near torso."
             )
             return False
 
-        elbow_angle = calculate_angle(shoulder, elbow, wrist)
-        wrist_relative = wrist.y - shoulder.y  # smaller (negative) = wrist higher
+        elbow_angle = (joint_angles(landmarks) if angles is None else angles)[RIGHT_ELBOW_ANGLE]
+        wrist_relative = wrist[1] - shoulder[1]  # smaller (negative) = wrist higher
         self.current_rep_angles.append(elbow_angle)
 
         self._log_debug(
@@ -160,14 +192,14 @@ class ElbowFlexionDetector:
             self.stage = 'up'
             print(f"[ElbowFlexionDetector] ✅ Rep counted (angle={elbow_angle:.1f}°)")
             angles_snapshot = self.current_rep_angles.copy()
-            self.current_rep_angles = []
+            self.current_rep_angles.clear()
             return True, angles_snapshot
 
         # Reset when arm extends or wrist drops sufficiently
         if self.stage == 'up':
             if elbow_angle >= self.extend_threshold or wrist_relative >= self.reset_wrist_threshold:
                 self.stage = 'down'
-                self.current_rep_angles = []
+                self.current_rep_angles.clear()
 
         return False, None
 
@@ -175,7 +207,7 @@ class ElbowFlexionDetector:
 class ShoulderExternalRotationDetector:
     """Detector for standing shoulder external rotation with elbow fixed by the torso."""
 
-    def __init__(self):
+    def __init__(self, rep_sample_limit=REP_SAMPLE_LIMIT):
         self.stage = 'front'  # front = forearm points forward, out = rotated outward
         self.out_threshold = -0.10  # wrist must move at least 10% screen width outward (mirrored axis)
         self.reset_threshold = -0.02  # must return close to front before counting again
@@ -187,13 +219,13 @@ class ShoulderExternalRotationDetector:
         self.max_shoulder_span = 0.0
         self.shoulder_span_ratio = 0.7  # current span must be >= 70% of best span
         self.last_debug_print = 0
-        self.current_rep_angles = []
+        self.current_rep_angles = deque(maxlen=rep_sample_limit)
 
     def reset(self):
         self.stage = 'front'
         self.max_shoulder_span = 0.0
         self.last_debug_print = 0
-        self.current_rep_angles = []
+        self.current_rep_angles.clear()
 
     def _log_debug(self, message):
         now = time.time()
@@ -201,30 +233,31 @@ class ShoulderExternalRotationDetector:
             print(f"[ShoulderExternalRotation] {message}")
             self.last_debug_print = now
 
-    def update(self, landmarks):
+    def update(self, landmarks, angles=None):
+        """Advance with one frame's (33, 4) landmarks; ``angles`` are its ``joint_angles`` if already computed."""
         try:
-            shoulder = landmarks[mp.solutions.pose.PoseLandmark.RIGHT_SHOULDER.value]
-            elbow = landmarks[mp.solutions.pose.PoseLandmark.RIGHT_ELBOW.value]
-            wrist = landmarks[mp.solutions.pose.PoseLandmark.RIGHT_WRIST.value]
+            shoulder = landmarks[RIGHT_SHOULDER]
+            elbow = landmarks[RIGHT_ELBOW]
+            wrist = landmarks[RIGHT_WRIST]
         except (IndexError, AttributeError):
             return False, None
 
-        height_delta = abs(shoulder.y - elbow.y)
+        height_delta = abs(shoulder[1] - elbow[1])
         if height_delta > self.max_elbow_shoulder_delta:
             self._log_debug(f"Elbow height mismatch (Δ={height_delta:.3f}). Keep elbow near torso.")
             return False
 
-        torso_delta = abs(shoulder.x - elbow.x)
+        torso_delta = abs(shoulder[0] - elbow[0])
         if torso_delta > self.max_elbow_from_torso:
             self._log_debug(f"Elbow drift detected (Δx={torso_delta:.3f}). Keep elbow against torso.")
             return False
 
-        left_shoulder = landmarks[mp.solutions.pose.PoseLandmark.LEFT_SHOULDER.value]
-        if min(shoulder.visibility or 0, left_shoulder.visibility or 0) < self.min_shoulder_visibility:
+        left_shoulder = landmarks[LEFT_SHOULDER]
+        if min(shoulder[3], left_shoulder[3]) < self.min_shoulder_visibility:
             self._log_debug("Shoulders not visible enough. Ensure camera can see both shoulders.")
             return False
 
-        shoulder_span = abs(left_shoulder.x - shoulder.x)
+        shoulder_span = abs(left_shoulder[0] - shoulder[0])
         if shoulder_span > self.max_shoulder_span:
             self.max_shoulder_span = shoulder_span
         if self.max_shoulder_span > 0 and shoulder_span < self.max_shoulder_span * self.shoulder_span_ratio:
@@ -234,54 +267,36 @@ class ShoulderExternalRotationDetector:
             )
             return False
 
-        shoulders_y_delta = abs(left_shoulder.y - shoulder.y)
+        shoulders_y_delta = abs(left_shoulder[1] - shoulder[1])
         if shoulders_y_delta > self.max_shoulders_y_delta:
             self._log_debug(f"Shoulders not level (Δ={shoulders_y_delta:.3f}). Keep shoulders balanced.")
             return False
 
         # Monitored but not blocking (for debugging info only)
-        right_shoulder_vec = np.array([shoulder.x, shoulder.y]) - np.array([elbow.x, elbow.y])
-        left_shoulder_vec = np.array([left_shoulder.x, left_shoulder.y]) - np.array([elbow.x, elbow.y])
+        right_shoulder_vec = shoulder[:2] - elbow[:2]
+        left_shoulder_vec = left_shoulder[:2] - elbow[:2]
         torso_rotation = abs(np.degrees(np.arctan2(right_shoulder_vec[1], right_shoulder_vec[0]) -
                                         np.arctan2(left_shoulder_vec[1], left_shoulder_vec[0])))
         self._log_debug(f"Torso rotation (info only): Δ={torso_rotation:.3f}")
-        wrist_dx = wrist.x - elbow.x  # negative values indicate outward movement with mirrored camera
+        wrist_dx = wrist[0] - elbow[0]  # negative values indicate outward movement with mirrored camera
         self._log_debug(f"Wrist Δx={wrist_dx:.3f}, stage={self.stage}")
-        rotation_angle = calculate_angle(shoulder, elbow, wrist)
+        rotation_angle = (joint_angles(landmarks) if angles is None else angles)[RIGHT_ELBOW_ANGLE]
         self.current_rep_angles.append(rotation_angle)
 
         if self.stage == 'front' and wrist_dx <= self.out_threshold:
             self.stage = 'out'
             print(f"[ShoulderExternalRotation] ✅ Rep counted (Δx={wrist_dx:.3f})")
             angles_snapshot = self.current_rep_angles.copy()
-            self.current_rep_angles = []
+            self.current_rep_angles.clear()
             return True, angles_snapshot
 
         if self.stage == 'out' and wrist_dx >= self.reset_threshold:
             self.stage = 'front'
-            self.current_rep_angles = []
+            self.current_rep_angles.clear()
             self._log_debug("Reset to front position.")
 
         return False, None
 
-def draw_tips_box(frame, text, position=(10, 40), box_color=(0, 0, 0), text_color=(255, 255, 255)):
-    font = cv2.FONT_HERSHEY_SIMPLEX
-    font_scale = 0.6
-    thickness = 1
-    padding = 10
-    text_size, _ = cv2.getTextSize(text, font, font_scale, thickness)
-    x, y = position
-
-    cv2.rectangle(
-        frame,
-        (x - padding, y - text_size[1] - padding),
-        (x + text_size[0] + padding, y + padding // 2),
-        box_color,
-        -1
-    )
-    cv2.putText(frame, text, (x, y), font, font_scale, text_color, thickness, cv2.LINE_AA)
-
-
 
 # Model path - 模型文件路径
 save_model_path = os.path.dirname(os.path.abspath(__file__))  # 使用当前代码文件所在目录
@@ -290,93 +305,75 @@ save_model_path = os.path.dirname(os.path.abspath(__file__))  # 使用当前代
 # Define the codec and create VideoWriter object
 # Output video path - 输出视频保存路径（如果save_video=True）
 output_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "output_videos")  # 在当前目录下创建output_videos文件夹
-if not os.path.exists(output_path):
-    os.makedirs(output_path)
-
+# Session logs go here when save_session_log is on and no path is given
+session_log_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "session_logs")
 
 
-from tensorflow.keras.layers import Layer, Dense, Dropout, LayerNormalization, MultiHeadAttention
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.utils import register_keras_serializable
+# Classifier backend: "keras" runs transformer_model.h5, "tflite" the quantized
+# export written by quantize_classifier.py. Read from the environment so the
+# inference process and rescore workers pick up the same choice.
+classifier_backend = os.environ.get("REHAB_CLASSIFIER_BACKEND", "keras")
+quantized_model_path = os.path.join(save_model_path, 'transformer_model_int8.tflite')
 
 
-try:
-    TransformerBlock
-except NameError:
+def load_classifier():
+    """Load the activity classifier for ``classifier_backend`` and warm it up (imports TensorFlow)."""
+    if classifier_backend == "tflite":
+        from inference import TFLiteClassifier
 
-    @register_keras_serializable()
-    class TransformerBlock(Layer):
-        def __init__(self, embed_dim, num_heads, ff_dim, rate=0.1, **kwargs):
-            super(TransformerBlock, self).__init__(**kwargs)
-            self.embed_dim = embed_dim
-            self.num_heads = num_heads
-            self.ff_dim = ff_dim
-            self.rate = rate
-    
-            self.att = MultiHeadAttention(num_heads=num_heads, key_dim=embed_dim)
-            self.ffn = Sequential([
-                Dense(ff_dim, activation="relu"),
-                Dense(embed_dim),
-            ])
-            self.layernorm1 = LayerNormalization(epsilon=1e-6)
-            self.layernorm2 = LayerNormalization(epsilon=1e-6)
-            self.dropout1 = Dropout(rate)
-            self.dropout2 = Dropout(rate)
-    
-        def call(self, inputs, training):
-            attn_output = self.att(inputs, inputs)
-            attn_output = self.dropout1(attn_output, training=training)
-            out1 = self.layernorm1(inputs + attn_output)
-            ffn_output = self.ffn(out1)
-            ffn_output = self.dropout2(ffn_output, training=training)
-            return self.layernorm2(out1 + ffn_output)
-    
-        def get_config(self):
-            config = super().get_config()
-            config.update({
-                "embed_dim": self.embed_dim,
-                "num_heads": self.num_heads,
-                "ff_dim": self.ff_dim,
-                "rate": self.rate,
-            })
-            return config
+        if not os.path.exists(quantized_model_path):
+            raise FileNotFoundError(
+                f"{quantized_model_path} not found; export it with quantize_classifier.py"
+            )
+        classifier = TFLiteClassifier(quantized_model_path, frames=16, features=132)
+    elif classifier_backend == "keras":
+        from activity_model import load_activity_model
+        from inference import CompiledClassifier
 
+        model = load_activity_model(os.path.join(save_model_path, 'transformer_model.h5'))
+        classifier = CompiledClassifier(model, frames=16, features=132)
+    else:
+        raise ValueError(f"Unknown classifier backend: {classifier_backend}")
+    classifier.warm_up()
+    print(f"[Classifier] Using the {classifier.backend} backend")
+    return classifier
 
 
+# Loaded on first use, or ahead of time with classifier_loader.start()
+classifier_loader = BackgroundLoader(load_classifier, name="classifier")
 
-myModel = load_model(save_model_path + '/transformer_model.h5',
-                   custom_objects={'TransformerBlock': TransformerBlock})
+# Classifier schedule that trades classifier runs for CPU: a run every 8th window,
+# early ones when the motion energy changes, and a smoothed label that needs a
+# clear lead to switch (see ClassifierSchedule)
+ADAPTIVE_CLASSIFIER_SCHEDULE = {"stride": 8, "energy_ratio": 1.8, "smoothing": 0.5, "hysteresis": 0.1}
 
 
 
 # 🔹 Function to compute entropy over sliding windows
-def compute_entropy(signal, window_size=50):
-    entropy_values = []
-    for i in range(len(signal) - window_size):
-        window = signal[i:i + window_size]
-        entropy_values.append(differential_entropy(window))
-    return np.array(entropy_values)
+def compute_entropy(signal, window_size=50, chunk_size=1024):
+    """
+    Differential entropy of each ``window_size`` window of ``signal``, as
+    ``[differential_entropy(signal[i:i + window_size]) for i in range(len(signal) - window_size)]``.
 
+    Windows are strided views scored ``chunk_size`` at a time along one axis,
+    so memory stays at one chunk of windows however long the signal is.
+    """
+    from scipy.stats import differential_entropy
+
+    signal = np.asarray(signal, dtype=np.float64)
+    window_count = len(signal) - window_size
+    if window_count <= 0:
+        return np.array([])
+    windows = np.lib.stride_tricks.sliding_window_view(signal, window_size)[:window_count]
+    return np.concatenate([
+        differential_entropy(windows[start:start + chunk_size], axis=-1)
+        for start in range(0, window_count, chunk_size)
+    ])
 
 
 
 
-def pearson_autocorrelation(signal):
-    N = len(signal)
-    mean_signal = np.mean(signal)
-    autocorr = []
 
-    for lag in range(N):
-        # Pearson correlation formula
-        numerator = np.sum((signal[:N-lag] - mean_signal) * (signal[lag:] - mean_signal))
-        denominator = np.sqrt(np.sum((signal[:N-lag] - mean_signal)**2)) * np.sqrt(np.sum((signal[lag:] - mean_signal)**2))
-        
-        if denominator == 0:
-            autocorr.append(0)
-        else:
-            autocorr.append(numerator / denominator)
-    
-    return np.array(autocorr)
 
 
 
@@ -387,748 +384,962 @@ desired_height = 600  # Set your desired height
 info_panel_width = 260  # Width of the right-side info panel
 
 
+class ExerciseCounter:
+    """
+    Repetition counting state for one exercise session.
 
+    Holds the classifier window, motion signal, peak bookkeeping, custom
+    detectors and per-rep SPARC/ROM buffers, so the same counting logic can be
+    fed from the webcam loop, a recorded video or precomputed landmarks.
 
-def ResizeWithAspectRatio(image, desiredFrameWidth, inter=cv2.INTER_AREA):
-    (h, w) = image.shape[:2]
-
-    # Compute the scaling factor based on desired width
-    r = desiredFrameWidth / float(w)
-    desired_width = desiredFrameWidth
-    desired_height = int(h * r)
-
-    dim = (desired_width, desired_height)
-
-    return cv2.resize(image, dim, interpolation=inter)
-
-
+    ``on_event(kind, data)`` is called as things happen: "rep" after each counted
+    repetition and "classification" when the classifier label changes (and
+    periodically while it holds). It runs on the counting thread, so it must not block.
 
-def get_direction(idx, x_projection, y_projection, projection_45, neg45_projection):
-    
-    direction = +1
-    
-    if idx == 0: # Movement along x-axis
-    
-        if x_projection > 0:
-            direction = +1
-            
-        else: 
-            direction = -1
-            
-        # print("Along x ", " ", direction)    
-            
-        
-    elif idx == 1: # Movement along y-axis
-            
-        if y_projection > 0:
-            direction = +1
-            
-        else: 
-            direction = -1
-            
-        # print("Along y ", " ", direction)   
-    
-    
-    elif idx == 2: # Movement along line y = x
-            
-        if projection_45 > 0:
-            direction = +1
-            
-        else: 
-            direction = -1
-            
-        # print("Along 45 ", " ", direction)   
-    
-    
-    else: 
-            
-        if neg45_projection > 0:
-            direction = +1
-            
-        else: 
-            direction = -1
-            
-        # print("Along neg45 ", " ", direction)   
-        
-    return direction
+    Memory stays bounded on long sessions: ``motion_history_full`` keeps the last
+    ``history_limit`` samples (None keeps all), optionally spilling every sample
+    to ``history_spill_path`` on disk; per-rep buffers keep the last
+    ``rep_sample_limit`` samples (None keeps all).
 
+    ``predict(window)`` replaces the shared classifier, e.g. to replay the
+    scores stored in a session log; it may return None when it has no scores,
+    which keeps the current label. ``class_scores`` holds the latest scores.
 
-    
-def process_video(activity=None, stop_event=None, target_reps=None, initial_reps=0, duration_minutes=1):
+    When the classifier runs and how its label is smoothed is decided by a
+    ClassifierSchedule built from ``classifier_stride`` and the optional
+    ``classifier_schedule`` settings (e.g. ADAPTIVE_CLASSIFIER_SCHEDULE).
     """
-    Run real-time action recognition and counting.
 
-    Args:
-        activity (str | None): Desired activity to recognize.
-        stop_event (threading.Event | None): Optional event to signal graceful stop.
-        target_reps (int | None): Optional reps target. When provided the loop stops
-            automatically once the target is reached.
-        initial_reps (int): Initial repetition count (for resuming).
-        duration_minutes (int): Maximum time to complete the exercise in minutes.
+    # Re-publish an unchanged classifier label every N predictions
+    classification_event_interval = 15
 
-    Returns:
-        dict: Session summary including repetition count and stop metadata.
-    """
-    global desired_activity
+    def __init__(self, activity, target_reps=None, initial_reps=0, classifier_stride=1, on_event=None,
+                 rep_detector="autocorrelation", history_limit=MOTION_HISTORY_LIMIT, history_spill_path=None, predict=None,
+                 classifier_schedule=None, rep_sample_limit=REP_SAMPLE_LIMIT):
+        self.activity = activity
+        self.on_event = on_event
+        self.predict = predict
+        self.class_scores = None
 
-    if activity:
-        desired_activity = activity
-    
-    # Initialize MediaPipe Pose
-    mp_pose = mp.solutions.pose
-    pose = mp_pose.Pose()
-    
-    mpDrawing = mp.solutions.drawing_utils  # Setup mediapipe
-    
-    cap = cv2.VideoCapture(0)
-    window_name = "3D Motion Tracking with Repetition Counting"
-    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
-    try:
-        cv2.setWindowProperty(window_name, cv2.WND_PROP_TOPMOST, 1)
-    except Exception:
-        pass
- 
-    TotalFramesInVideo = int(cap. get(cv2. CAP_PROP_FRAME_COUNT))
-    print("The length of the cap is ", TotalFramesInVideo)
-    
-    try:
-        repetition_count = max(0, int(initial_reps or 0))
-    except (TypeError, ValueError):
-        repetition_count = 0
-        
-    target_value = None
-    if target_reps is not None:
         try:
-            candidate = int(target_reps)
-            if candidate > 0:
-                target_value = candidate
+            self.repetition_count = max(0, int(initial_reps or 0))
         except (TypeError, ValueError):
-            target_value = None
+            self.repetition_count = 0
+
+        self.target_value = None
+        if target_reps is not None:
+            try:
+                candidate = int(target_reps)
+                if candidate > 0:
+                    self.target_value = candidate
+            except (TypeError, ValueError):
+                self.target_value = None
+
+        self.schedule = ClassifierSchedule(**{"stride": classifier_stride, **(classifier_schedule or {})})
+        self.classifier_stride = self.schedule.stride
+
+        self.target_reached = False
+        self.stop_reason = "stopped"
+
+        self.dynamic_prominence_ratio = 0.8
+        self.peak_detect_threshold = 0.
+        self.peak_buffer_limit = 3
+
+        if activity == 'run' or activity == 'jump':
+            self.alpha = 0.4  # Adjust for smoother motion tracking
+            self.min_distance = 2
+            self.peak_detect_threshold = 0.4
+        else:
+            self.alpha = 0.1
+            self.min_distance = 20
+
+        self.frame_count = 0
+        self.motion_history_full = SignalHistory(limit=history_limit, spill_path=history_spill_path)
+        self.rep_sparc_scores = []
+        self.rep_rom_scores = []
+        self.rep_durations = []
+        self.current_rep_signal = deque(maxlen=rep_sample_limit)
+        self.current_rep_durations = deque(maxlen=rep_sample_limit)
+        self.current_rep_time = 0.0
+        self.current_rep_angles = deque(maxlen=rep_sample_limit)
+        self.last_sample_timestamp = None
+
+        self.smoothed_dx = 0
+        self.smoothed_dy = 0
+        self.motion_history = deque(maxlen=8)
+        self.motion_amplitude = 0
+
+        self.prev_landmarks = None
+        self.current_activity = None
+        self.last_count_frame = -9999
+        self.min_count_frame_gap = 30  # 必须间隔至少 30 帧（约 1s）才能再次记数
+
+        # Rolling variance of the x, y, 45° and -45° motion projections (last 100 samples)
+        self.motion_moments = RollingMoments(window=100, channels=4)
+
+        self.noOfFrameSize = 16
+        self.noOfFeatures = 132
+        self.lastLandmarkPoint = 33
+
+        self.motion_amplitude_threshold = 8
+        custom_detectors_map = {
+            'custom_elbow_flexion': ElbowFlexionDetector(rep_sample_limit),
+            'standing_shoulder_external_rotation_custom': ShoulderExternalRotationDetector(rep_sample_limit),
+        }
+        self.use_custom_logic = activity in custom_detectors_map
+        self.custom_detector = custom_detectors_map.get(activity)
+        self.rom_angle_indices = list(ROM_JOINT_ANGLES.get(activity, ()))
+
+        if activity == 'standing_shoulder_abduction':
+            self.motion_distance_arr_limit = 800
+        elif activity == 'standing_shoulder_extension':
+            self.motion_distance_arr_limit = 500
+        else:
+            self.motion_distance_arr_limit = 800
+
+        # "autocorrelation" is the original find_peaks-over-the-buffer counter, tuned per activity above;
+        # "online" counts cycles of the directed motion signal in O(1) per frame. It matches the
+        # reference on slow exercises but under-counts cycles shorter than ~40 frames (run, jump),
+        # so it stays opt-in (see tests/test_rep_detection.py)
+        if rep_detector == "autocorrelation":
+            self.rep_detector = AutocorrelationRepCounter(
+                buffer_limit=self.motion_distance_arr_limit,
+                min_distance=self.min_distance,
+                peak_height=self.peak_detect_threshold,
+                prominence_ratio=self.dynamic_prominence_ratio,
+                peak_buffer_limit=self.peak_buffer_limit,
+            )
+        else:
+            self.rep_detector = OnlineRepDetector(threshold=self.motion_amplitude_threshold)
+
+        self.resultIndex = 0
+        self.overall_direction = +1
+        self.conf = 1.0
+
+        self.landmark_window = LandmarkWindow(self.noOfFrameSize, self.noOfFeatures)
+        self.first_actvity_detected = False
 
-    target_reached = False
-    stop_reason = "stopped"
+        # Overlay data from the latest frame (pixel landmark motion and resultant vector)
+        self.motion_arrows = None
+        self.motion_vector = None
 
-    def finalize_current_rep_signal(rom_override=None):
-        nonlocal current_rep_signal, current_rep_durations, rep_sparc_scores, rep_rom_scores, current_rep_angles, rep_durations
+    def finalize_current_rep_signal(self, rom_override=None):
         min_samples = 10
-        if len(current_rep_signal) >= min_samples:
-            avg_dt = sum(current_rep_durations) / len(current_rep_durations) if current_rep_durations else 0
+        if len(self.current_rep_signal) >= min_samples:
+            durations = self.current_rep_durations
+            avg_dt = sum(durations) / len(durations) if durations else 0
             sample_rate = 1.0 / avg_dt if avg_dt and avg_dt > 1e-3 else 30.0
-            sparc_value = calculate_sparc(current_rep_signal, sample_rate=sample_rate)
+            sparc_value = calculate_sparc(self.current_rep_signal, sample_rate=sample_rate)
             if sparc_value is not None:
-                rep_sparc_scores.append(sparc_value)
-        current_rep_signal = []
-        if current_rep_durations:
-            total_rep_time = sum(current_rep_durations)
+                self.rep_sparc_scores.append(sparc_value)
+        self.current_rep_signal.clear()
+        if self.current_rep_durations:
+            # Summed as frames arrive, so the duration stays exact when the sample buffer wraps
+            total_rep_time = self.current_rep_time
             if total_rep_time > 0:
-                rep_durations.append(total_rep_time)
-        current_rep_durations = []
+                self.rep_durations.append(total_rep_time)
+        self.current_rep_durations.clear()
+        self.current_rep_time = 0.0
         if rom_override is not None:
-            rep_rom_scores.append(rom_override)
+            self.rep_rom_scores.append(rom_override)
         else:
-            if len(current_rep_angles) >= 2:
-                rep_rom_scores.append(max(current_rep_angles) - min(current_rep_angles))
-        current_rep_angles = []
+            if len(self.current_rep_angles) >= 2:
+                self.rep_rom_scores.append(max(self.current_rep_angles) - min(self.current_rep_angles))
+        self.current_rep_angles.clear()
 
-    def register_rep(rom_override=None):
+    def register_rep(self, rom_override=None):
         """Increment rep counter and mark completion when hitting the target."""
-        nonlocal repetition_count, target_reached, stop_reason
-        finalize_current_rep_signal(rom_override=rom_override)
-        repetition_count += 1
-        if target_value and repetition_count >= target_value and not target_reached:
-            target_reached = True
-            stop_reason = "target_reached"
+        sparc_count = len(self.rep_sparc_scores)
+        rom_count = len(self.rep_rom_scores)
+        duration_count = len(self.rep_durations)
+        self.finalize_current_rep_signal(rom_override=rom_override)
+        self.repetition_count += 1
+        if self.target_value and self.repetition_count >= self.target_value and not self.target_reached:
+            self.target_reached = True
+            self.stop_reason = "target_reached"
+
+        if self.on_event is not None:
+            # Per-rep values are None when the rep was too short to score
+            event = self.summary()
+            event.update({
+                "frame": self.frame_count,
+                "sparc": self.rep_sparc_scores[-1] if len(self.rep_sparc_scores) > sparc_count else None,
+                "rom": self.rep_rom_scores[-1] if len(self.rep_rom_scores) > rom_count else None,
+                "duration": self.rep_durations[-1] if len(self.rep_durations) > duration_count else None,
+            })
+            self._emit("rep", event)
 
-    
-    peaks, properties = [], []
-    
-    wait_idx = 0
-    
-    dynamic_prominence_ratio = 0.8
-    
-    min_distance = 20
-    
-    peak_detect_threshold = 0.
+    def _emit(self, kind, data):
+        try:
+            self.on_event(kind, data)
+        except Exception as exc:
+            print(f"[ExerciseCounter] Event handler failed: {exc}")
+
+    def process_frame(self, timestamp, image_landmarks=None, world_landmarks=None,
+                      frame_width=640, frame_height=480):
+        """
+        Advance the counter by one frame.
+
+        Args:
+            timestamp (float): Capture time of the frame in seconds.
+            image_landmarks (np.ndarray | None): (33, 4) normalized image landmarks,
+                or None when no skeleton was detected in this frame.
+            world_landmarks (np.ndarray | None): (33, 4) world landmarks for the
+                classifier window (None if unavailable).
+            frame_width (int): Width of the source frame in pixels.
+            frame_height (int): Height of the source frame in pixels.
+
+        Returns:
+            bool: True if a skeleton was detected in this frame.
+        """
+        skeleton_detected = False
+        if self.last_sample_timestamp is None:
+            frame_dt = 1.0 / 30.0
+        else:
+            frame_dt = timestamp - self.last_sample_timestamp
+            if frame_dt <= 0:
+                frame_dt = 1.0 / 30.0
+        self.last_sample_timestamp = timestamp
+        self.motion_arrows = None
+        self.motion_vector = None
+
+        if image_landmarks is not None:
+            skeleton_detected = True
+            self._process_landmarks(image_landmarks, world_landmarks, frame_width, frame_height, frame_dt)
+
+        self.frame_count += 1
+
+        return skeleton_detected
+
+    def _apply_scores(self, result):
+        self.class_scores = result
+
+        self.resultIndex = self.schedule.update(result)
+        predicted_activity = activitiesName[self.resultIndex]
+        label_changed = predicted_activity != self.current_activity
+        self.current_activity = predicted_activity
+        self.conf = self.schedule.confidence
+        if self.on_event is not None and (
+            label_changed or (self.schedule.runs - 1) % self.classification_event_interval == 0
+        ):
+            self._emit("classification", {
+                "frame": self.frame_count,
+                "label": predicted_activity,
+                "confidence": float(self.conf),
+                "matches_activity": predicted_activity == self.activity,
+            })
 
-    if desired_activity == 'run' or desired_activity == 'jump':
-        alpha = 0.4  # Adjust for smoother motion tracking 
-        min_distance = 2 
-        peak_detect_threshold = 0.4
-    else:
-        alpha = 0.1
-        min_distance = 20
+    def _process_landmarks(self, curr_landmarks, world_landmarks, frame_width, frame_height, frame_dt):
+        landmarksArray = None
+        if world_landmarks is not None:
+            landmarksArray = np.asarray(world_landmarks)[:self.lastLandmarkPoint].ravel()
 
+        motion_amplitude = None
 
-    
-    frame_count = 0
-    
-    landmarksArray = []
-    columnArray    = []
-    motion_distance = []
-    motion_history_full = []
-    rep_sparc_scores = []
-    rep_rom_scores = []
-    rep_durations = []
-    current_rep_signal = []
-    current_rep_durations = []
-    current_rep_angles = []
-    last_sample_timestamp = None
+        # Every joint angle this frame needs (ROM tracking, custom detectors), in one kernel call
+        angles = None
+        if self.use_custom_logic or self.rom_angle_indices:
+            try:
+                angles = joint_angles(curr_landmarks)
+            except (IndexError, ValueError):
+                angles = None
 
-    
-    avg_dx = 0 
-    avg_dy = 0
-    
-    smoothed_dx = 0
-    smoothed_dy = 0 
-    autocorr = 0
-    autocorr_array = []
-    
+        if self.use_custom_logic:
+            self.current_activity = self.activity
+        if not self.landmark_window.is_full():
+            self.landmark_window.append(landmarksArray)
 
-    motion_history = []
-    motion_history = deque(maxlen=8) 
-    
-    avg_dx, avg_dy = 0, 0
-
-      
-    frame_count = 0
-    total_dx, total_dy = 0, 0
-    motion_amplitude = 0
-    prev_x, prev_y = 0, 0
-
-    prev_landmarks = None
-    current_activity = None
-    last_count_frame = -9999
-    min_count_frame_gap = 30  # 必须间隔至少 30 帧（约 1s）才能再次记数
-    
-    motion_history_x = deque(maxlen=(100))
-    motion_history_y = deque(maxlen=(100))
+        elif not self.use_custom_logic:
+            self.landmark_window.append(landmarksArray)
 
-    
-    motion_history_45 = deque(maxlen=(100))
-    motion_history_neg45 = deque(maxlen=(100))
-    
-    variance_x = 0
-    variance_y = 0
-    variance_45 = 0
-    variance_neg45 = 0
-    
+            if self.schedule.due(landmarksArray):
+                predict = self.predict if self.predict is not None else classifier_loader.get().predict
+                with stage_metrics.time("inference"):
+                    result = predict(self.landmark_window.view())
 
-    
-    prev_peak_array_length = 0
-    
+                # A predictor with no scores yet (e.g. a remote classifier) leaves the label as it is
+                if result is not None:
+                    self._apply_scores(result)
 
-    
-    noOfFrameSize = 16
-    noOfFeatures  = 132
-    lastLandmarkPoint = 33 
-    
-    
-    motion_amplitude_threshold = 8
-    custom_detectors_map = {
-        'custom_elbow_flexion': ElbowFlexionDetector(),
-        'standing_shoulder_external_rotation_custom': ShoulderExternalRotationDetector(),
-    }
-    use_custom_logic = desired_activity in custom_detectors_map
-    custom_detector = custom_detectors_map.get(desired_activity)
-
-    if desired_activity == 'standing_shoulder_abduction':
-        motion_distance_arr_limit = 800
-    elif desired_activity == 'standing_shoulder_extension':
-        motion_distance_arr_limit = 500
+        if self.prev_landmarks is not None:
+
+            with stage_metrics.time("motion"):
+                curr_px, prev_px, deltas = landmark_motion(
+                    curr_landmarks, self.prev_landmarks, frame_width, frame_height, delta_limit=60
+                )
+            total_dx, total_dy = deltas.sum(axis=0)
+            count = len(deltas)
+            self.motion_arrows = (prev_px, curr_px)
+
+            if count > 0:
+                # Apply Exponential Moving Average to the resultant motion
+                self.smoothed_dx = self.alpha * total_dx + (1 - self.alpha) * self.smoothed_dx
+                self.smoothed_dy = self.alpha * total_dy + (1 - self.alpha) * self.smoothed_dy
+                smoothed_dx, smoothed_dy = self.smoothed_dx, self.smoothed_dy
+
+                # Store in motion history
+                self.motion_history.append((smoothed_dx, smoothed_dy))
+
+                # Compute the combined vector's amplitude
+                motion_amplitude = np.sqrt(smoothed_dx**2 + smoothed_dy**2)
+                self.motion_amplitude = motion_amplitude
+
+                smoothed_45 = (smoothed_dx + smoothed_dy) / np.sqrt(2)
+                smoothed_neg45 = (smoothed_dx - smoothed_dy) / np.sqrt(2)
+
+                # Store motion along both axes and diagonals
+                self.motion_moments.append((smoothed_dx, smoothed_dy, smoothed_45, smoothed_neg45))
+
+                if not self.use_custom_logic:
+                    # Estimate overall motion direction from variance
+                    if len(self.motion_moments) > 3:
+                        _, self.overall_direction = self.motion_moments.dominant_direction()
+                    else:
+                        self.overall_direction = 0
+
+                    self._track_rom_angles(angles)
+                    self._count_from_motion(motion_amplitude)
+
+                    # Motion vector for the overlay (transformer mode only)
+                    if motion_amplitude and motion_amplitude > self.motion_amplitude_threshold:
+                        norm_dx = smoothed_dx / motion_amplitude
+                        norm_dy = smoothed_dy / motion_amplitude
+                    else:
+                        norm_dx, norm_dy = 0, 0
+                    self.motion_vector = (norm_dx, norm_dy, motion_amplitude)
+                else:
+                    # Custom-logic exercises: skip transformer auto-counting and arrow overlay
+                    self.overall_direction = 0
+
+        if motion_amplitude is not None:
+            self.current_rep_signal.append(float(motion_amplitude))
+            self.current_rep_durations.append(frame_dt)
+            self.current_rep_time += frame_dt
+
+        if self.use_custom_logic and self.custom_detector:
+            detector_result = self.custom_detector.update(curr_landmarks, angles)
+            if isinstance(detector_result, tuple):
+                rep_completed, rep_angles = detector_result
+            else:
+                rep_completed = detector_result
+                rep_angles = None
+            if rep_completed:
+                rom_value = None
+                if rep_angles and len(rep_angles) >= 2:
+                    rom_value = max(rep_angles) - min(rep_angles)
+                self.register_rep(rom_override=rom_value)
+
+        self.prev_landmarks = curr_landmarks
+
+    def _track_rom_angles(self, angles):
+        """Track ROM angles for transformer-based exercises from this frame's joint angles."""
+        if angles is not None and self.rom_angle_indices:
+            self.current_rep_angles.append(angles[self.rom_angle_indices].max())
+
+    def _count_from_motion(self, motion_amplitude):
+        """Initial trigger plus cycle counting on the directed motion signal."""
+        frame_count = self.frame_count
+
+        # Initial trigger guard (prevents instant +1)
+        if (
+            self.current_activity == self.activity
+            and not self.first_actvity_detected
+            and (frame_count - self.last_count_frame) > self.min_count_frame_gap
+            and frame_count > 30  # Wait at least 30 frames (~1 second)
+            and motion_amplitude > self.motion_amplitude_threshold  # Require real motion
+        ):
+            self.register_rep()
+            self.first_actvity_detected = True
+            self.last_count_frame = frame_count
+            print(
+                f"[Repetition] Initial trigger at frame {frame_count}: "
+                f"activity={self.current_activity}, confidence={self.conf:.3f}, count={self.repetition_count}"
+            )
+
+        directed_motion = motion_amplitude * self.overall_direction
+        self.motion_history_full.append(directed_motion)
+
+        eligible = (
+            motion_amplitude > self.motion_amplitude_threshold
+            and self.current_activity == self.activity
+            and (frame_count - self.last_count_frame) > self.min_count_frame_gap
+        )
+        with stage_metrics.time("rep_detection"):
+            rep_completed = self.rep_detector.update(frame_count, directed_motion, eligible)
+
+        if rep_completed:
+            self.register_rep()
+            self.last_count_frame = frame_count
+            print(
+                f"[Repetition] Cycle completed at frame {frame_count}, "
+                f"activity={self.current_activity}, confidence={self.conf:.3f}, "
+                f"count={self.repetition_count}"
+            )
+
+    def summary(self):
+        """Session summary in the format returned by ``process_video``."""
+        return {
+            "repetition_count": self.repetition_count,
+            "target_reached": self.target_reached,
+            "target_reps": self.target_value,
+            "stop_reason": self.stop_reason,
+            "activity": self.activity,
+            "rep_sparc_scores": list(self.rep_sparc_scores),
+            "rep_rom_scores": list(self.rep_rom_scores),
+            "repetition_times": list(self.rep_durations),
+        }
+
+    def close(self):
+        """Release the motion history's spill file, if any."""
+        self.motion_history_full.close()
+
+
+def poll_window_key():
+    """Return the pressed key code (or -1) without waiting, keeping the OpenCV window responsive."""
+    poll_key = getattr(cv2, "pollKey", None)
+    if poll_key is None:
+        return cv2.waitKey(1)
+    return poll_key()
+
+
+def draw_motion_overlay(frame, counter):
+    """Draw per-landmark motion arrows and the resultant motion vector from the latest frame."""
+    if counter.motion_arrows is not None:
+        prev_px, curr_px = counter.motion_arrows
+        for (prev_x, prev_y), (x, y) in zip(prev_px.astype(int).tolist(), curr_px.astype(int).tolist()):
+            cv2.arrowedLine(frame, (prev_x, prev_y), (x, y), (0, 255, 0), 1)
+
+    if counter.motion_vector is not None:
+        norm_dx, norm_dy, motion_amplitude = counter.motion_vector
+        center_x, center_y = frame.shape[1] // 2, frame.shape[0] // 2
+        cv2.arrowedLine(
+            frame,
+            (center_x, center_y),
+            (int(center_x + norm_dx * motion_amplitude),
+             int(center_y + norm_dy * motion_amplitude)),
+            (0, 0, 255),
+            3,
+        )
+
+
+def landmark_list_from_array(image_landmarks):
+    """Wrap a (33, 4) landmark array in a NormalizedLandmarkList for mediapipe's drawing utils."""
+    landmark_list = landmark_pb2.NormalizedLandmarkList()
+    for x, y, z, visibility in image_landmarks.tolist():
+        landmark_list.landmark.add(x=x, y=y, z=z, visibility=visibility)
+    return landmark_list
+
+
+def make_quality_controller(adaptive_quality=True, target_fps=20):
+    """Pose quality controller for a live session; without ``adaptive_quality`` it pins the default level."""
+    default = QUALITY_LEVELS[DEFAULT_QUALITY_LEVEL]
+    if adaptive_quality:
+        # Only levels whose pose model is installed: switching to another would download it mid-session
+        levels = available_quality_levels() or (default,)
+        start = levels.index(default) if default in levels else 0
+        return PoseQualityController(target_fps=target_fps, levels=levels, start_level=start, min_level=start)
+    # A one-level ladder pins the original quality
+    return PoseQualityController(levels=(default,), start_level=0, min_level=0)
+
+
+def make_pose_graph(model_complexity):
+    """MediaPipe Pose graph with the engine's detection and tracking thresholds."""
+    return mp.solutions.pose.Pose(
+        model_complexity=model_complexity, min_detection_confidence=0.9, min_tracking_confidence=0.9
+    )
+
+
+class CameraResources:
+    """
+    Capture device and MediaPipe pose graphs for live camera sessions.
+
+    Opening the camera and building the pose graphs takes seconds. A warm
+    instance is opened once and handed to ``process_video`` for each session,
+    which then only resets per-session state; the learned pose quality level
+    carries over.
+    """
+
+    def __init__(self, camera_index=0, adaptive_quality=True, target_fps=20):
+        self.camera_index = camera_index
+        self.quality_controller = make_quality_controller(adaptive_quality, target_fps)
+        self.capture = None
+        self.pose_estimator = None
+        self.warm_up_seconds = None
+        self.last_start_seconds = None
+
+    def open(self, warm_up=True):
+        """Open the camera and pose graphs; with ``warm_up`` run one camera frame through pose."""
+        start = time.perf_counter()
+        self.pose_estimator = AdaptivePoseEstimator(make_pose_graph, self.quality_controller)
+        self.capture = cv2.VideoCapture(self.camera_index)
+        if warm_up:
+            ret, frame = self.capture.read()
+            if not ret:
+                frame = np.zeros((480, 640, 3), dtype=np.uint8)
+            self.pose_estimator.warm_up(frame)
+        self.warm_up_seconds = time.perf_counter() - start
+        return self
+
+    @property
+    def is_open(self):
+        return self.capture is not None and self.capture.isOpened()
+
+    def reset(self):
+        """Clear state left by the previous session."""
+        self.pose_estimator.reset()
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+        if self.pose_estimator is not None:
+            self.pose_estimator.close()
+            self.pose_estimator = None
+
+
+class RemoteInference:
+    """
+    Pose estimation and activity classification for one camera session, run in
+    ``process_video``'s inference process (see frame_transport.InferenceProcess).
+
+    Classification follows ExerciseCounter's schedule: the world landmarks of
+    every frame with a skeleton fill the same sliding window, and once it is
+    full an identical ClassifierSchedule (``classifier_schedule``, the
+    counter's ``schedule.settings()``) sees the same rows and decides when the
+    classifier runs. The scores go back with the landmarks, and the session's
+    counter uses them instead of running the model itself.
+    """
+
+    def __init__(self, adaptive_quality=True, target_fps=20, classifier_schedule=None, classify=True,
+                 window_size=16, landmark_count=33):
+        self.quality_controller = make_quality_controller(adaptive_quality, target_fps)
+        self.pose_estimator = AdaptivePoseEstimator(make_pose_graph, self.quality_controller)
+        self.schedule = ClassifierSchedule(**(classifier_schedule or {}))
+        self.classifier = classifier_loader.get() if classify else None
+        self.landmark_count = landmark_count
+        self.landmark_window = LandmarkWindow(window_size, landmark_count * 4)
+        self._quality_changes = self.quality_controller.changes
+
+    def __call__(self, frame, timestamp):
+        """Returns ``(image_landmarks, world_landmarks, class_scores, quality_change, pose_seconds)``."""
+        start = time.perf_counter()
+        image_landmarks, world_landmarks, _ = self.pose_estimator.estimate(frame)
+        pose_seconds = time.perf_counter() - start
+
+        class_scores = None
+        if self.classifier is not None and image_landmarks is not None:
+            row = None if world_landmarks is None else np.asarray(world_landmarks)[:self.landmark_count].ravel()
+            window_was_full = self.landmark_window.is_full()
+            self.landmark_window.append(row)
+            if window_was_full and self.schedule.due(row):
+                class_scores = self.classifier.predict(self.landmark_window.view())
+
+        quality_change = None
+        if self.quality_controller.changes != self._quality_changes:
+            self._quality_changes = self.quality_controller.changes
+            quality_change = (self.quality_controller.level, self.quality_controller.quality._asdict())
+        return image_landmarks, world_landmarks, class_scores, quality_change, pose_seconds
+
+    def close(self):
+        self.pose_estimator.close()
+
+
+def open_session_log(path, counter, frame_shape):
+    """
+    Start the session log for ``counter``'s session, or return None when logging is off.
+
+    ``path`` None falls back to a new log under ``session_log_dir`` when
+    ``save_session_log`` is set. ``frame_shape`` is the shape of the first frame.
+    """
+    if path is None:
+        if not save_session_log:
+            return None
+        path = os.path.join(session_log_dir, f"{counter.activity}_{int(time.time())}")
+    print(f"[SessionLog] Logging session to {path}")
+    return SessionLogWriter(
+        path,
+        classifierClasses,
+        frame_width=frame_shape[1],
+        frame_height=frame_shape[0],
+        activity=counter.activity,
+        classifier_stride=counter.classifier_stride,
+        classifier_schedule=counter.schedule.settings(),
+        target_reps=counter.target_value,
+        initial_reps=counter.repetition_count,
+    )
+
+
+def process_video(activity=None, stop_event=None, target_reps=None, initial_reps=0, duration_minutes=1,
+                  classifier_stride=1, pipelined=True, on_pipeline=None, on_event=None,
+                  adaptive_quality=True, target_fps=20, resources=None, session_analytics=False,
+                  session_log=None, inference_process=False, classifier_schedule=None):
+    """
+    Run real-time action recognition and counting.
+
+    By default the loop runs as a pipeline: capture, pose estimation and
+    classification/counting each run on their own thread, joined by bounded
+    queues, while this thread renders. Capture and render queues keep only the
+    freshest frame, so a slow stage drops stale frames instead of adding lag;
+    landmarks are never dropped between pose and counting.
+
+    The render queue doubles as the display's latest-frame mailbox: the window
+    shows whatever frame is newest and key presses are polled without waiting,
+    so the GUI never stalls processing. Pressing Q in the window sets
+    ``stop_event``, ending the session the same way /stop does (progress is
+    kept as when the duration runs out).
+
+    Args:
+        activity (str | None): Desired activity to recognize (defaults to ``desired_activity``).
+        stop_event (threading.Event | None): Optional event to signal graceful stop;
+            one is created when not given so the Q key has something to set.
+        target_reps (int | None): Optional reps target. When provided the loop stops
+            automatically once the target is reached.
+        initial_reps (int): Initial repetition count (for resuming).
+        duration_minutes (int): Maximum time to complete the exercise in minutes.
+        classifier_stride (int): Run the activity classifier every N frames once the
+            landmark window is full; the last prediction is kept in between.
+        classifier_schedule (dict | None): Further ClassifierSchedule settings
+            (early runs on motion changes, label smoothing and hysteresis),
+            e.g. ADAPTIVE_CLASSIFIER_SCHEDULE; a "stride" here overrides
+            ``classifier_stride``.
+        pipelined (bool): Run stages on separate threads; False runs them in
+            sequence on this thread.
+        on_pipeline (callable | None): Called with the FramePipeline once it starts,
+            e.g. to report its queue depths.
+        on_event (callable | None): ``on_event(kind, data)`` for live rep and
+            classifier events (see ExerciseCounter), plus "quality" events when
+            the pose quality level changes.
+        adaptive_quality (bool): Let a PoseQualityController trade pose model
+            complexity, input scale and pose stride for frame rate. False keeps
+            the default model on every full-size frame.
+        target_fps (float): Pose frame rate the adaptive controller aims for.
+        resources (CameraResources | None): Already-open camera and pose graphs to
+            reuse (they are left open). By default they are opened for this call
+            with ``adaptive_quality``/``target_fps`` and closed at the end.
+        session_analytics (bool): Also compute the sliding-window entropy of the
+            retained motion history at the end ("motion_entropy" in the summary).
+            Off by default, since nothing used the result.
+        session_log (str | None): Directory to write a SessionLog of every frame's
+            landmarks and classifier scores, for ``replay_session_log``. None
+            logs only when ``save_session_log`` is set.
+        inference_process (bool): Run pose estimation and classification in a
+            separate process (RemoteInference), so they do not compete with
+            capture, drawing and the UI for this interpreter's GIL. Frames are
+            read straight into a shared-memory ring and only landmarks and
+            class scores come back; the counter and window stay here. Pose
+            graphs and the classifier are built in that process at session start.
+
+    Returns:
+        dict: Session summary including repetition count and stop metadata.
+    """
+    # Concurrent sessions each count their own activity; the module default is never changed
+    activity = activity or desired_activity
+
+    # The window's 'Q' key stops the session through this event, like /stop does
+    stop_event = stop_event or threading.Event()
+
+    call_start = time.perf_counter()
+    owns_resources = resources is None
+    if owns_resources:
+        resources = CameraResources(adaptive_quality=adaptive_quality, target_fps=target_fps).open(warm_up=False)
     else:
-        motion_distance_arr_limit = 800
-    
+        resources.reset()
+    cap = resources.capture
+    pose_estimator = resources.pose_estimator
+    quality_controller = resources.quality_controller
 
-    
-    variance_array = []
-    resultIndex = 0
+    mp_pose = mp.solutions.pose
 
-    overall_direction = +1
-    
-    
-    desiredFrameWidth = 400
-    
-    prev_repetition_count = 0
+    mpDrawing = mp.solutions.drawing_utils  # Setup mediapipe
 
-    
-    for i in range(0, lastLandmarkPoint*4):
-        columnArray.append(i)
-    
-    landMarksDf = pd.DataFrame(columns = columnArray)
-    
-    first_actvity_detected = False
-    
+    window_name = "3D Motion Tracking with Repetition Counting"
+    cv2.namedWindow(window_name, cv2.WINDOW_NORMAL)
+    try:
+        cv2.setWindowProperty(window_name, cv2.WND_PROP_TOPMOST, 1)
+    except Exception:
+        pass
 
-    
-    output_frame_width = desired_width + info_panel_width
-    
+    TotalFramesInVideo = int(cap. get(cv2. CAP_PROP_FRAME_COUNT))
+    print("The length of the cap is ", TotalFramesInVideo)
+
+    counter = ExerciseCounter(
+        activity,
+        target_reps=target_reps,
+        initial_reps=initial_reps,
+        classifier_stride=classifier_stride,
+        on_event=on_event,
+        classifier_schedule=classifier_schedule,
+    )
+
+    recorder = None
     if save_video:
-        # fps = cap.get(cv2.CAP_PROP_FPS)
-        fps = 8
-        # 🔹 Save as MP4 instead of AVI
-        output_video_path = os.path.join(output_path, desired_activity + "_real_time.mp4")
-        
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')  
-        out = cv2.VideoWriter(output_video_path, fourcc, fps, (output_frame_width, desired_height))
+        # 🔹 Save as MP4, written on its own thread at the measured frame rate
+        os.makedirs(output_path, exist_ok=True)
+        output_video_path = os.path.join(output_path, activity + "_real_time.mp4")
+        recorder = VideoRecorder(output_video_path, mode=save_video_mode).start()
+
+    # Static panel chrome is drawn once; only changed values are redrawn per frame
+    panel_renderer = InfoPanelRenderer(
+        activity, counter.target_value, duration_minutes, desired_width, desired_height, info_panel_width
+    )
 
     session_start_time = time.time()
+    quality_changes = quality_controller.changes
+    first_frame_shown = False
+    log_writer = None
+    log_pending = session_log is not None or save_session_log
+    pipeline = None
 
-    conf = 1.0
-    
-    with mp_pose.Pose(min_detection_confidence=0.9, min_tracking_confidence=0.9) as pose:
-            
-        while cap.isOpened():
-            if stop_event and stop_event.is_set():
-                print("🛑 Stop signal received, exiting loop...")
-                break
-            
-            ret, frame = cap.read()
+    try:
+
+        def capture():
+            if not cap.isOpened():
+                return END
+            with stage_metrics.time("capture"):
+                ret, frame = cap.read()
             # frame = cv2.flip(frame, 0)
             # frame = cv2.flip(frame, 1)
-            
             if not ret:
-                break
-    
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = pose.process(rgb_frame)
-            skeleton_detected = False
-            current_sample_timestamp = time.time()
-            if last_sample_timestamp is None:
-                frame_dt = 1.0 / 30.0
-            else:
-                frame_dt = current_sample_timestamp - last_sample_timestamp
-                if frame_dt <= 0:
-                    frame_dt = 1.0 / 30.0
-            last_sample_timestamp = current_sample_timestamp
-            
-            landmarksArray    = []
- 
-            
-            if results.pose_landmarks:
-                skeleton_detected = True
-                
-                curr_landmarks = results.pose_landmarks.landmark 
-    
-                
-                try: # Try and except are used because we are not going to get the landmarks all the time may be due to interruptions in the camera view 
-                    capturedLandmarks = results.pose_world_landmarks.landmark # Extract all the landmarks
-                    
-                    for i in range(0, lastLandmarkPoint):
-                                          
-                        landmarksArray.append(capturedLandmarks[i].x) 
-                        landmarksArray.append(capturedLandmarks[i].y)
-                        landmarksArray.append(capturedLandmarks[i].z)
-                        landmarksArray.append(capturedLandmarks[i].visibility)
-                                             
-                             
-                except: 
-                    pass;
-                
-                
-                landmarksArray = [landmarksArray]
-                addDf = pd.DataFrame(landmarksArray)
-                
-                motion_amplitude = None
-
-                if use_custom_logic:
-                    current_activity = desired_activity
-                if len(landMarksDf) < noOfFrameSize:  
-                    landMarksDf = pd.concat([landMarksDf, addDf], ignore_index=True, axis =0)
-
-                
-                elif len(landMarksDf) >= noOfFrameSize and not use_custom_logic:    
-                    landMarksDf = pd.concat([landMarksDf, addDf], ignore_index=True, axis =0)
-                    landMarksDf.drop(axis = 0, index = 0, inplace = True)
-                    landMarksDf = landMarksDf.reset_index(drop =True)
-                    inputArray = np.array(landMarksDf) 
-                    
-       
-                    result = myModel(inputArray.reshape(1,noOfFrameSize, noOfFeatures,1))            # print(np.argmax(result))
-                    
-                    resultIndex = np.argmax(result)
-                    predicted_activity = activitiesName[resultIndex]
-                    current_activity = predicted_activity
-                    conf = np.max(result)
-                        
-                # print("Input array length : ", len(landMarksDf))    
-                
-        
-                if prev_landmarks:
-                    
-                    total_dx, total_dy = 0, 0
-                    count = 0
-        
-        
-                    for i, landmark in enumerate(curr_landmarks):
-                        x, y = (landmark.x * frame.shape[1]), (landmark.y * frame.shape[0])
-                        prev_x, prev_y = (prev_landmarks[i].x * frame.shape[1]), (prev_landmarks[i].y * frame.shape[0])
-        
-                        dx, dy = x - prev_x, y - prev_y
-                        
-                        
-                        delta_limit = 60
-                        
-                        if dx > delta_limit:
-                            dx = delta_limit 
-                            
-                        elif dx < -delta_limit:
-                            dx = -delta_limit
-                            
-                            
-                        if dy > delta_limit:
-                            dy = delta_limit
-                            
-                        elif dy < -delta_limit:
-                            dy = -delta_limit
-                        
-                        
-                        
-                        # print("dx : ", dx, " dy : ", dy)
-                        
-                        total_dx += dx
-                        total_dy += dy
-                        count += 1
-        
-                        # Draw motion vectors
-                        cv2.arrowedLine(frame, (int(prev_x), int(prev_y)), (int(x), int(y)), (0, 255, 0), 1)
-
-     
-    
-    
-                    if count > 0:
-                        # Compute resultant motion
-                        resultant_dx, resultant_dy = total_dx, total_dy
-                    
-                        # Apply Exponential Moving Average
-                        smoothed_dx = alpha * resultant_dx + (1 - alpha) * smoothed_dx
-                        smoothed_dy = alpha * resultant_dy + (1 - alpha) * smoothed_dy
-                    
-                        # Store in motion history
-                        motion_history.append((smoothed_dx, smoothed_dy))
-                     
-
-                        
-                        # Compute the combined vector's amplitude
-                        motion_amplitude = np.sqrt(smoothed_dx**2 + smoothed_dy**2)
-                        
+                return END
+            return time.time(), frame
 
-    
-                        motion_history_x.append(smoothed_dx)
-                        motion_history_y.append(smoothed_dy)
-                
+        def announce_quality(level, quality):
+            print(
+                f"[PoseQuality] Level {level}: complexity={quality['model_complexity']}, "
+                f"scale={quality['scale']}, stride={quality['stride']}"
+            )
+            counter._emit("quality", {"level": level, **quality})
+
+        def capture_into(remote):
+            """Read the next frame into a free shared buffer and submit it to the inference process."""
+            slot = remote.acquire()
+            if not cap.isOpened():
+                remote.release(slot)
+                return END
+            buffer = remote.frame(slot)
+            with stage_metrics.time("capture"):
+                ret, frame = cap.read(buffer)
+            if not ret:
+                remote.release(slot)
+                return END
+            if frame is not buffer:
+                buffer[...] = frame
+            timestamp = time.time()
+            remote.submit(slot, timestamp)
+            return timestamp, buffer
+
+        def estimate(item):
+            nonlocal quality_changes
+            timestamp, frame = item
+            image_landmarks, world_landmarks, results = pose_estimator.estimate(frame)
+            if quality_controller.changes != quality_changes:
+                quality_changes = quality_controller.changes
+                announce_quality(quality_controller.level, quality_controller.quality._asdict())
+            return timestamp, frame, image_landmarks, world_landmarks, results
+
+        def count(item):
+            nonlocal log_writer, log_pending
+            timestamp, frame, image_landmarks, world_landmarks, results = item
+            skeleton_detected = counter.process_frame(
+                timestamp, image_landmarks, world_landmarks, frame.shape[1], frame.shape[0]
+            )
+            if log_pending:
+                log_pending = False
+                log_writer = open_session_log(session_log, counter, frame.shape)
+            if log_writer is not None:
+                log_writer.append(timestamp, image_landmarks, world_landmarks, counter.class_scores)
+            if recorder is not None and recorder.mode == "raw":
+                # Copied because the overlay below draws on the frame in place
+                recorder.submit(frame, timestamp, image_landmarks, world_landmarks, copy=True)
+
+            if skeleton_detected:
+                with stage_metrics.time("overlay"):
+                    draw_motion_overlay(frame, counter)
+                    # Frames skipped by the pose stride only have extrapolated landmarks
+                    pose_landmarks = results.pose_landmarks if results is not None else landmark_list_from_array(image_landmarks)
+                    mpDrawing.draw_landmarks(
+                        frame,
+                        pose_landmarks,
+                        mp_pose.POSE_CONNECTIONS,
+                        mpDrawing.DrawingSpec(color = (0, 0, 255), thickness = 2, circle_radius = 4),
+                        mpDrawing.DrawingSpec(color = (0, 255, 0), thickness = 2, circle_radius = 0)
+                    )
+            return frame, skeleton_detected, counter.repetition_count, counter.target_reached, timestamp
 
-                
-                        smoothed_45 = (smoothed_dx + smoothed_dy) / np.sqrt(2)
-                        smoothed_neg45 = (smoothed_dx - smoothed_dy) / np.sqrt(2)
-                        
-                        
-                        # Store motion along diagonal axes
-                        motion_history_45.append(smoothed_45)
-                        motion_history_neg45.append(smoothed_neg45)
-                        
-                        
-                        # print(smoothed_dx, smoothed_dy, smoothed_45, smoothed_neg45)
-                       
-                        peaks = []  # initialize peaks for transformer logic
-                        
-                        if not use_custom_logic:
-                            # Initialize default direction vector
-                            norm_dx, norm_dy = 0, 0
-                        
-                            # Estimate overall motion direction from variance
-                            if len(motion_history_x) > 3:
-                                variance_x = statistics.variance(motion_history_x)
-                                variance_y = statistics.variance(motion_history_y)
-                                variance_45 = statistics.variance(motion_history_45)
-                                variance_neg45 = statistics.variance(motion_history_neg45)
-                            
-                                variance_array = np.array([variance_x, variance_y, variance_45, variance_neg45])
-                                max_variance_idx = np.argmax(variance_array)
-                                overall_direction = get_direction(
-                                    max_variance_idx, smoothed_dx, smoothed_dy, smoothed_45, smoothed_neg45
-                                )
-                            else:
-                                overall_direction = 0
-
-                            # Track ROM angles for transformer-based exercises
-                            try:
-                                if desired_activity == 'standing_shoulder_abduction':
-                                    left_hip = curr_landmarks[mp.solutions.pose.PoseLandmark.LEFT_HIP.value]
-                                    left_shoulder = curr_landmarks[mp.solutions.pose.PoseLandmark.LEFT_SHOULDER.value]
-                                    left_wrist = curr_landmarks[mp.solutions.pose.PoseLandmark.LEFT_WRIST.value]
-                                    right_hip = curr_landmarks[mp.solutions.pose.PoseLandmark.RIGHT_HIP.value]
-                                    right_shoulder = curr_landmarks[mp.solutions.pose.PoseLandmark.RIGHT_SHOULDER.value]
-                                    right_wrist = curr_landmarks[mp.solutions.pose.PoseLandmark.RIGHT_WRIST.value]
-                                    left_angle = calculate_angle(left_hip, left_shoulder, left_wrist)
-                                    right_angle = calculate_angle(right_hip, right_shoulder, right_wrist)
-                                    current_rep_angles.append(max(left_angle, right_angle))
-                                elif desired_activity == 'standing_shoulder_extension':
-                                    right_hip = curr_landmarks[mp.solutions.pose.PoseLandmark.RIGHT_HIP.value]
-                                    right_shoulder = curr_landmarks[mp.solutions.pose.PoseLandmark.RIGHT_SHOULDER.value]
-                                    right_wrist = curr_landmarks[mp.solutions.pose.PoseLandmark.RIGHT_WRIST.value]
-                                    extension_angle = calculate_angle(right_hip, right_shoulder, right_wrist)
-                                    current_rep_angles.append(extension_angle)
-                            except (IndexError, AttributeError):
-                                pass
-
-                            # Initial trigger guard (prevents instant +1)
-                            if (
-                                current_activity == desired_activity
-                                and len(peaks) == 0
-                                and not first_actvity_detected
-                                and (frame_count - last_count_frame) > min_count_frame_gap
-                                and frame_count > 30  # Wait at least 30 frames (~1 second)
-                                and motion_amplitude > motion_amplitude_threshold  # Require real motion
-                            ):
-                                register_rep()
-                                first_actvity_detected = True
-                                last_count_frame = frame_count
-                                print(
-                                    f"[Repetition] Initial trigger at frame {frame_count}: "
-                                    f"activity={current_activity}, confidence={conf:.3f}, count={repetition_count}"
-                                )
-
-                            # Peak-based counting
-                            motion_distance.append(motion_amplitude * overall_direction)
-                            motion_history_full.append(motion_amplitude * overall_direction)
-
-                            if frame_count > 2 and wait_idx <= 0:
-                                if len(motion_distance) > motion_distance_arr_limit:
-                                    motion_distance.pop(0)
-                        
-                                autocorr = pearson_autocorrelation(np.array(motion_distance))
-                                if np.max(autocorr) != 0:
-                                    autocorr = autocorr / np.max(autocorr)   
-                            
-                                    prominence_threshold = np.max(autocorr) * dynamic_prominence_ratio  
-                                    peaks = []
-                            
-                                    if len(autocorr) > 20:
-                                        autocorr = autocorr[:-20]
-                                
-                                    peaks, properties = find_peaks(
-                                        autocorr,
-                                        height=peak_detect_threshold,
-                                        prominence=prominence_threshold,  
-                                        distance=min_distance,  
-                                        width=2,
-                                    )
-                            
-                                    peak_buffer_limit = 3
-                                
-                                    if (
-                                        motion_amplitude > motion_amplitude_threshold
-                                        and current_activity == desired_activity
-                                        and (frame_count - last_count_frame) > min_count_frame_gap
-                                    ):
-                                        if len(peaks) > prev_peak_array_length and len(peaks) < peak_buffer_limit:
-                                            register_rep()
-                                            last_count_frame = frame_count
-                                            print(
-                                                f"[Repetition] Peak growth detected (len={len(peaks)}, "
-                                                f"prev={prev_peak_array_length}) at frame {frame_count}, "
-                                                f"activity={current_activity}, confidence={conf:.3f}, "
-                                                f"count={repetition_count}"
-                                            )
-                                        elif len(peaks) >= peak_buffer_limit:
-                                            wait_idx = peaks[0]
-                                            motion_distance = motion_distance[wait_idx:]
-                                            register_rep()
-                                            last_count_frame = frame_count
-                                            print(
-                                                f"[Repetition] Peak buffer reached (len={len(peaks)}) "
-                                                f"at frame {frame_count}, activity={current_activity}, "
-                                                f"confidence={conf:.3f}, count={repetition_count}"
-                                            )
-         
-                                        prev_peak_array_length = len(peaks)
-                            
-                            # Display motion vector (transformer mode only)
-                            center_x, center_y = frame.shape[1] // 2, frame.shape[0] // 2
-                            if motion_amplitude and motion_amplitude > motion_amplitude_threshold:
-                                norm_dx = smoothed_dx / motion_amplitude
-                                norm_dy = smoothed_dy / motion_amplitude
-                            else:
-                                norm_dx, norm_dy = 0, 0
-                            cv2.arrowedLine(
-                                frame,
-                                (center_x, center_y),
-                                (int(center_x + norm_dx * motion_amplitude),
-                                 int(center_y + norm_dy * motion_amplitude)),
-                                (0, 0, 255),
-                                3,
-                            )
-                        else:
-                            # Custom-logic exercises: skip transformer auto-counting and arrow overlay
-                            overall_direction = 0
-                            peaks = []
-                                            
-                if motion_amplitude is not None:
-                    current_rep_signal.append(float(motion_amplitude))
-                    current_rep_durations.append(frame_dt)
-
-                if use_custom_logic and custom_detector:
-                    detector_result = custom_detector.update(curr_landmarks)
-                    if isinstance(detector_result, tuple):
-                        rep_completed, rep_angles = detector_result
-                    else:
-                        rep_completed = detector_result
-                        rep_angles = None
-                    if rep_completed:
-                        rom_value = None
-                        if rep_angles and len(rep_angles) >= 2:
-                            rom_value = max(rep_angles) - min(rep_angles)
-                        register_rep(rom_override=rom_value)
-
-                mpDrawing.draw_landmarks(
-                    frame,
-                    results.pose_landmarks,
-                    mp_pose.POSE_CONNECTIONS,
-                    mpDrawing.DrawingSpec(color = (0, 0, 255), thickness = 2, circle_radius = 4),
-                    mpDrawing.DrawingSpec(color = (0, 255, 0), thickness = 2, circle_radius = 0)
-                )
-                     
-                prev_landmarks = curr_landmarks 
-                
-                
-            frame_count+=1
-            
-            if wait_idx > 0:
-                wait_idx -= 1
-            
+        def render(item):
+            """Show one frame; returns True when the session should end."""
+            nonlocal first_frame_shown
+            frame, skeleton_detected, repetition_count, target_reached, captured_at = item
 
-            
-            if stop_event and stop_event.is_set():
+            if stop_event.is_set():
                 print("🛑 Stop signal received, closing windows...")
-                if stop_reason != "target_reached":
-                    stop_reason = "manual_stop"
-                break
-            
-            frame = cv2.resize(frame, (desired_width, desired_height))
-        
-            # Display repetition count (moved to side panel)
-            # cv2.putText(frame, f"Repetitions: {repetition_count}", (30, 50),
-            #             cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2, cv2.LINE_AA)
-
-            # Build right-side info panel
-            panel = np.full((desired_height, info_panel_width, 3), (18, 25, 55), dtype=np.uint8)
-            card_margin_x = 15
-            card_width = info_panel_width - 2 * card_margin_x
-            card_height = 80
-            card_spacing = 15
-            card_y = 30
-
-            pretty_activity = desired_activity.replace('_', ' ').title() if desired_activity else "Unknown"
+                if counter.stop_reason not in ("target_reached", "duration_exceeded"):
+                    counter.stop_reason = "manual_stop"
+                return True
+
             elapsed_time = max(0.0, time.time() - session_start_time)
             elapsed_seconds = int(elapsed_time)
-            timer_text = f"{elapsed_seconds // 60:02}:{elapsed_seconds % 60:02}"
-            reps_display = f"{repetition_count}/{target_value}" if target_value else str(repetition_count)
-
-            time_limit_text = f"{duration_minutes} minutes"
-            panel_sections = [
-                ("Exercise", pretty_activity, (255, 255, 255)),
-                ("Reps", reps_display, (0, 255, 0)),
-                ("Time", timer_text, (0, 255, 255)),
-                ("Time Limit", time_limit_text, (255, 165, 0)),  # Orange color
-            ]
-            detection_text = (
-                "Ensure 1m-2m distance from camera. Skeleton detected. Keep position steady."
-                if skeleton_detected else
-                "Ensure 1m-2m distance from camera. Please ensure your skeleton is fully visible."
-            )
-            detection_color = (0, 255, 0) if skeleton_detected else (0, 0, 255)
-            panel_sections.append(("Detection", detection_text, detection_color))
-
-            for title, value, value_color in panel_sections:
-                y1 = card_y
-                current_height = 120 if title == "Detection" else card_height
-                y2 = y1 + current_height
-                cv2.rectangle(panel, (card_margin_x, y1), (card_margin_x + card_width, y2), (0, 0, 255), 2)
-                cv2.putText(panel, title, (card_margin_x + 10, y1 + 25),
-                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (220, 220, 220), 1, cv2.LINE_AA)
-
-                wrap_width = 26 if title == "Detection" else 18  # Increased for better wrapping with larger font
-                wrapped_lines = textwrap.wrap(value, width=wrap_width) or [value]
-                max_lines = 3 if title == "Detection" else 2
-                # Use smaller font for Detection
-                font_scale = 0.45 if title == "Detection" else 0.55
-                # Adjust line spacing for Detection based on font size
-                line_spacing = 16 if title == "Detection" else 18
-                # Use same font style as header for all panels to match design (thinner, cleaner)
-                font_type = cv2.FONT_HERSHEY_SIMPLEX  # Same as header
-                text_thickness = 1  # Same as header (thinner, cleaner)
-                line_type = cv2.LINE_AA  # Same anti-aliasing as header for smoother text
-                for idx, line in enumerate(wrapped_lines[:max_lines]):
-                    cv2.putText(
-                        panel,
-                        line,
-                        (card_margin_x + 10, y1 + 55 + idx * line_spacing),
-                        font_type,
-                        font_scale,
-                        value_color,
-                        text_thickness,
-                        line_type
-                    )
-
-                card_y = y2 + card_spacing
-
-            display_frame = np.hstack((frame, panel))
-
-            footer_text = "Press 'Q' to pause and save progress"
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 0.55
-            thickness = 1
-            text_size, _ = cv2.getTextSize(footer_text, font, font_scale, thickness)
-            text_x = display_frame.shape[1] - text_size[0] - 20
-            text_y = display_frame.shape[0] - 15
-            cv2.rectangle(
-                display_frame,
-                (text_x - 8, text_y - text_size[1] - 6),
-                (display_frame.shape[1] - 10, text_y + 6),
-                (0, 0, 0),
-                -1
-            )
-            cv2.putText(
-                display_frame,
-                footer_text,
-                (text_x, text_y),
-                font,
-                font_scale,
-                (255, 255, 255),
-                thickness,
-                cv2.LINE_AA
-            )
-        
-            cv2.imshow(window_name, display_frame)
-        
-            if save_video:
-                out.write(display_frame)  # ✅ now frame size matches writer
-               
-            key = cv2.waitKey(10) & 0xFF
+            with stage_metrics.time("render"):
+                display_frame = panel_renderer.render(frame, repetition_count, elapsed_time, skeleton_detected)
+
+                cv2.imshow(window_name, display_frame)
+
+                if recorder is not None and recorder.mode == "composite":
+                    # The panel renderer reuses its output buffer, so the recorder gets a copy
+                    recorder.submit(display_frame, captured_at, copy=True)
+            # Capture-to-display latency, the lag a patient actually sees
+            stage_metrics.observe("end_to_end", max(0.0, time.time() - captured_at))
+            if not first_frame_shown:
+                # Call-to-first-frame latency; small when warm resources were passed in
+                first_frame_shown = True
+                resources.last_start_seconds = time.perf_counter() - call_start
+                stage_metrics.observe("session_start", resources.last_start_seconds)
+
+            key = poll_window_key() & 0xFF
             if key in (ord('q'), ord('Q')):
-                if stop_reason != "target_reached":
-                    stop_reason = "duration_exceeded"  # Use same logic as duration exceeded
-                break
+                # 'Q' pauses and saves progress: end through the same stop_event as /stop
+                if counter.stop_reason != "target_reached":
+                    counter.stop_reason = "duration_exceeded"  # Use same logic as duration exceeded
+                stop_event.set()
+                return False
 
             # Check if duration limit exceeded
             duration_seconds = duration_minutes * 60
             if elapsed_time >= duration_seconds:
-                stop_reason = "duration_exceeded"
+                counter.stop_reason = "duration_exceeded"
                 print(f"[Duration] Time limit exceeded ({elapsed_seconds}s / {duration_seconds}s). Completed {repetition_count} reps.")
-                break
+                return True
 
             if target_reached:
-                print(f"[Target] Desired repetitions reached ({repetition_count}/{target_value}).")
-                break
-        counting_results.append(repetition_count)
-        print("Current exercise : ", activitiesName[resultIndex], " total repetitions counted : ", repetition_count)
-            
-       
-        window_size = 200
-        entropy_repeat = compute_entropy(motion_history_full, window_size)
-        
+                print(f"[Target] Desired repetitions reached ({repetition_count}/{counter.target_value}).")
+                return True
+            return False
+
+        if inference_process:
+            remote = None
+            remote_scores = None
+            # Latest scores from the inference process, and how often the counter's schedule ran without fresh ones
+            remote_state = {"last_scores": None, "misses": 0}
+
+            def remote_predict(window):
+                # Scores the inference process computed for this frame's window. The
+                # classifier only lives in the inference process: when its schedule
+                # did not run on this frame, reuse its previous scores (None until it
+                # has produced any, which leaves the label unchanged).
+                if remote_scores is not None:
+                    remote_state["last_scores"] = remote_scores
+                    return remote_scores
+                remote_state["misses"] += 1
+                return remote_state["last_scores"]
+
+            counter.predict = remote_predict
+            try:
+                exhausted = False
+                while True:
+                    if stop_event.is_set():
+                        print("🛑 Stop signal received, exiting loop...")
+                        break
+                    # Keep the inference process fed, reading frames straight into free shared buffers
+                    while not exhausted and (remote is None or remote.in_flight < INFERENCE_QUEUE_DEPTH):
+                        item = capture() if remote is None else capture_into(remote)
+                        if item is END:
+                            exhausted = True
+                        elif remote is None:
+                            timestamp, frame = item
+                            remote = InferenceProcess(
+                                functools.partial(
+                                    RemoteInference,
+                                    adaptive_quality=adaptive_quality,
+                                    target_fps=target_fps,
+                                    classifier_schedule=counter.schedule.settings(),
+                                    classify=not counter.use_custom_logic,
+                                    window_size=counter.noOfFrameSize,
+                                    landmark_count=counter.lastLandmarkPoint,
+                                ),
+                                frame.shape,
+                                slots=INFERENCE_QUEUE_DEPTH + 2,
+                            ).start()
+                            slot = remote.acquire()
+                            remote.frame(slot)[...] = frame
+                            remote.submit(slot, timestamp)
+                    if remote is None or remote.in_flight == 0:
+                        break
+                    slot, timestamp, output = remote.result()
+                    if output is None:
+                        # Skipped by the inference process to catch up with the camera
+                        remote.release(slot)
+                        continue
+                    image_landmarks, world_landmarks, remote_scores, quality_change, pose_seconds = output
+                    stage_metrics.observe("pose", pose_seconds)
+                    if quality_change is not None:
+                        announce_quality(*quality_change)
+                    try:
+                        done = render(count((timestamp, remote.frame(slot), image_landmarks, world_landmarks, None)))
+                    finally:
+                        remote.release(slot)
+                    if done:
+                        break
+            finally:
+                if remote is not None:
+                    print(f"[InferenceProcess] {remote.stats()}")
+                    remote.close()
+                if remote_state["misses"]:
+                    print(f"[InferenceProcess] {remote_state['misses']} scheduled classifier runs had no "
+                          f"scores from the inference process; reused the previous ones")
+        elif pipelined:
+            pipeline = (
+                FramePipeline()
+                .add_stage("capture", capture, maxsize=1, drop_stale=True)
+                .add_stage("pose", estimate, maxsize=4, drop_stale=False)
+                .add_stage("classify", count, maxsize=1, drop_stale=True, last=lambda item: item[3])
+                .start()
+            )
+            if on_pipeline is not None:
+                on_pipeline(pipeline)
+            try:
+                for item in pipeline.results():
+                    if render(item):
+                        break
+                    if stop_event.is_set():
+                        print("🛑 Stop signal received, exiting loop...")
+                        break
+            finally:
+                if not pipeline.stop():
+                    print("[Pipeline] Waiting for stages still running before closing the recording")
+            if pipeline.error is not None:
+                raise pipeline.error
+            print(f"[Pipeline] {pipeline.stats()}")
+        else:
+            while True:
+                if stop_event.is_set():
+                    print("🛑 Stop signal received, exiting loop...")
+                    break
+                item = capture()
+                if item is END:
+                    break
+                if render(count(estimate(item))):
+                    break
+
+        counting_results.append(counter.repetition_count)
+        print("Current exercise : ", activitiesName[counter.resultIndex], " total repetitions counted : ", counter.repetition_count)
+        # Custom-detector sessions never need the classifier; don't load it just to report latency
+        latency = classifier_loader.get().latency_stats() if classifier_loader.state == "ready" else {"mean_ms": None}
+        if latency["mean_ms"] is not None:
+            print(
+                f"[Classifier] {latency['calls']} calls, mean={latency['mean_ms']:.2f}ms, "
+                f"p50={latency['p50_ms']:.2f}ms, p99={latency['p99_ms']:.2f}ms"
+            )
+
+        summary = counter.summary()
+        if session_analytics:
+            window_size = 200
+            with stage_metrics.time("session_analytics"):
+                entropy_repeat = compute_entropy(counter.motion_history_full.to_array(), window_size)
+            summary["motion_entropy"] = entropy_repeat.tolist()
+        counter.close()
+
+
 
-        
         # try:
         #     # Plot the motion
         #     plt.figure(figsize=(10, 5))
@@ -1186,35 +1397,383 @@ def process_video(activity=None, stop_event=None, target_reps=None, initial_reps
     
         # except Exception as e:
         #     print(e)
-        
 
-        cap.release()
         cv2.destroyAllWindows()
-        
-        print(desired_activity)
+
+        print(activity)
         print(counting_results)
-        
-        if save_video:
-            out.release()   # 🔹 Important! Finalize and save the file
+
+        return summary
+    finally:
+        if pipeline is not None:
+            # The classify stage submits to the recorder and the session log; let it finish first
+            pipeline.join()
+        if recorder is not None:
+            recorder.close()   # 🔹 Important! Flush queued frames and finalize the file
             print(f"✅ Saved video at: {output_video_path}")
-        
+        if log_writer is not None:
+            log_writer.close()
+        if owns_resources:
+            resources.close()
+
+
+def iter_video_frames(path):
+    """Yield BGR frames from a video file, releasing the capture when done."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video source: {path}")
+    try:
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+    finally:
+        cap.release()
 
+
+def process_video_offline(source, activity=None, target_reps=None, initial_reps=0, fps=None,
+                          duration_minutes=None, classifier_stride=1, stop_event=None, on_event=None,
+                          session_log=None, pose=None, classifier_schedule=None):
+    """
+    Run recognition and counting over recorded frames with no window or overlay drawing.
+
+    Frames are processed as fast as the CPU allows; timestamps come from the
+    frame index and ``fps`` so SPARC and rep durations match the recording
+    rather than processing speed.
+
+    Args:
+        source (str | Iterable[np.ndarray]): Video file path or an iterable of BGR frames.
+        activity (str | None): Desired activity to recognize (defaults to ``desired_activity``).
+        target_reps (int | None): Optional reps target; stops once reached.
+        initial_reps (int): Initial repetition count (for resuming).
+        fps (float | None): Frame rate of the source. Defaults to the file's
+            ``CAP_PROP_FPS``, or 30 for frame iterators.
+        duration_minutes (float | None): Optional limit on processed video time.
+        classifier_stride (int): Run the activity classifier every N frames.
+        classifier_schedule (dict | None): Further classifier schedule settings, as for ``process_video``.
+        stop_event (threading.Event | None): Optional event to abort early.
+        on_event (callable | None): Live rep and classifier events, as for ``process_video``.
+        session_log (str | None): Directory for a replayable SessionLog, as for ``process_video``.
+        pose (mediapipe Pose | None): Pose graph to reuse across calls (it is reset
+            and left open), e.g. one per bulk re-scoring worker. By default one is
+            created for this call.
+
+    Returns:
+        dict: Same session summary as ``process_video``.
+    """
+    activity = activity or desired_activity
+
+    if isinstance(source, (str, os.PathLike)):
+        if fps is None:
+            probe = cv2.VideoCapture(os.fspath(source))
+            fps = probe.get(cv2.CAP_PROP_FPS)
+            probe.release()
+        frames = iter_video_frames(os.fspath(source))
+    else:
+        frames = iter(source)
+    if not fps or fps <= 0:
+        fps = 30.0
+
+    counter = ExerciseCounter(
+        activity,
+        target_reps=target_reps,
+        initial_reps=initial_reps,
+        classifier_stride=classifier_stride,
+        on_event=on_event,
+        classifier_schedule=classifier_schedule,
+    )
+    duration_seconds = duration_minutes * 60 if duration_minutes else None
+    log_writer = None
+
+    owns_pose = pose is None
+    if owns_pose:
+        pose = mp.solutions.pose.Pose(min_detection_confidence=0.9, min_tracking_confidence=0.9)
+    else:
+        # Don't carry tracking state over from the previous recording
+        pose.reset()
+    try:
+        for frame_index, frame in enumerate(frames):
+            if stop_event and stop_event.is_set():
+                if counter.stop_reason != "target_reached":
+                    counter.stop_reason = "manual_stop"
+                break
+
+            timestamp = frame_index / fps
+            with stage_metrics.time("pose"):
+                results = pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+            with stage_metrics.time("landmarks"):
+                image_landmarks, world_landmarks = pose_results_to_arrays(results)
+            counter.process_frame(timestamp, image_landmarks, world_landmarks, frame.shape[1], frame.shape[0])
+            if frame_index == 0:
+                log_writer = open_session_log(session_log, counter, frame.shape)
+            if log_writer is not None:
+                log_writer.append(timestamp, image_landmarks, world_landmarks, counter.class_scores)
+
+            if duration_seconds is not None and timestamp >= duration_seconds:
+                counter.stop_reason = "duration_exceeded"
+                break
+
+            if counter.target_reached:
+                break
+    finally:
+        if log_writer is not None:
+            log_writer.close()
+        if owns_pose:
+            pose.close()
+
+    counter.close()
+    return counter.summary()
+
+
+def replay_session_log(log, activity=None, target_reps=None, initial_reps=None, classifier_stride=None,
+                       logged_scores=True, on_event=None, classifier_schedule=None):
+    """
+    Re-run counting over a recorded session log, with no camera, video decoding or MediaPipe.
+
+    Frames are fed through ExerciseCounter with their recorded timestamps and
+    frame size. Session settings default to the ones stored in the log, so a
+    replay with no overrides reproduces the recorded session; pass others to
+    re-score the same movement differently.
+
+    Args:
+        log (str | SessionLog): Log directory or an opened SessionLog.
+        activity (str | None): Activity to count (defaults to the logged one).
+        target_reps (int | None): Reps target (defaults to the logged one).
+        initial_reps (int | None): Initial repetition count (defaults to the logged one).
+        classifier_stride (int | None): Classifier stride (defaults to the logged one).
+        classifier_schedule (dict | None): Classifier schedule settings (default
+            to the logged ones); a "stride" here overrides ``classifier_stride``.
+        logged_scores (bool): Use the classifier scores stored in the log
+            instead of running the model; frames without stored scores still
+            run the model. False re-classifies every window.
+        on_event (callable | None): Rep and classifier events, as for ``process_video``.
+
+    Returns:
+        dict: Same session summary as ``process_video``.
+    """
+    if not isinstance(log, SessionLog):
+        log = SessionLog(log)
+    meta = log.meta
+    frame_index = 0
+    logged_schedule = dict(meta.get("classifier_schedule") or {})
+    if classifier_stride:
+        # An explicit stride wins over the logged schedule's
+        logged_schedule.pop("stride", None)
+
+    def predict_logged(window):
+        # Called from process_frame below, for the frame at frame_index
+        scores = log.class_scores[frame_index]
+        if np.isnan(scores).any():
+            return classifier_loader.get().predict(window)
+        return np.array(scores)
+
+    counter = ExerciseCounter(
+        activity or meta.get("activity") or desired_activity,
+        target_reps=target_reps if target_reps is not None else meta.get("target_reps"),
+        initial_reps=initial_reps if initial_reps is not None else meta.get("initial_reps", 0),
+        classifier_stride=classifier_stride or meta.get("classifier_stride", 1),
+        on_event=on_event,
+        predict=predict_logged if logged_scores else None,
+        classifier_schedule=classifier_schedule if classifier_schedule is not None else logged_schedule,
+    )
+    for frame_index in range(len(log)):
+        timestamp, image_landmarks, world_landmarks, _ = log.frame(frame_index)
+        counter.process_frame(timestamp, image_landmarks, world_landmarks, log.frame_width, log.frame_height)
+        if counter.target_reached:
+            break
+
+    counter.close()
+    return counter.summary()
+
+
+class IngestorClosed(RuntimeError):
+    """Raised for frames pushed after a push session has ended."""
+
+
+class FrameIngestor:
+    """
+    Feeds frames pushed by a client (JPEG images or precomputed landmarks) into an
+    ExerciseCounter and reports incremental progress after each frame.
+
+    Clients that run pose estimation themselves send landmarks only; JPEG frames
+    are run through a MediaPipe Pose graph owned by this ingestor.
+
+    While ``serve()`` runs (on the session's worker), request threads only queue
+    frames and wait for their update: decoding, pose estimation and counting all
+    happen on the serving thread, so the session's work stays within its worker
+    slot. Without a serving thread, frames are processed on the calling thread.
+    """
+
+    def __init__(self, activity, target_reps=None, initial_reps=0, classifier_stride=1, on_event=None,
+                 classifier_schedule=None):
+        self.counter = ExerciseCounter(
+            activity,
+            target_reps=target_reps,
+            initial_reps=initial_reps,
+            classifier_stride=classifier_stride,
+            on_event=on_event,
+            classifier_schedule=classifier_schedule,
+        )
+        self._pose = None
+        self._lock = threading.Lock()
+        self._jobs = queue.Queue()
+        self._jobs_lock = threading.Lock()
+        self._serving = False
+        self._closed = False
+
+    def _update(self, skeleton_detected, reps_before):
+        counter = self.counter
         return {
-            "repetition_count": repetition_count,
-            "target_reached": target_reached,
-            "target_reps": target_value,
-            "stop_reason": stop_reason,
-            "activity": desired_activity,
-            "rep_sparc_scores": rep_sparc_scores,
-            "rep_rom_scores": rep_rom_scores,
-            "repetition_times": rep_durations,
+            "frame": counter.frame_count,
+            "skeleton_detected": skeleton_detected,
+            "reps": counter.repetition_count,
+            "new_reps": counter.repetition_count - reps_before,
+            "target_reps": counter.target_value,
+            "target_reached": counter.target_reached,
+            "current_activity": counter.current_activity,
         }
 
+    def _submit(self, work, *args):
+        job = None
+        with self._jobs_lock:
+            if self._closed:
+                raise IngestorClosed("Session is no longer accepting frames")
+            if self._serving:
+                job = Future()
+                self._jobs.put((job, work, args))
+        if job is None:
+            with self._lock:
+                return work(*args)
+        return job.result()
+
+    def serve(self, stop_event, idle_timeout=None, deadline=None, poll_seconds=0.25):
+        """
+        Process queued frames on the calling thread until the session ends.
+
+        The session ends when ``stop_event`` is set, the target is reached, no
+        frame has arrived for ``idle_timeout`` seconds, or ``deadline``
+        (time.monotonic()) passes. Frames still queued at the end are rejected
+        with IngestorClosed.
+
+        Args:
+            stop_event (threading.Event): Manual stop.
+            idle_timeout (float | None): Seconds without frames before stopping.
+            deadline (float | None): time.monotonic() value at which to stop.
+            poll_seconds (float): Longest wait for a frame between checks.
+        """
+        counter = self.counter
+        with self._jobs_lock:
+            self._serving = not self._closed
+        last_frame = time.monotonic()
+        try:
+            while self._serving:
+                if stop_event.is_set():
+                    if counter.stop_reason != "target_reached":
+                        counter.stop_reason = "manual_stop"
+                    break
+                if counter.target_reached:
+                    break
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    counter.stop_reason = "duration_exceeded"
+                    break
+                if idle_timeout is not None and now - last_frame >= idle_timeout:
+                    counter.stop_reason = "idle_timeout"
+                    break
+                wait = poll_seconds
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                if idle_timeout is not None:
+                    wait = min(wait, idle_timeout - (now - last_frame))
+                try:
+                    job, work, args = self._jobs.get(timeout=max(wait, 0.0))
+                except queue.Empty:
+                    continue
+                last_frame = time.monotonic()
+                if not job.set_running_or_notify_cancel():
+                    continue
+                try:
+                    with self._lock:
+                        job.set_result(work(*args))
+                except Exception as exc:
+                    job.set_exception(exc)
+        finally:
+            self._stop_accepting()
+
+    def _stop_accepting(self):
+        with self._jobs_lock:
+            self._closed = True
+            self._serving = False
+        while True:
+            try:
+                job, _, _ = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            job.set_exception(IngestorClosed("Session is no longer accepting frames"))
+
+    def push_landmarks(self, image_landmarks, world_landmarks=None, timestamp=None,
+                       frame_width=640, frame_height=480):
+        """
+        Process one frame of precomputed landmarks.
+
+        Args:
+            image_landmarks (array-like | None): (33, 4) normalized image landmarks
+                (x, y, z, visibility), or None if no skeleton was found.
+            world_landmarks (array-like | None): (33, 4) world landmarks; required for
+                classifier-based activities, optional for custom detectors.
+            timestamp (float | None): Capture time in seconds (defaults to arrival time).
+            frame_width (int): Width in pixels of the frame the landmarks came from.
+            frame_height (int): Height in pixels of the frame the landmarks came from.
+        """
+        image_landmarks = _as_landmark_array(image_landmarks)
+        world_landmarks = _as_landmark_array(world_landmarks)
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        return self._submit(self._count, timestamp, image_landmarks, world_landmarks, frame_width, frame_height)
+
+    def push_jpeg(self, data, timestamp=None):
+        """Decode one JPEG frame, run pose estimation on it and process the landmarks."""
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        return self._submit(self._process_jpeg, data, timestamp)
+
+    def _process_jpeg(self, data, timestamp):
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError("Could not decode JPEG frame")
+        if self._pose is None:
+            self._pose = mp.solutions.pose.Pose(min_detection_confidence=0.9, min_tracking_confidence=0.9)
+        with stage_metrics.time("pose"):
+            results = self._pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        with stage_metrics.time("landmarks"):
+            image_landmarks, world_landmarks = pose_results_to_arrays(results)
+        return self._count(timestamp, image_landmarks, world_landmarks, frame.shape[1], frame.shape[0])
+
+    def _count(self, timestamp, image_landmarks, world_landmarks, frame_width, frame_height):
+        reps_before = self.counter.repetition_count
+        skeleton_detected = self.counter.process_frame(
+            timestamp, image_landmarks, world_landmarks, frame_width, frame_height
+        )
+        return self._update(skeleton_detected, reps_before)
 
+    def summary(self):
+        with self._lock:
+            return self.counter.summary()
 
+    def close(self):
+        self._stop_accepting()
+        with self._lock:
+            self.counter.close()
+            if self._pose is not None:
+                self._pose.close()
+                self._pose = None
 
-    
-    
-    
-    
-    
\ No newline at end of file
+
+def _as_landmark_array(landmarks):
+    if landmarks is None:
+        return None
+    array = np.asarray(landmarks, dtype=np.float64)
+    if array.size == 0:
+        return None
+    if array.shape != (33, 4):
+        array = array.reshape(33, 4)
+    return array
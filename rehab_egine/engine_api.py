@@ -1,86 +1,127 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
-import threading
+import base64
+import json
+import os
+import time
 
-from engine import process_video
+import numpy as np
+
+from engine import (
+    ADAPTIVE_CLASSIFIER_SCHEDULE,
+    CameraResources,
+    FrameIngestor,
+    IngestorClosed,
+    classifier_loader,
+    process_video,
+    process_video_offline,
+)
+from engine_worker import CameraWorker
+from metrics import prometheus_text
+from session_manager import SessionError, SessionManager
 
 app = Flask(__name__)
 CORS(app)
 
-state_lock = threading.Lock()
-engine_state = {
-    "is_running": False,
-    "current_activity": None,
-    "current_reps": 0,
-    "target_reps": None,
-    "target_reached": False,
-    "stop_reason": None,
-    "thread": None,
-    "stop_event": None,
-    "rep_sparc_scores": [],
-    "rep_rom_scores": [],
-    "repetition_times": [],
-}
-
-
-def _run_engine(activity, target_reps, resume_reps, duration_minutes, stop_event):
-    """Worker that runs the engine loop in a background thread."""
-    try:
-        result = process_video(
-            activity=activity,
-            stop_event=stop_event,
-            target_reps=target_reps,
-            initial_reps=resume_reps,
-            duration_minutes=duration_minutes,
+# Camera and pose graphs stay open between camera sessions
+camera_worker = CameraWorker(CameraResources, process_video)
+
+# Push sessions end after this many seconds without a frame
+PUSH_IDLE_SECONDS = float(os.environ.get("REHAB_ENGINE_PUSH_IDLE_SECONDS") or 30)
+
+# Sessions classify on the adaptive schedule; REHAB_ENGINE_ADAPTIVE_CLASSIFIER=0 classifies every frame
+CLASSIFIER_SCHEDULE = (
+    ADAPTIVE_CLASSIFIER_SCHEDULE if os.environ.get("REHAB_ENGINE_ADAPTIVE_CLASSIFIER", "1") != "0" else None
+)
+
+
+def _run_engine(session):
+    """Worker that runs one session's engine loop on the session pool."""
+    if session.input_mode == "push":
+        # Frames arrive through /sessions/<id>/frames and are processed here, on the worker slot
+        deadline = None
+        if session.duration_minutes:
+            deadline = time.monotonic() + session.duration_minutes * 60
+        session.ingestor.serve(session.stop_event, idle_timeout=PUSH_IDLE_SECONDS, deadline=deadline)
+        session.ingestor.close()
+        return session.ingestor.summary()
+    if session.input_mode == "file":
+        return process_video_offline(
+            session.source,
+            activity=session.activity,
+            target_reps=session.target_reps,
+            initial_reps=session.resume_reps,
+            stop_event=session.stop_event,
+            on_event=session.handle_engine_event,
+            classifier_schedule=CLASSIFIER_SCHEDULE,
         )
-        rep_sparc_scores = []
-        rep_rom_scores = []
-        repetition_times = []
-        if isinstance(result, dict):
-            reps = int(result.get("repetition_count", 0) or 0)
-            target_reached = bool(result.get("target_reached"))
-            stop_reason = result.get("stop_reason")
-            rep_sparc_scores = result.get("rep_sparc_scores", []) or []
-            rep_rom_scores = result.get("rep_rom_scores", []) or []
-            repetition_times = result.get("repetition_times", []) or []
-        else:
-            reps = int(result or 0)
-            target_reached = False
-            stop_reason = None
-            rep_sparc_scores = []
-            rep_rom_scores = []
-            repetition_times = []
-        with state_lock:
-            engine_state["current_reps"] = reps
-            engine_state["target_reached"] = target_reached
-            engine_state["rep_sparc_scores"] = rep_sparc_scores
-            engine_state["rep_rom_scores"] = rep_rom_scores
-            engine_state["repetition_times"] = repetition_times
-            if stop_reason:
-                engine_state["stop_reason"] = stop_reason
-    except Exception as exc:
-        print(f"[Rehab Engine] Error: {exc}")
-        with state_lock:
-            engine_state["stop_reason"] = "error"
-            engine_state["rep_sparc_scores"] = []
-            engine_state["rep_rom_scores"] = []
-            engine_state["repetition_times"] = []
-    finally:
-        with state_lock:
-            engine_state["is_running"] = False
-            engine_state["current_activity"] = None
-            engine_state["thread"] = None
-            engine_state["stop_event"] = None
+    return camera_worker.run_session(
+        activity=session.activity,
+        stop_event=session.stop_event,
+        target_reps=session.target_reps,
+        initial_reps=session.resume_reps,
+        duration_minutes=session.duration_minutes,
+        on_pipeline=session.attach_pipeline,
+        on_event=session.handle_engine_event,
+        classifier_schedule=CLASSIFIER_SCHEDULE,
+    )
+
+
+sessions = SessionManager(_run_engine)
+
+SSE_KEEPALIVE_SECONDS = 15
+
+# File sessions may only read recordings under this directory
+MEDIA_DIR = os.path.realpath(
+    os.environ.get("REHAB_ENGINE_MEDIA_DIR")
+    or os.path.join(os.path.dirname(os.path.abspath(__file__)), "recordings")
+)
+
+
+def _request_value(name):
+    payload = request.get_json(silent=True) or {}
+    return request.args.get(name) or payload.get(name)
+
+
+def _resolve_media_path(source, media_dir=None):
+    """
+    Resolve a client-supplied video path inside the media directory.
+
+    Relative paths are taken from the media directory; symlinks and ``..`` are
+    resolved before the check, so a path cannot escape it.
+
+    Args:
+        source (str): Path sent by the client.
+        media_dir (str | None): Allowed directory (defaults to MEDIA_DIR).
+
+    Returns:
+        str | None: The real path of the file, or None if it is outside the
+        media directory or not a file.
+    """
+    root = os.path.realpath(media_dir or MEDIA_DIR)
+    if not isinstance(source, str) or not source or "\x00" in source:
+        return None
+    path = os.path.realpath(os.path.join(root, source))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+
+def _session_error_response(exc):
+    body = {"error": exc.message}
+    body.update(exc.details)
+    return jsonify(body), exc.status_code
 
 
 @app.route("/start", methods=["POST"])
 def start_recognition():
-    """Start real-time recognition for a given activity."""
-    payload = request.get_json(silent=True) or {}
-    activity = request.args.get("activity") or payload.get("activity")
-    raw_target = request.args.get("target_reps") or payload.get("target_reps")
-    raw_resume_reps = request.args.get("resume_reps") or payload.get("resume_reps")
-    raw_duration_minutes = request.args.get("duration_minutes") or payload.get("duration_minutes")
+    """Start a recognition session for a given activity."""
+    activity = _request_value("activity")
+    raw_target = _request_value("target_reps")
+    raw_resume_reps = _request_value("resume_reps")
+    raw_duration_minutes = _request_value("duration_minutes")
+    source = _request_value("source")
+    input_mode = _request_value("input") or ("file" if source is not None else "camera")
     target_reps = None
     resume_reps = 0
     duration_minutes = 1  # Default to 1 minute
@@ -112,36 +153,41 @@ def start_recognition():
     if not activity:
         return jsonify({"error": "Missing activity parameter"}), 400
 
-    with state_lock:
-        if engine_state["is_running"]:
-            return jsonify({
-                "error": "Engine is already running",
-                "current_activity": engine_state["current_activity"],
-            }), 409
-
-        stop_event = threading.Event()
-        engine_state["is_running"] = True
-        engine_state["current_activity"] = activity
-        engine_state["current_reps"] = 0
-        engine_state["target_reps"] = target_reps
-        engine_state["target_reached"] = False
-        engine_state["stop_reason"] = None
-        engine_state["stop_event"] = stop_event
-        engine_state["resume_reps"] = resume_reps
-        engine_state["rep_sparc_scores"] = []
-        engine_state["rep_rom_scores"] = []
-        engine_state["repetition_times"] = []
-
-        thread = threading.Thread(
-            target=_run_engine,
-            args=(activity, target_reps, resume_reps, duration_minutes, stop_event),
-            daemon=True,
+    if input_mode not in ("camera", "file", "push"):
+        return jsonify({"error": "input must be one of camera, file, push"}), 400
+
+    if input_mode == "file":
+        source = _resolve_media_path(source)
+        if source is None:
+            return jsonify({"error": "source must be a video file in the engine's media directory"}), 400
+
+    def attach_ingestor(session):
+        if session.input_mode == "push":
+            session.ingestor = FrameIngestor(
+                activity,
+                target_reps=target_reps,
+                initial_reps=resume_reps,
+                on_event=session.handle_engine_event,
+                classifier_schedule=CLASSIFIER_SCHEDULE,
+            )
+
+    try:
+        session = sessions.start(
+            activity,
+            target_reps=target_reps,
+            resume_reps=resume_reps,
+            duration_minutes=duration_minutes,
+            source=source if input_mode == "file" else None,
+            input_mode=input_mode,
+            prepare=attach_ingestor,
         )
-        engine_state["thread"] = thread
-        thread.start()
+    except SessionError as exc:
+        return _session_error_response(exc)
 
     return jsonify({
         "message": "Recognition started",
+        "session_id": session.session_id,
+        "input_mode": session.input_mode,
         "activity": activity,
         "target_reps": target_reps,
         "resume_reps": resume_reps,
@@ -151,67 +197,276 @@ def start_recognition():
 
 @app.route("/stop", methods=["POST"])
 def stop_recognition():
-    """Stop the current recognition session."""
-    with state_lock:
-        if not engine_state["is_running"]:
-            return jsonify({"error": "Engine is not running"}), 409
-
-        stop_event = engine_state["stop_event"]
-        thread = engine_state["thread"]
-
-        if stop_event:
-            stop_event.set()
-
-    if thread and thread.is_alive():
-        thread.join(timeout=2.0)
-
-    with state_lock:
-        engine_state["is_running"] = False
-        engine_state["current_activity"] = None
-        engine_state["thread"] = None
-        engine_state["stop_event"] = None
-        if not engine_state["stop_reason"]:
-            engine_state["stop_reason"] = "manual_stop"
-        engine_state["target_reached"] = engine_state["stop_reason"] == "target_reached"
-        response_payload = {
-            "message": "Recognition stopped",
-            "final_reps": engine_state["current_reps"],
-            "target_reps": engine_state["target_reps"],
-            "target_reached": engine_state["target_reached"],
-            "stop_reason": engine_state["stop_reason"],
-            "rep_sparc_scores": engine_state.get("rep_sparc_scores", []),
-            "rep_rom_scores": engine_state.get("rep_rom_scores", []),
-            "repetition_times": engine_state.get("repetition_times", []),
-        }
-
-    return jsonify(response_payload), 200
+    """Stop a recognition session (the most recent one when no session_id is given)."""
+    try:
+        session = sessions.stop(_request_value("session_id"))
+    except SessionError as exc:
+        return _session_error_response(exc)
+
+    status = session.snapshot()
+    response_payload = {
+        # A worker that outlives the stop timeout keeps the session (and camera) until it returns
+        "message": "Recognition stopping" if status["stopping"] else "Recognition stopped",
+        "session_id": status["session_id"],
+        "stopping": status["stopping"],
+        "final_reps": status["current_reps"],
+        "target_reps": status["target_reps"],
+        "target_reached": status["target_reached"],
+        "stop_reason": status["stop_reason"],
+        "rep_sparc_scores": status["rep_sparc_scores"],
+        "rep_rom_scores": status["rep_rom_scores"],
+        "repetition_times": status["repetition_times"],
+    }
+
+    return jsonify(response_payload), 202 if status["stopping"] else 200
 
 
 @app.route("/status", methods=["GET"])
 def get_status():
-    """Return current engine status."""
-    with state_lock:
+    """Return status for one session (the most recent one when no session_id is given)."""
+    session_id = request.args.get("session_id")
+    session = sessions.get(session_id)
+    if session is None:
+        if session_id:
+            return jsonify({"error": "Unknown session"}), 404
         return jsonify({
-            "is_running": engine_state["is_running"],
-            "current_activity": engine_state["current_activity"],
-            "current_reps": engine_state["current_reps"],
-            "target_reps": engine_state["target_reps"],
-            "target_reached": engine_state["target_reached"],
-            "stop_reason": engine_state["stop_reason"],
-            "rep_sparc_scores": engine_state.get("rep_sparc_scores", []),
-            "rep_rom_scores": engine_state.get("rep_rom_scores", []),
-            "repetition_times": engine_state.get("repetition_times", []),
+            "session_id": None,
+            "is_running": False,
+            "current_activity": None,
+            "current_reps": 0,
+            "target_reps": None,
+            "target_reached": False,
+            "stop_reason": None,
+            "rep_sparc_scores": [],
+            "rep_rom_scores": [],
+            "repetition_times": [],
+            "queue_depths": None,
         }), 200
+    return jsonify(session.snapshot()), 200
+
+
+def _sse(kind, data, event_id=None):
+    id_line = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{id_line}event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.route("/events", methods=["GET"])
+@app.route("/sessions/<session_id>/events", methods=["GET"])
+def stream_events(session_id=None):
+    """
+    Server-sent event stream for one session (the most recent one by default).
+
+    Opens with a "status" event holding the current snapshot, then pushes
+    "rep" (count, per-rep SPARC/ROM/duration), "classification" (label and
+    confidence) and a final "end" event when the session finishes. Clients
+    reconnecting with Last-Event-ID resume from the retained history.
+    """
+    session_id = session_id or request.args.get("session_id")
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown session" if session_id else "No session has been started"}), 404
+
+    last_event_id = request.headers.get("Last-Event-ID", type=int)
+    subscription = session.events.subscribe(last_event_id)
+    snapshot = session.snapshot()
+
+    def generate():
+        try:
+            yield _sse("status", snapshot)
+            while True:
+                try:
+                    event = subscription.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except EOFError:
+                    return
+                if event is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event["event"], event["data"], event["id"])
+        finally:
+            subscription.close()
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+@app.route("/sessions", methods=["GET"])
+def list_sessions():
+    """List known sessions and the worker budget."""
+    known = [session.snapshot() for session in sessions.sessions()]
+    return jsonify({
+        "max_sessions": sessions.max_sessions,
+        "active": sum(1 for status in known if status["is_running"]),
+        "sessions": known,
+    }), 200
+
+
+def _ingest_json_frame(ingestor, item):
+    """Feed one JSON frame: {"jpeg": base64} or {"landmarks": 33x4, "world_landmarks": 33x4}."""
+    if not isinstance(item, dict):
+        raise TypeError("Each frame must be a JSON object")
+    timestamp = item.get("timestamp")
+    if item.get("jpeg"):
+        return ingestor.push_jpeg(base64.b64decode(item["jpeg"]), timestamp=timestamp)
+    return ingestor.push_landmarks(
+        item.get("landmarks"),
+        item.get("world_landmarks"),
+        timestamp=timestamp,
+        frame_width=int(item.get("width", 640)),
+        frame_height=int(item.get("height", 480)),
+    )
+
+
+def _finish_if_target_reached(session, update):
+    session.update_progress(session.ingestor.summary())
+    if update["target_reached"]:
+        session.stop_event.set()
+
+
+@app.route("/sessions/<session_id>/frames", methods=["POST"])
+def ingest_frames(session_id):
+    """
+    Push frames into a session started with input=push.
+
+    Accepted bodies:
+      - image/jpeg: one camera frame (pose estimation runs on the server)
+      - application/octet-stream: float32 landmarks, 33x4 image (+ optional 33x4 world)
+      - application/json: one frame object, or {"frames": [...]}
+      - application/x-ndjson: one frame object per line; the response streams one
+        update per line as each frame is processed
+    Each update carries the running rep count and how many reps the frame added.
+    """
+    session = sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown session"}), 404
+    if session.input_mode != "push" or session.ingestor is None:
+        return jsonify({"error": "Session does not accept pushed frames"}), 409
+    if not session.snapshot()["is_running"]:
+        return jsonify({"error": "Engine is not running", "session_id": session_id}), 409
+
+    ingestor = session.ingestor
+    content_type = (request.mimetype or "").lower()
+
+    try:
+        if content_type == "image/jpeg":
+            update = ingestor.push_jpeg(request.get_data(), timestamp=request.args.get("timestamp", type=float))
+        elif content_type == "application/octet-stream":
+            values = np.frombuffer(request.get_data(), dtype="<f4")
+            if values.size not in (132, 264):
+                return jsonify({"error": "expected 132 or 264 float32 values"}), 400
+            update = ingestor.push_landmarks(
+                values[:132].reshape(33, 4),
+                values[132:].reshape(33, 4) if values.size == 264 else None,
+                timestamp=request.args.get("timestamp", type=float),
+                frame_width=request.args.get("width", 640, type=int),
+                frame_height=request.args.get("height", 480, type=int),
+            )
+        elif content_type == "application/x-ndjson":
+            def generate():
+                for line in request.stream:
+                    if not line.strip():
+                        continue
+                    try:
+                        update = _ingest_json_frame(ingestor, json.loads(line))
+                    except (ValueError, TypeError) as exc:
+                        yield json.dumps({"error": str(exc)}) + "\n"
+                        continue
+                    except IngestorClosed as exc:
+                        yield json.dumps({"error": str(exc)}) + "\n"
+                        break
+                    _finish_if_target_reached(session, update)
+                    yield json.dumps(update) + "\n"
+                    if update["target_reached"]:
+                        break
+
+            return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+        else:
+            payload = request.get_json(silent=True)
+            if not isinstance(payload, dict):
+                return jsonify({"error": "Unsupported frame payload"}), 415
+            if "frames" in payload:
+                updates = []
+                for item in payload["frames"]:
+                    update = _ingest_json_frame(ingestor, item)
+                    updates.append(update)
+                    if update["target_reached"]:
+                        break
+                _finish_if_target_reached(session, updates[-1] if updates else {"target_reached": False})
+                return jsonify({"session_id": session_id, "updates": updates}), 200
+            update = _ingest_json_frame(ingestor, payload)
+    except (ValueError, TypeError) as exc:
+        return jsonify({"error": str(exc)}), 400
+    except IngestorClosed as exc:
+        return jsonify({"error": str(exc), "session_id": session_id}), 409
+
+    _finish_if_target_reached(session, update)
+    return jsonify(update), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """Per-stage latency quantiles and session/queue gauges in Prometheus text format."""
+    running = [session for session in sessions.sessions() if session.snapshot()["is_running"]]
+    queue_depth = []
+    queue_dropped = []
+    for session in running:
+        if session.pipeline is None:
+            continue
+        for name, stats in session.pipeline.stats()["queues"].items():
+            labels = {"session_id": session.session_id, "queue": name}
+            queue_depth.append((labels, stats["depth"]))
+            queue_dropped.append((labels, stats["dropped"]))
+
+    body = prometheus_text(series=[
+        ("active_sessions", "gauge", "Sessions currently running.", [({}, len(running))]),
+        ("max_sessions", "gauge", "Concurrent session budget.", [({}, sessions.max_sessions)]),
+        ("queue_depth", "gauge", "Frames waiting in each pipeline queue.", queue_depth),
+        ("queue_dropped_frames_total", "counter", "Stale frames dropped per pipeline queue.", queue_dropped),
+    ])
+    return Response(body, mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/health", methods=["GET"])
 def health_check():
-    """Simple health check endpoint."""
-    return jsonify({"status": "healthy"}), 200
+    """Liveness check; answers while the classifier is still loading in the background."""
+    model = classifier_loader.status()
+    return jsonify({"status": model["state"], "model": model}), 200
 
 
-if __name__ == "__main__":
-    print("🚀 Starting Rehab Engine API on http://localhost:8808")
-    app.run(host="0.0.0.0", port=8808, debug=True, threaded=True)
+@app.route("/ready", methods=["GET"])
+def readiness_check():
+    """Readiness probe: 200 once the classifier, camera and pose graphs are warm, 503 before that."""
+    payload = camera_worker.readiness()
+    payload["model"] = classifier_loader.status()
+    ready = payload["status"] == "ready" and payload["model"]["state"] == "ready"
+    return jsonify(payload), 200 if ready else 503
+
+
+def start_warm_up(debug=False):
+    """
+    Start loading the classifier and opening the camera in the background.
+
+    Call once in every serving process (WSGI servers that import this module
+    call it themselves); repeated calls are no-ops. Under the debug reloader
+    the file-watching parent never serves requests, so only its serving child
+    (WERKZEUG_RUN_MAIN=true) warms up.
 
+    Args:
+        debug (bool): Whether the app runs with the debug reloader.
 
+    Returns:
+        bool: True if warm-up was started in this process.
+    """
+    if debug and os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+        return False
+    classifier_loader.start()
+    camera_worker.start()
+    return True
+
+
+if __name__ == "__main__":
+    print("🚀 Starting Rehab Engine API on http://localhost:8808")
+    debug = os.environ.get("REHAB_ENGINE_DEBUG", "1") != "0"
+    start_warm_up(debug)
+    app.run(host="0.0.0.0", port=8808, debug=debug, threaded=True)
@@ -0,0 +1,177 @@
+import threading
+import time
+
+
+class BackgroundLoader:
+    """
+    Builds an expensive engine dependency (the classifier) once, off the request path.
+
+    ``start()`` begins loading on a daemon thread and returns at once. ``get()``
+    returns the loaded object, waiting for a load in progress or loading on the
+    calling thread if nothing started it. ``state`` is "idle", "loading",
+    "ready" or "error" for health checks.
+    """
+
+    def __init__(self, load, name="model"):
+        self.load = load
+        self.name = name
+        self.state = "idle"
+        self.error = None
+        self.load_seconds = None
+        self._value = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start loading in the background if it has not started yet; returns immediately."""
+        with self._lock:
+            if self.state != "idle":
+                return self
+            self.state = "loading"
+        threading.Thread(target=self._run, name=f"rehab-load-{self.name}", daemon=True).start()
+        return self
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            value = self.load()
+        except Exception as exc:
+            self.error = exc
+            self.state = "error"
+            print(f"[Loader] {self.name} failed to load: {exc}")
+        else:
+            self._value = value
+            self.load_seconds = time.perf_counter() - start
+            self.state = "ready"
+            print(f"[Loader] {self.name} ready in {self.load_seconds:.2f}s")
+        finally:
+            self._done.set()
+
+    def get(self, timeout=None):
+        """Return the loaded object; raises RuntimeError if loading failed."""
+        if self._value is not None:
+            return self._value
+        with self._lock:
+            load_here = self.state == "idle"
+            if load_here:
+                self.state = "loading"
+        if load_here:
+            self._run()
+        elif not self._done.wait(timeout):
+            raise TimeoutError(f"{self.name} is still loading")
+        if self.error is not None:
+            raise RuntimeError(f"{self.name} failed to load: {self.error}") from self.error
+        return self._value
+
+    def status(self):
+        return {
+            "state": self.state,
+            "load_seconds": self.load_seconds,
+            "error": str(self.error) if self.error is not None else None,
+        }
+
+
+class CameraWorker:
+    """
+    Long-lived owner of the warm camera resources shared by live camera sessions.
+
+    ``start()`` opens the resources on a background thread (camera, pose graphs,
+    one warm-up inference). ``run_session`` hands them to the engine loop so a
+    new session only resets per-session state. One session uses them at a time.
+    A session that arrives during warm-up or while the previous session is
+    still releasing them waits up to ``wait_seconds``, then fails rather than
+    opening the camera a second time. Sessions only run cold, with their own
+    camera and pose graphs, when no warm resources exist (never started, or
+    warm-up failed).
+
+    Args:
+        resources_factory (callable): Returns an unopened resources object with
+            ``open()``, ``is_open``, ``close()`` and ``last_start_seconds``
+            (engine.CameraResources).
+        process (callable): The engine loop, called as ``process(**session_args)``
+            or ``process(resources=..., **session_args)`` (engine.process_video).
+        wait_seconds (float): Longest wait for warm-up or for the resources to be free.
+    """
+
+    def __init__(self, resources_factory, process, wait_seconds=10.0):
+        self.resources_factory = resources_factory
+        self.process = process
+        self.wait_seconds = wait_seconds
+        self.resources = None
+        self.state = "idle"
+        self.error = None
+        self.warm_sessions = 0
+        self.cold_sessions = 0
+        self._busy = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Begin warming up in the background; returns immediately."""
+        if self._thread is None:
+            self.state = "warming"
+            self._thread = threading.Thread(target=self._warm_up, name="rehab-camera-warmup", daemon=True)
+            self._thread.start()
+        return self
+
+    def wait_ready(self, timeout=None):
+        """Block until warm-up has finished; returns True if the resources are ready."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.state == "ready"
+
+    def _warm_up(self):
+        start = time.perf_counter()
+        try:
+            resources = self.resources_factory().open()
+            if not resources.is_open:
+                resources.close()
+                raise IOError("camera could not be opened")
+        except Exception as exc:
+            self.error = str(exc)
+            self.state = "error"
+            print(f"[CameraWorker] Warm-up failed: {exc}")
+            return
+        self.resources = resources
+        self.state = "ready"
+        print(f"[CameraWorker] Ready in {time.perf_counter() - start:.2f}s")
+
+    def run_session(self, **session_args):
+        """
+        Run one engine session on the warm resources, or cold when there are none.
+
+        Raises RuntimeError if warm-up or the previous session does not finish
+        within ``wait_seconds``; the camera is never opened twice.
+        """
+        if self.state == "warming" and not self.wait_ready(self.wait_seconds) and self.state == "warming":
+            raise RuntimeError("camera is still warming up")
+        if self.state == "ready":
+            if not self._busy.acquire(timeout=self.wait_seconds):
+                raise RuntimeError("camera is still in use by the previous session")
+            try:
+                if self.resources is not None:
+                    self.warm_sessions += 1
+                    return self.process(resources=self.resources, **session_args)
+            finally:
+                self._busy.release()
+        self.cold_sessions += 1
+        return self.process(**session_args)
+
+    def readiness(self):
+        """Readiness probe payload: state, warm-up time and the last warm session's start latency."""
+        resources = self.resources
+        return {
+            "status": self.state,
+            "error": self.error,
+            "busy": self._busy.locked(),
+            "warm_up_seconds": getattr(resources, "warm_up_seconds", None),
+            "last_start_seconds": getattr(resources, "last_start_seconds", None),
+            "warm_sessions": self.warm_sessions,
+            "cold_sessions": self.cold_sessions,
+        }
+
+    def close(self):
+        with self._busy:
+            if self.resources is not None:
+                self.resources.close()
+                self.resources = None
+            self.state = "idle"
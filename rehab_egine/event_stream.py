@@ -0,0 +1,109 @@
+import itertools
+import threading
+import time
+from collections import deque
+
+
+class Subscription:
+    """One stream consumer's bounded inbox; the oldest events are dropped if it falls behind."""
+
+    def __init__(self, broker, maxsize=256):
+        self._broker = broker
+        self._events = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+
+    def _deliver(self, event):
+        with self._cond:
+            if len(self._events) == self._events.maxlen:
+                self.dropped += 1
+            self._events.append(event)
+            self._cond.notify()
+
+    def _finish(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """
+        Wait for the next event.
+
+        Returns the event dict, or None if ``timeout`` passed with nothing new.
+        Once the broker is closed and the inbox is drained, raises EOFError.
+        """
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            if self._events:
+                return self._events.popleft()
+            if self.closed:
+                raise EOFError("event stream closed")
+            return None
+
+    def close(self):
+        self._broker.unsubscribe(self)
+        self._finish()
+
+
+class EventBroker:
+    """
+    Fan-out of engine events (reps, classifier labels, session state) to stream subscribers.
+
+    ``publish`` never blocks the engine loop: each event is appended to every
+    subscriber's bounded inbox under a short lock. Recent events are kept so a
+    reconnecting client can resume after its last seen event ID.
+    """
+
+    def __init__(self, history=64, subscriber_queue=256):
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.subscriber_queue = subscriber_queue
+        self.closed = False
+
+    def publish(self, kind, data):
+        """Queue ``data`` as an event of type ``kind`` for every subscriber; returns the event."""
+        with self._lock:
+            if self.closed:
+                return None
+            event = {"id": next(self._ids), "event": kind, "time": time.time(), "data": data}
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            subscriber._deliver(event)
+        return event
+
+    def subscribe(self, last_event_id=None):
+        """Open a subscription, replaying retained events newer than ``last_event_id``."""
+        subscription = Subscription(self, self.subscriber_queue)
+        with self._lock:
+            if last_event_id is not None:
+                for event in self._history:
+                    if event["id"] > last_event_id:
+                        subscription._deliver(event)
+            if self.closed:
+                subscription._finish()
+            else:
+                self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def close(self):
+        """End every subscription once it has drained; later publishes are ignored."""
+        with self._lock:
+            self.closed = True
+            subscribers = list(self._subscribers)
+            self._subscribers.clear()
+        for subscriber in subscribers:
+            subscriber._finish()
@@ -0,0 +1,198 @@
+import multiprocessing
+import queue
+from collections import deque
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedFrameRing:
+    """
+    Preallocated frame buffers in one shared-memory block.
+
+    ``frames[slot]`` is an ordinary numpy view onto the block, in every process
+    that has the ring open, so a frame written by one process is read by the
+    other without pickling or copying. The creating process owns the block and
+    unlinks it on ``close``; others ``attach`` with ``spec()``.
+    """
+
+    def __init__(self, slots, shape, dtype=np.uint8, name=None):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        size = slots * int(np.prod(self.shape)) * self.dtype.itemsize
+        self._shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=self.dtype, buffer=self._shm.buf)
+
+    def spec(self):
+        """Arguments for ``attach`` in another process."""
+        return self._shm.name, self.slots, self.shape, self.dtype.str
+
+    @classmethod
+    def attach(cls, spec):
+        name, slots, shape, dtype = spec
+        return cls(slots, shape, dtype, name=name)
+
+    def close(self):
+        if self._shm is None:
+            return
+        # The views must go before the mapping can be closed
+        self.frames = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # A view handed out earlier is still alive; the mapping goes away with it
+            pass
+        if self.owner:
+            self._shm.unlink()
+        self._shm = None
+
+
+def _serve(worker_factory, ring_spec, requests, results):
+    """Inference process main loop: run the worker on each submitted slot, newest frame first."""
+    ring = None
+    worker = None
+    try:
+        ring = SharedFrameRing.attach(ring_spec)
+        worker = worker_factory()
+        running = True
+        while running:
+            item = requests.get()
+            if item is None:
+                break
+            # Frames that queued up while the last one was processed are stale:
+            # hand them back unprocessed and work on the newest
+            while True:
+                try:
+                    newer = requests.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is None:
+                    running = False
+                    break
+                results.put(("skipped", item[0], item[1]))
+                item = newer
+            slot, timestamp = item
+            results.put(("done", slot, (timestamp, worker(ring.frames[slot], timestamp))))
+    except Exception as exc:
+        results.put(("error", None, f"{type(exc).__name__}: {exc}"))
+    finally:
+        if worker is not None and hasattr(worker, "close"):
+            worker.close()
+        if ring is not None:
+            ring.close()
+
+
+class InferenceProcess:
+    """
+    Runs per-frame work in a separate process, fed frames through a SharedFrameRing.
+
+    The caller takes a free buffer with ``acquire()``, writes a frame into
+    ``frame(slot)`` (a camera can read straight into it), and ``submit``s the
+    slot. The child calls ``worker(frame, timestamp)`` and sends back only its
+    small output. ``result()`` returns ``(slot, timestamp, output)``; the
+    buffer stays untouched until the caller ``release``s it, so it can still
+    draw on the frame. When the child falls behind it skips to the newest
+    submitted frame and returns the skipped ones with output None.
+
+    Args:
+        worker_factory (callable): Picklable callable run once in the child to
+            build the worker; the worker may define ``close()``.
+        frame_shape (tuple): Shape of every frame, e.g. (480, 640, 3).
+        slots (int): Number of frame buffers.
+        dtype: Frame dtype.
+    """
+
+    def __init__(self, worker_factory, frame_shape, slots=4, dtype=np.uint8):
+        self.worker_factory = worker_factory
+        self.ring = SharedFrameRing(slots, frame_shape, dtype)
+        self.submitted = 0
+        self.completed = 0
+        self.skipped = 0
+        self._free = deque(range(slots))
+        self._in_flight = 0
+        # Spawned, not forked: TensorFlow and MediaPipe are not fork-safe
+        context = multiprocessing.get_context("spawn")
+        self._requests = context.Queue()
+        self._results = context.Queue()
+        self._process = context.Process(
+            target=_serve,
+            args=(worker_factory, self.ring.spec(), self._requests, self._results),
+            name="rehab-inference",
+            daemon=True,
+        )
+
+    def start(self):
+        self._process.start()
+        return self
+
+    @property
+    def in_flight(self):
+        """Frames submitted whose results have not been collected yet."""
+        return self._in_flight
+
+    def acquire(self):
+        """Take a free frame buffer; returns its slot, or None if all are in use."""
+        return self._free.popleft() if self._free else None
+
+    def frame(self, slot):
+        return self.ring.frames[slot]
+
+    def submit(self, slot, timestamp):
+        self._requests.put((slot, timestamp))
+        self._in_flight += 1
+        self.submitted += 1
+
+    def release(self, slot):
+        self._free.append(slot)
+
+    def result(self, timeout=None, poll=0.5):
+        """Wait for the next ``(slot, timestamp, output)``; raises RuntimeError if the child failed."""
+        waited = 0.0
+        while True:
+            try:
+                kind, slot, payload = self._results.get(timeout=poll)
+            except queue.Empty:
+                if not self._process.is_alive():
+                    raise RuntimeError(f"inference process exited with code {self._process.exitcode}")
+                waited += poll
+                if timeout is not None and waited >= timeout:
+                    raise TimeoutError("no result from the inference process")
+                continue
+            if kind == "error":
+                raise RuntimeError(f"inference process failed: {payload}")
+            self._in_flight -= 1
+            if kind == "skipped":
+                self.skipped += 1
+                return slot, payload, None
+            self.completed += 1
+            timestamp, output = payload
+            return slot, timestamp, output
+
+    def stats(self):
+        return {
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "skipped": self.skipped,
+            "in_flight": self._in_flight,
+            "slots": self.ring.slots,
+        }
+
+    def close(self, timeout=5.0):
+        """Stop the child and free the shared buffers."""
+        if self._process.is_alive():
+            self._requests.put(None)
+            self._process.join(timeout)
+            if self._process.is_alive():
+                self._process.terminate()
+                self._process.join(timeout)
+        self._requests.close()
+        self._results.close()
+        self.ring.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,121 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+
+import numpy as np
+
+from keras_compat import use_legacy_keras
+
+use_legacy_keras()
+
+import tensorflow as tf
+
+
+class _TimedClassifier(ABC):
+    """Shared interface of the classifier backends: single and batch prediction, with per-call latency."""
+
+    backend = None
+
+    def __init__(self, frames=16, features=132, history=512):
+        self.frames = frames
+        self.features = features
+        self._latencies = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    @abstractmethod
+    def _run(self, batch):
+        """Run the model on a float32 (B, frames, features) batch; returns (B, classes) probabilities."""
+
+    def warm_up(self, batch_size=1):
+        """Run a dummy batch so the first real call is fast."""
+        return self.predict_batch(np.zeros((batch_size, self.frames, self.features), dtype=np.float32))
+
+    def predict_batch(self, windows):
+        """Classify a batch of windows shaped (B, frames, features[, 1]); returns (B, classes)."""
+        batch = np.asarray(windows, dtype=np.float32).reshape(-1, self.frames, self.features)
+        start = time.perf_counter()
+        probabilities = self._run(batch)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._latencies.append(elapsed)
+            self.calls += 1
+        return probabilities
+
+    def predict(self, window):
+        """Classify one (frames, features) window; returns a 1-D probability vector."""
+        return self.predict_batch(window)[0]
+
+    @property
+    def last_latency(self):
+        with self._lock:
+            return self._latencies[-1] if self._latencies else None
+
+    def latency_stats(self):
+        """Return call count and mean/p50/p99 latency in milliseconds over recent calls."""
+        with self._lock:
+            samples = np.array(self._latencies, dtype=np.float64) * 1000.0
+            calls = self.calls
+        if samples.size == 0:
+            return {"calls": calls, "mean_ms": None, "p50_ms": None, "p99_ms": None}
+        return {
+            "calls": calls,
+            "mean_ms": float(samples.mean()),
+            "p50_ms": float(np.percentile(samples, 50)),
+            "p99_ms": float(np.percentile(samples, 99)),
+        }
+
+
+class CompiledClassifier(_TimedClassifier):
+    """Graph-compiled inference path for the Keras activity classifier.
+
+    Wraps the model in a ``tf.function`` with a fixed ``(None, frames, features)``
+    input signature so it is traced once and then runs as a graph, for a single
+    window or a batch of windows. Per-call latency is kept for reporting.
+    """
+
+    backend = "keras"
+
+    def __init__(self, model, frames=16, features=132, history=512):
+        super().__init__(frames, features, history)
+        self._model = model
+        self._fn = tf.function(
+            self._forward,
+            input_signature=[tf.TensorSpec(shape=[None, frames, features], dtype=tf.float32)],
+        )
+
+    def _forward(self, windows):
+        return self._model(windows, training=False)
+
+    def _run(self, batch):
+        return self._fn(batch).numpy()
+
+
+class TFLiteClassifier(_TimedClassifier):
+    """TensorFlow Lite inference path, for the quantized export of the activity classifier.
+
+    The model takes one float32 ``(1, frames, features)`` window (see
+    quantize_classifier.py); batches run window by window. The interpreter is
+    not thread-safe, so calls are serialized.
+    """
+
+    backend = "tflite"
+
+    def __init__(self, model_path, frames=16, features=132, history=512, num_threads=None):
+        super().__init__(frames, features, history)
+        self.model_path = model_path
+        self._interpreter = tf.lite.Interpreter(model_path=model_path, num_threads=num_threads)
+        self._interpreter.allocate_tensors()
+        self._input = self._interpreter.get_input_details()[0]["index"]
+        self._output = self._interpreter.get_output_details()[0]["index"]
+        self._invoke_lock = threading.Lock()
+
+    def _run(self, batch):
+        outputs = []
+        with self._invoke_lock:
+            for window in batch:
+                self._interpreter.set_tensor(self._input, window[np.newaxis])
+                self._interpreter.invoke()
+                outputs.append(self._interpreter.get_tensor(self._output)[0].copy())
+        return np.stack(outputs)
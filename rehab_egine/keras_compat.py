@@ -0,0 +1,14 @@
+"""
+Keras version selection for the activity classifier.
+
+transformer_model.h5 was saved with Keras 2. TensorFlow 2.16+ ships Keras 3
+as ``tf.keras`` unless TF_USE_LEGACY_KERAS is set before TensorFlow is first
+imported, by anything (MediaPipe imports it too). Modules that may be the
+first to load TensorFlow call ``use_legacy_keras()`` before doing so.
+"""
+import os
+
+
+def use_legacy_keras():
+    """Make ``tf.keras`` the Keras 2 (tf_keras) package, unless the environment already chose."""
+    os.environ.setdefault("TF_USE_LEGACY_KERAS", "1")
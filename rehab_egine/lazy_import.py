@@ -0,0 +1,36 @@
+import importlib
+import threading
+
+
+class LazyModule:
+    """
+    Module proxy that imports the real module on first attribute access.
+
+    ``mp = LazyModule("mediapipe")`` can stand in for ``import mediapipe as mp``
+    at module level: nothing is imported until code first touches ``mp.<name>``,
+    so importing the engine does not pay for MediaPipe (and the TensorFlow it
+    pulls in) until a session needs it.
+    """
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._module is None:
+            with self._lock:
+                if self._module is None:
+                    self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def is_loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
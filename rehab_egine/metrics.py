@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class RollingHistogram:
+    """Latency samples over a rolling window, plus lifetime count and sum."""
+
+    def __init__(self, window=2048):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            self.total += seconds
+
+    def snapshot(self, quantiles=QUANTILES):
+        """Return count, sum and the requested quantiles (seconds) of the rolling window."""
+        with self._lock:
+            samples = np.fromiter(self._samples, dtype=np.float64, count=len(self._samples))
+            count, total = self.count, self.total
+        if samples.size:
+            values = np.quantile(samples, quantiles)
+        else:
+            values = [float("nan")] * len(quantiles)
+        return {
+            "count": count,
+            "sum": total,
+            "quantiles": {q: float(v) for q, v in zip(quantiles, values)},
+        }
+
+
+class StageMetrics:
+    """
+    Named rolling latency histograms for the engine's hot-path stages.
+
+    Use ``with stage_metrics.time("pose"): ...`` around a stage, or
+    ``observe(name, seconds)`` when the duration is already known.
+    """
+
+    def __init__(self, window=2048):
+        self.window = window
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name):
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, RollingHistogram(self.window))
+        return histogram
+
+    def observe(self, name, seconds):
+        self.histogram(name).observe(seconds)
+
+    @contextmanager
+    def time(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).observe(time.perf_counter() - start)
+
+    def snapshot(self):
+        with self._lock:
+            histograms = dict(self._histograms)
+        return {name: histogram.snapshot() for name, histogram in sorted(histograms.items())}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+# Process-wide stage timers shared by every engine session
+stage_metrics = StageMetrics()
+
+
+def _format_value(value):
+    return "NaN" if value != value else f"{value:.9g}"
+
+
+def _labels(**labels):
+    return ",".join(f'{key}="{value}"' for key, value in labels.items())
+
+
+def prometheus_text(metrics=None, series=None, prefix="rehab_engine"):
+    """
+    Render stage latencies (and optional extra series) in the Prometheus text exposition format.
+
+    Args:
+        metrics (StageMetrics | None): Histograms to export (defaults to ``stage_metrics``).
+        series (list | None): ``(name, type, help, [(labels_dict, value), ...])`` tuples,
+            where type is "gauge" or "counter".
+        prefix (str): Metric name prefix.
+    """
+    metrics = metrics or stage_metrics
+    name = f"{prefix}_stage_latency_seconds"
+    lines = [
+        f"# HELP {name} Rolling latency of engine hot-path stages.",
+        f"# TYPE {name} summary",
+    ]
+    for stage, snap in metrics.snapshot().items():
+        for quantile, value in snap["quantiles"].items():
+            lines.append(f"{name}{{{_labels(stage=stage, quantile=quantile)}}} {_format_value(value)}")
+        lines.append(f"{name}_sum{{{_labels(stage=stage)}}} {_format_value(snap['sum'])}")
+        lines.append(f"{name}_count{{{_labels(stage=stage)}}} {snap['count']}")
+
+    for series_name, kind, help_text, samples in series or []:
+        full_name = f"{prefix}_{series_name}"
+        lines.append(f"# HELP {full_name} {help_text}")
+        lines.append(f"# TYPE {full_name} {kind}")
+        for labels, value in samples:
+            label_text = f"{{{_labels(**labels)}}}" if labels else ""
+            lines.append(f"{full_name}{label_text} {value}")
+    return "\n".join(lines) + "\n"
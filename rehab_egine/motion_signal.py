@@ -0,0 +1,425 @@
+import statistics
+
+import numpy as np
+from scipy.fft import irfft, next_fast_len, rfft
+
+
+class MotionAutocorrelation:
+    """Sample buffer for the motion-distance signal with a fast Pearson autocorrelation.
+
+    Drop-in replacement for keeping ``motion_distance`` as a list and calling
+    ``pearson_autocorrelation(np.array(motion_distance))`` every frame.
+    Appending and dropping samples is O(1) amortized; ``autocorrelation()``
+    computes every lag at once with an FFT (O(N log N)) and prefix sums
+    instead of the O(N^2) Python loop.
+    """
+
+    def __init__(self, capacity=800):
+        self._buffer = np.zeros(2 * max(int(capacity), 1), dtype=np.float64)
+        self._start = 0
+        self._end = 0
+        self._cache = None
+
+    def __len__(self):
+        return self._end - self._start
+
+    def values(self):
+        """Return the current samples (oldest first) as a read-only view."""
+        view = self._buffer[self._start:self._end]
+        view.flags.writeable = False
+        return view
+
+    def clear(self):
+        self._start = 0
+        self._end = 0
+        self._cache = None
+
+    def append(self, value):
+        if self._end == self._buffer.size:
+            self._compact()
+        self._buffer[self._end] = value
+        self._end += 1
+        self._cache = None
+
+    def popleft(self, count=1):
+        """Drop the ``count`` oldest samples (same as ``motion_distance[count:]``)."""
+        count = max(0, min(int(count), len(self)))
+        self._start += count
+        if count:
+            self._cache = None
+
+    def _compact(self):
+        size = len(self)
+        if size * 2 > self._buffer.size:
+            grown = np.zeros(self._buffer.size * 2, dtype=self._buffer.dtype)
+            grown[:size] = self._buffer[self._start:self._end]
+            self._buffer = grown
+        else:
+            self._buffer[:size] = self._buffer[self._start:self._end]
+        self._start = 0
+        self._end = size
+
+    def autocorrelation(self):
+        """Return the Pearson autocorrelation for lags 0..N-1 of the current samples."""
+        if self._cache is None:
+            self._cache = pearson_autocorrelation_fft(self._buffer[self._start:self._end])
+        return self._cache
+
+
+def pearson_autocorrelation(signal):
+    """Reference O(N^2) Pearson autocorrelation (kept for parity checks)."""
+    N = len(signal)
+    mean_signal = np.mean(signal)
+    autocorr = []
+
+    for lag in range(N):
+        # Pearson correlation formula
+        numerator = np.sum((signal[:N-lag] - mean_signal) * (signal[lag:] - mean_signal))
+        denominator = np.sqrt(np.sum((signal[:N-lag] - mean_signal)**2)) * np.sqrt(np.sum((signal[lag:] - mean_signal)**2))
+        
+        if denominator == 0:
+            autocorr.append(0)
+        else:
+            autocorr.append(numerator / denominator)
+    
+    return np.array(autocorr)
+
+
+def pearson_autocorrelation_fft(signal):
+    """Vectorized equivalent of ``pearson_autocorrelation``.
+
+    For every lag k the numerator is sum((x[:N-k] - m) * (x[k:] - m)) with the
+    global mean m, and the denominator uses the energy of both overlapping
+    segments, exactly as in the loop version.
+    """
+    centered = np.asarray(signal, dtype=np.float64)
+    n = centered.size
+    if n == 0:
+        return np.zeros(0)
+    centered = centered - centered.mean()
+
+    fft_len = next_fast_len(2 * n - 1, real=True)
+    spectrum = rfft(centered, fft_len)
+    numerator = irfft(spectrum * np.conj(spectrum), fft_len)[:n]
+
+    energy = np.concatenate(([0.0], np.cumsum(centered * centered)))
+    lags = np.arange(n)
+    head_energy = energy[n - lags]          # sum of c[:N-k]^2
+    tail_energy = energy[n] - energy[lags]  # sum of c[k:]^2
+    denominator = np.sqrt(head_energy) * np.sqrt(tail_energy)
+
+    autocorr = np.zeros(n)
+    valid = denominator > 0
+    autocorr[valid] = numerator[valid] / denominator[valid]
+    return np.clip(autocorr, -1.0, 1.0)
+
+
+class RollingMoments:
+    """Sliding-window mean and sample variance for several channels at once.
+
+    Replaces keeping one deque per channel and calling ``statistics.variance``
+    on each every frame. Samples are added and evicted with Welford updates,
+    so each ``append`` is O(1) per channel; the moments are recomputed from
+    the window every ``window`` samples to stop rounding drift.
+    """
+
+    def __init__(self, window=100, channels=4):
+        self.window = window
+        self.channels = channels
+        self._samples = np.zeros((window, channels), dtype=np.float64)
+        self._mean = np.zeros(channels, dtype=np.float64)
+        self._m2 = np.zeros(channels, dtype=np.float64)
+        self._next = 0
+        self._count = 0
+        self._since_resync = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        slot = self._next
+        if self._count == self.window:
+            # Evict the oldest sample, which lives in the slot being overwritten
+            old = self._samples[slot].copy()
+            self._count -= 1
+            delta = old - self._mean
+            self._mean -= delta / self._count
+            self._m2 -= delta * (old - self._mean)
+
+        self._samples[slot] = values
+        self._next = (slot + 1) % self.window
+        self._count += 1
+        delta = values - self._mean
+        self._mean += delta / self._count
+        self._m2 += delta * (values - self._mean)
+
+        self._since_resync += 1
+        if self._since_resync >= self.window:
+            self._resync()
+
+    def _resync(self):
+        window = self._window()
+        self._mean = window.mean(axis=0)
+        self._m2 = ((window - self._mean) ** 2).sum(axis=0)
+        self._since_resync = 0
+
+    def _window(self):
+        if self._count < self.window:
+            return self._samples[:self._count]
+        return self._samples
+
+    def last(self):
+        """Most recently appended sample."""
+        return self._samples[(self._next - 1) % self.window]
+
+    def mean(self):
+        return self._mean.copy()
+
+    def variance(self):
+        """Sample variance (n - 1 denominator, like ``statistics.variance``) of each channel."""
+        if self._count < 2:
+            return np.zeros(self.channels)
+        return np.maximum(self._m2, 0.0) / (self._count - 1)
+
+    def dominant_direction(self):
+        """Return (channel with the largest variance, +1/-1 sign of its latest sample)."""
+        variance = self.variance()
+        if self.channels > 1 and self._count > 1:
+            top, runner_up = np.sort(variance)[-2:][::-1]
+            noise_floor = 1e-12 * (1.0 + float(np.max(self._mean ** 2)))
+            if top - runner_up <= 1e-9 * top or top <= noise_floor:
+                # Near-tie or flat window: fall back to exact arithmetic so rounding cannot pick the axis
+                variance = [statistics.variance(column) for column in self._window().T.tolist()]
+        channel = int(np.argmax(variance))
+        return channel, 1 if self.last()[channel] > 0 else -1
+
+
+def get_direction(idx, x_projection, y_projection, projection_45, neg45_projection):
+    """Reference sign of the max-variance axis projection (kept for parity checks)."""
+    
+    direction = +1
+    
+    if idx == 0: # Movement along x-axis
+    
+        if x_projection > 0:
+            direction = +1
+            
+        else: 
+            direction = -1
+            
+        # print("Along x ", " ", direction)    
+            
+        
+    elif idx == 1: # Movement along y-axis
+            
+        if y_projection > 0:
+            direction = +1
+            
+        else: 
+            direction = -1
+            
+        # print("Along y ", " ", direction)   
+    
+    
+    elif idx == 2: # Movement along line y = x
+            
+        if projection_45 > 0:
+            direction = +1
+            
+        else: 
+            direction = -1
+            
+        # print("Along 45 ", " ", direction)   
+    
+    
+    else: 
+            
+        if neg45_projection > 0:
+            direction = +1
+            
+        else: 
+            direction = -1
+            
+        # print("Along neg45 ", " ", direction)   
+        
+    return direction
+
+
+class OnlineRepDetector:
+    """Constant-work repetition detector on the directed motion signal.
+
+    The directed signal (motion amplitude signed by the dominant movement
+    direction) swings one way on the outward half of a rep and the other way
+    on the return. A rep is one full cycle: once a positive phase has been
+    seen, the detector arms when the signal drops below ``-threshold`` and
+    fires when it next rises above ``+threshold``. The hysteresis band keeps
+    jitter around zero from double counting, and each sample is O(1).
+    """
+
+    def __init__(self, threshold=8.0):
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        self._seen_positive = False
+        self._armed = False
+        self.last_cycle_frame = None
+        self.cycle_frames = None
+
+    def update(self, frame_index, sample, eligible=True):
+        """Feed one sample; returns True when a cycle completes and ``eligible`` allows counting it."""
+        if sample < -self.threshold:
+            if self._seen_positive:
+                self._armed = True
+            return False
+        if sample <= self.threshold:
+            return False
+
+        self._seen_positive = True
+        if not self._armed:
+            return False
+        self._armed = False
+        if self.last_cycle_frame is not None:
+            self.cycle_frames = frame_index - self.last_cycle_frame
+        self.last_cycle_frame = frame_index
+        return bool(eligible)
+
+
+class AutocorrelationRepCounter:
+    """Rep counter that re-runs ``find_peaks`` on the buffer autocorrelation every sample.
+
+    This is the original counting block and ExerciseCounter's default: a rep is
+    counted when the number of autocorrelation peaks grows, and once
+    ``peak_buffer_limit`` peaks are present the oldest cycle is dropped from
+    the buffer and detection pauses for that many frames. Each sample costs
+    an O(N log N) autocorrelation plus an O(N) peak search.
+    """
+
+    def __init__(self, buffer_limit=800, min_distance=20, peak_height=0.0, prominence_ratio=0.8,
+                 peak_buffer_limit=3):
+        self.buffer_limit = buffer_limit
+        self.min_distance = min_distance
+        self.peak_height = peak_height
+        self.prominence_ratio = prominence_ratio
+        self.peak_buffer_limit = peak_buffer_limit
+        self.samples = MotionAutocorrelation(buffer_limit + 1)
+        # scipy.signal is slow to import and only this detector needs it; load it with the
+        # counter rather than on the first sample, which would stall a running session
+        from scipy.signal import find_peaks
+        self._find_peaks = find_peaks
+        self.reset()
+
+    def reset(self):
+        self.samples.clear()
+        self.resume_frame = 0
+        self.prev_peak_count = 0
+
+    def update(self, frame_index, sample, eligible=True):
+        """Feed one sample; returns True when a rep should be counted."""
+        self.samples.append(sample)
+        if frame_index <= 2 or frame_index < self.resume_frame:
+            return False
+        if len(self.samples) > self.buffer_limit:
+            self.samples.popleft()
+
+        autocorr = self.samples.autocorrelation()
+        if np.max(autocorr) == 0:
+            return False
+        autocorr = autocorr / np.max(autocorr)
+        prominence_threshold = np.max(autocorr) * self.prominence_ratio
+        if len(autocorr) > 20:
+            autocorr = autocorr[:-20]
+
+        peaks, _ = self._find_peaks(
+            autocorr,
+            height=self.peak_height,
+            prominence=prominence_threshold,
+            distance=self.min_distance,
+            width=2,
+        )
+        if not eligible:
+            return False
+
+        rep_counted = False
+        if self.prev_peak_count < len(peaks) < self.peak_buffer_limit:
+            rep_counted = True
+        elif len(peaks) >= self.peak_buffer_limit:
+            # Drop the oldest cycle and pause detection while the buffer refills
+            self.resume_frame = frame_index + peaks[0]
+            self.samples.popleft(peaks[0])
+            rep_counted = True
+        self.prev_peak_count = len(peaks)
+        return rep_counted
+
+
+class SignalHistory:
+    """Per-frame history of a 1-D signal with bounded memory.
+
+    Keeps the most recent ``limit`` samples in a ring buffer (``limit=None``
+    keeps every sample, like the plain list it replaces). With ``spill_path``
+    every sample is also appended to a raw float64 file in blocks of
+    ``spill_block``, so the whole session can still be read back, as a memory
+    map, while memory stays at ``limit`` samples. ``len()`` counts every
+    sample appended, not only the retained ones.
+    """
+
+    def __init__(self, limit=9000, spill_path=None, spill_block=4096):
+        self.limit = limit
+        self.spill_path = spill_path
+        self._count = 0
+        if limit is None:
+            self._samples = []
+        else:
+            self._ring = np.zeros(limit, dtype=np.float64)
+        self._spill = None
+        if spill_path is not None:
+            self._spill = open(spill_path, "wb")
+            self._block = np.zeros(spill_block, dtype=np.float64)
+            self._block_fill = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, value):
+        if self.limit is None:
+            self._samples.append(value)
+        else:
+            self._ring[self._count % self.limit] = value
+        self._count += 1
+        if self._spill is not None:
+            self._block[self._block_fill] = value
+            self._block_fill += 1
+            if self._block_fill == len(self._block):
+                self._flush()
+
+    def _flush(self):
+        if self._spill is not None and self._block_fill:
+            self._spill.write(self._block[:self._block_fill].tobytes())
+            self._spill.flush()
+            self._block_fill = 0
+
+    def recent(self):
+        """Retained samples, oldest first, as a new float64 array."""
+        if self.limit is None:
+            return np.asarray(self._samples, dtype=np.float64)
+        if self._count <= self.limit:
+            return self._ring[:self._count].copy()
+        start = self._count % self.limit
+        return np.concatenate((self._ring[start:], self._ring[:start]))
+
+    def to_array(self):
+        """The whole session when kept in memory or spilled to disk; otherwise the retained samples."""
+        if self.spill_path is not None:
+            self._flush()
+            if self._count == 0:
+                return np.zeros(0, dtype=np.float64)
+            return np.memmap(self.spill_path, dtype=np.float64, mode="r", shape=(self._count,))
+        return self.recent()
+
+    def close(self):
+        """Write any buffered samples and close the spill file (the file is kept)."""
+        if self._spill is not None:
+            self._flush()
+            self._spill.close()
+            self._spill = None
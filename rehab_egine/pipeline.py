@@ -0,0 +1,185 @@
+import queue
+import threading
+
+# Marks the end of the stream on a stage queue
+END = object()
+
+
+class StageQueue:
+    """
+    Bounded hand-off between two pipeline stages.
+
+    With ``drop_stale=True`` a put on a full queue discards the oldest item, so a
+    slow consumer always gets the freshest frame and latency stays bounded.
+    Otherwise ``put`` blocks until there is room (back-pressure, nothing lost).
+    """
+
+    def __init__(self, name, maxsize=1, drop_stale=True):
+        self.name = name
+        self.maxsize = maxsize
+        self.drop_stale = drop_stale
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._lock = threading.Lock()
+
+    def put(self, item, halt=None, poll=0.05):
+        """Enqueue ``item``; returns False if ``halt`` was set while waiting for room."""
+        if self.drop_stale and item is not END:
+            with self._lock:
+                while True:
+                    try:
+                        self._queue.put_nowait(item)
+                        return True
+                    except queue.Full:
+                        try:
+                            stale = self._queue.get_nowait()
+                        except queue.Empty:
+                            continue
+                        if stale is END:
+                            # Never drop the end marker; the stream is already over
+                            self._queue.put_nowait(stale)
+                            return False
+                        self.dropped += 1
+        while True:
+            if halt is not None and halt.is_set():
+                return False
+            try:
+                self._queue.put(item, timeout=poll)
+                return True
+            except queue.Full:
+                continue
+
+    def get(self, timeout=None):
+        """Dequeue the next item; raises ``queue.Empty`` after ``timeout`` seconds."""
+        return self._queue.get(timeout=timeout)
+
+    @property
+    def depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {"depth": self.depth, "maxsize": self.maxsize, "dropped": self.dropped}
+
+
+class PipelineStage(threading.Thread):
+    """
+    Worker thread that pulls from ``inbox``, applies ``fn`` and pushes to ``outbox``.
+
+    A source stage has no inbox and calls ``fn()`` until it returns ``END``.
+    ``fn`` may return None to emit nothing for an item. When ``last(output)`` is
+    true the stage stops after emitting that output. On exit (end of stream,
+    halt or error) the stage forwards ``END`` so downstream stages wind down too.
+    """
+
+    def __init__(self, name, fn, inbox=None, outbox=None, halt=None, last=None, poll=0.05):
+        super().__init__(name=f"rehab-{name}", daemon=True)
+        self.stage_name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.halt = halt or threading.Event()
+        self.last = last
+        self.poll = poll
+        self.processed = 0
+        self.error = None
+
+    def _next_item(self):
+        while not self.halt.is_set():
+            try:
+                return self.inbox.get(timeout=self.poll)
+            except queue.Empty:
+                continue
+        return END
+
+    def run(self):
+        try:
+            while not self.halt.is_set():
+                if self.inbox is None:
+                    output = self.fn()
+                else:
+                    item = self._next_item()
+                    if item is END:
+                        break
+                    output = self.fn(item)
+                if output is END:
+                    break
+                self.processed += 1
+                if output is None:
+                    continue
+                if self.outbox is not None and not self.outbox.put(output, self.halt, self.poll):
+                    break
+                if self.last is not None and self.last(output):
+                    break
+        except Exception as exc:
+            print(f"[Pipeline] Stage '{self.stage_name}' failed: {exc}")
+            self.error = exc
+            self.halt.set()
+        finally:
+            if self.outbox is not None:
+                self.outbox.put(END, self.halt, self.poll)
+
+
+class FramePipeline:
+    """
+    Chain of threaded stages joined by bounded queues.
+
+    Stages are added in order with ``add_stage``; each one reads the queue the
+    previous stage writes. The output of the final stage is consumed on the
+    calling thread with ``results()``, which lets the caller own the OpenCV window.
+    """
+
+    def __init__(self, halt=None):
+        self.halt = halt or threading.Event()
+        self.stages = []
+        self.queues = []
+
+    def add_stage(self, name, fn, maxsize=1, drop_stale=True, last=None):
+        """Append a stage; its output queue is named after the stage that produced it."""
+        inbox = self.queues[-1] if self.queues else None
+        outbox = StageQueue(name, maxsize=maxsize, drop_stale=drop_stale)
+        self.stages.append(PipelineStage(name, fn, inbox, outbox, self.halt, last))
+        self.queues.append(outbox)
+        return self
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+        return self
+
+    def results(self, poll=0.05):
+        """Yield outputs of the last stage until the stream ends or the pipeline is halted."""
+        outbox = self.queues[-1]
+        while not self.halt.is_set():
+            try:
+                item = outbox.get(timeout=poll)
+            except queue.Empty:
+                continue
+            if item is END:
+                return
+            yield item
+
+    def stop(self, timeout=2.0):
+        """Halt all stages and wait up to ``timeout`` seconds for each thread; True once all have exited."""
+        self.halt.set()
+        return self.join(timeout)
+
+    def join(self, timeout=None):
+        """Wait for the stage threads; returns True when all of them have exited."""
+        for stage in self.stages:
+            stage.join(timeout)
+        return not any(stage.is_alive() for stage in self.stages)
+
+    @property
+    def error(self):
+        return next((stage.error for stage in self.stages if stage.error is not None), None)
+
+    def queue_depths(self):
+        """Current depth of each stage's output queue, keyed by stage name."""
+        return {q.name: q.depth for q in self.queues}
+
+    def stats(self):
+        """Depth, capacity and dropped-frame count per queue, plus items processed per stage."""
+        return {
+            "queues": {q.name: q.stats() for q in self.queues},
+            "processed": {stage.stage_name: stage.processed for stage in self.stages},
+        }
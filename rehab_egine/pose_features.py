@@ -0,0 +1,123 @@
+import numpy as np
+
+
+NUM_LANDMARKS = 33
+LANDMARK_DIMS = 4  # x, y, z, visibility
+
+# MediaPipe Pose landmark indices (mp.solutions.pose.PoseLandmark) used by the counters
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_HIP = 23
+RIGHT_HIP = 24
+
+# Joint angles computed for every frame: row i is the (a, b, c) triplet of angle ABC,
+# and the constants below index the result of joint_angles
+JOINT_TRIPLETS = np.array([
+    (LEFT_HIP, LEFT_SHOULDER, LEFT_WRIST),
+    (RIGHT_HIP, RIGHT_SHOULDER, RIGHT_WRIST),
+    (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+], dtype=np.intp)
+LEFT_SHOULDER_ANGLE, RIGHT_SHOULDER_ANGLE, RIGHT_ELBOW_ANGLE = range(len(JOINT_TRIPLETS))
+
+
+class LandmarkWindow:
+    """Fixed-size sliding window of landmark rows for the transformer classifier.
+
+    Every row is written twice (at ``i`` and ``i + size``) into a buffer of
+    ``2 * size`` rows, so the newest ``size`` rows are always one contiguous
+    slice and ``view()`` never copies or allocates.
+    """
+
+    def __init__(self, size=16, features=NUM_LANDMARKS * LANDMARK_DIMS, dtype=np.float32):
+        self.size = size
+        self.features = features
+        self._buffer = np.zeros((2 * size, features), dtype=dtype)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def is_full(self):
+        return self._count >= self.size
+
+    def reset(self):
+        self._buffer.fill(0)
+        self._next = 0
+        self._count = 0
+
+    def append(self, row):
+        """Push one frame of features; ``None`` or a short row is stored as NaN."""
+        if row is None or len(row) != self.features:
+            self._buffer[self._next].fill(np.nan)
+        else:
+            self._buffer[self._next] = row
+        self._buffer[self._next + self.size] = self._buffer[self._next]
+        self._next = (self._next + 1) % self.size
+        self._count = min(self._count + 1, self.size)
+
+    def view(self):
+        """Return the window (oldest row first) as a contiguous (size, features) view."""
+        if self._count < self.size:
+            return self._buffer[:self._count]
+        return self._buffer[self._next:self._next + self.size]
+
+
+def landmarks_to_array(landmarks, dtype=np.float64):
+    """Convert a sequence of MediaPipe landmarks into an (N, 4) array of x, y, z, visibility."""
+    return np.array(
+        [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks],
+        dtype=dtype,
+    ).reshape(-1, LANDMARK_DIMS)
+
+
+def landmark_motion(curr, prev, frame_width, frame_height, delta_limit=60):
+    """Per-landmark pixel motion between two (N, 4) landmark arrays.
+
+    Returns ``(curr_px, prev_px, deltas)`` where the first two are (N, 2) pixel
+    positions and ``deltas`` is ``curr_px - prev_px`` clamped to
+    ``[-delta_limit, delta_limit]`` on each axis.
+    """
+    scale = np.array([frame_width, frame_height], dtype=np.float64)
+    curr_px = curr[:, :2] * scale
+    prev_px = prev[:, :2] * scale
+    deltas = np.clip(curr_px - prev_px, -delta_limit, delta_limit)
+    return curr_px, prev_px, deltas
+
+
+def joint_angles(landmarks, triplets=JOINT_TRIPLETS):
+    """Angles ABC in degrees for every (a, b, c) row of ``triplets``, from (..., N, 3+) landmarks.
+
+    One frame's (33, 4) landmarks give a (len(triplets),) array; leading
+    dimensions (e.g. a session's frames) are kept, so all angles come from one
+    set of vectorized operations. An angle with a zero-length side is 0, as
+    in the per-angle calculation it replaces.
+    """
+    points = np.asarray(landmarks)[..., triplets, :3]
+    ba = points[..., 0, :] - points[..., 1, :]
+    bc = points[..., 2, :] - points[..., 1, :]
+    norms = np.sqrt(np.einsum("...i,...i->...", ba, ba) * np.einsum("...i,...i->...", bc, bc))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cos_angle = np.einsum("...i,...i->...", ba, bc) / norms
+    angles = np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+    angles[norms == 0] = 0.0
+    return angles
+
+
+def pose_results_to_arrays(results, num_landmarks=NUM_LANDMARKS):
+    """Return ``(image_landmarks, world_landmarks)`` arrays from a MediaPipe Pose result.
+
+    Either entry is None when the corresponding landmarks were not detected.
+    """
+    if not results.pose_landmarks:
+        return None, None
+    image_landmarks = landmarks_to_array(results.pose_landmarks.landmark)
+    world_landmarks = None
+    world_result = getattr(results, "pose_world_landmarks", None)
+    if world_result and len(world_result.landmark) >= num_landmarks:
+        world_landmarks = landmarks_to_array(world_result.landmark[:num_landmarks])
+    return image_landmarks, world_landmarks
@@ -0,0 +1,257 @@
+import functools
+import importlib.util
+import os
+import time
+from collections import namedtuple
+
+import cv2
+
+from metrics import stage_metrics
+from pose_features import pose_results_to_arrays
+
+PoseQuality = namedtuple("PoseQuality", ["model_complexity", "scale", "stride"])
+
+# Best to cheapest. Level 1 is the engine's original setting (default model, full frame, every frame).
+QUALITY_LEVELS = (
+    PoseQuality(model_complexity=2, scale=1.0, stride=1),
+    PoseQuality(model_complexity=1, scale=1.0, stride=1),
+    PoseQuality(model_complexity=1, scale=0.75, stride=1),
+    PoseQuality(model_complexity=0, scale=0.75, stride=1),
+    PoseQuality(model_complexity=0, scale=0.5, stride=1),
+    PoseQuality(model_complexity=0, scale=0.5, stride=2),
+    PoseQuality(model_complexity=0, scale=0.5, stride=3),
+)
+DEFAULT_QUALITY_LEVEL = 1
+
+# Landmark model of each model_complexity, under mediapipe/modules/pose_landmark. pip wheels only ship
+# the full model; MediaPipe downloads the others into site-packages when a Pose graph first needs them.
+POSE_LANDMARK_MODELS = {0: "pose_landmark_lite.tflite", 1: "pose_landmark_full.tflite", 2: "pose_landmark_heavy.tflite"}
+
+
+@functools.lru_cache(maxsize=None)
+def installed_model_complexities():
+    """Model complexities whose landmark model is installed, so building their Pose graph needs no download."""
+    spec = importlib.util.find_spec("mediapipe")
+    if spec is None or spec.origin is None:
+        return frozenset()
+    model_dir = os.path.join(os.path.dirname(spec.origin), "modules", "pose_landmark")
+    installed = frozenset(
+        complexity for complexity, name in POSE_LANDMARK_MODELS.items()
+        if os.path.isfile(os.path.join(model_dir, name))
+    )
+    missing = sorted(set(POSE_LANDMARK_MODELS) - installed)
+    if missing:
+        print(f"[PoseQuality] Pose models for complexity {missing} are not installed; "
+              f"leaving those levels out of the quality ladder")
+    return installed
+
+
+def available_quality_levels(levels=QUALITY_LEVELS, complexities=None):
+    """
+    The levels of ``levels`` whose pose model is available.
+
+    A level whose model is missing would make MediaPipe download it when the
+    controller first switches to it, on the pose thread mid-session (and fail
+    offline), so such levels are left out.
+
+    Args:
+        levels (tuple): Quality ladder, best to cheapest.
+        complexities (set | None): Available model complexities
+            (default: installed_model_complexities()).
+    """
+    if complexities is None:
+        complexities = installed_model_complexities()
+    return tuple(level for level in levels if level.model_complexity in complexities)
+
+
+class PoseQualityController:
+    """
+    Picks a pose quality level that keeps the pose stage at ``target_fps``.
+
+    ``observe(seconds)`` is fed the processing cost of every frame (near zero
+    for frames skipped by the stride). From a moving average of that cost the
+    controller estimates the sustainable frame rate, steps down the quality
+    ladder when it falls below target and steps back up when there is clear
+    headroom. Each change is followed by a settling period, and a level that
+    immediately proved too slow is retried only after an exponentially longer wait.
+    It never steps above ``min_level``, by default the engine's original setting.
+    """
+
+    def __init__(self, target_fps=20.0, levels=QUALITY_LEVELS, start_level=DEFAULT_QUALITY_LEVEL,
+                 smoothing=0.1, settle_frames=45, upgrade_headroom=1.6, min_level=DEFAULT_QUALITY_LEVEL):
+        self.target_fps = float(target_fps)
+        self.levels = tuple(levels)
+        self.level = int(start_level)
+        self.min_level = int(min_level)
+        self.smoothing = smoothing
+        self.settle_frames = settle_frames
+        self.upgrade_headroom = upgrade_headroom
+        self._avg_cost = None
+        self._frames_at_level = 0
+        self._upgraded_from = None
+        self._upgrade_wait = {}
+        self.changes = 0
+
+    @property
+    def quality(self):
+        return self.levels[self.level]
+
+    @property
+    def estimated_fps(self):
+        if not self._avg_cost:
+            return None
+        return 1.0 / self._avg_cost
+
+    def observe(self, seconds):
+        """Record one frame's processing cost; returns True if the quality level changed."""
+        if self._avg_cost is None:
+            self._avg_cost = seconds
+        else:
+            self._avg_cost += self.smoothing * (seconds - self._avg_cost)
+        self._frames_at_level += 1
+        if self._frames_at_level < self.settle_frames or not self._avg_cost:
+            return False
+
+        fps = 1.0 / self._avg_cost
+        if fps < self.target_fps * 0.95 and self.level < len(self.levels) - 1:
+            if self._upgraded_from is not None:
+                # The upgrade did not hold; back off before trying this level again
+                wait = self._upgrade_wait.get(self.level, self.settle_frames * 4)
+                self._upgrade_wait[self.level] = wait * 2
+            self._set_level(self.level + 1, upgraded_from=None)
+            return True
+
+        if fps > self.target_fps * self.upgrade_headroom and self.level > self.min_level:
+            better = self.level - 1
+            if self._frames_at_level >= self._upgrade_wait.get(better, self.settle_frames):
+                self._set_level(better, upgraded_from=self.level)
+                return True
+        return False
+
+    def reset(self):
+        """Forget the cost average (e.g. between sessions); the learned level is kept."""
+        self._avg_cost = None
+        self._frames_at_level = 0
+        self._upgraded_from = None
+
+    def _set_level(self, level, upgraded_from):
+        self.level = level
+        self._upgraded_from = upgraded_from
+        self._frames_at_level = 0
+        # Start the new level's average from scratch so the old level's cost does not linger
+        self._avg_cost = None
+        self.changes += 1
+
+
+class AdaptivePoseEstimator:
+    """
+    Runs pose estimation at the controller's current quality and fills in skipped frames.
+
+    ``pose_factory(model_complexity)`` builds a MediaPipe-style pose object
+    (re-created when the complexity changes). Frames are downscaled before
+    inference; normalized landmarks stay in the original frame's coordinates.
+    On frames skipped by the stride, landmarks are linearly extrapolated from
+    the last two estimated frames, so the counter still gets a sample every
+    frame without waiting for the next estimate.
+    """
+
+    def __init__(self, pose_factory, controller=None, landmark_converter=pose_results_to_arrays):
+        self.pose_factory = pose_factory
+        self.controller = controller or PoseQualityController()
+        self.landmark_converter = landmark_converter
+        self._pose = None
+        self._complexity = None
+        self._frames_since_estimate = None
+        self._last = None
+        self._previous = None
+        self._estimate_gap = 1
+
+    def _pose_for(self, complexity):
+        if self._pose is None or complexity != self._complexity:
+            self.close()
+            self._pose = self.pose_factory(complexity)
+            self._complexity = complexity
+        return self._pose
+
+    def warm_up(self, frame_bgr):
+        """Build the pose graph for the current level and run it once, outside the controller's timing."""
+        quality = self.controller.quality
+        self._pose_for(quality.model_complexity).process(_pose_input(frame_bgr, quality.scale))
+
+    def reset(self):
+        """Drop per-session state so a new session does not extrapolate from the last one."""
+        self._frames_since_estimate = None
+        self._last = None
+        self._previous = None
+        self._estimate_gap = 1
+        self.controller.reset()
+
+    def estimate(self, frame_bgr):
+        """
+        Return ``(image_landmarks, world_landmarks, results)`` for one BGR frame.
+
+        ``results`` is the raw pose output on estimated frames and None on
+        extrapolated ones; the landmark arrays are (33, 4) or None.
+        """
+        quality = self.controller.quality
+        due = self._frames_since_estimate is None or self._frames_since_estimate + 1 >= quality.stride
+        # Rebuilding the graph after a level change is a one-off, not part of this level's frame cost
+        pose = self._pose_for(quality.model_complexity) if due else None
+        start = time.perf_counter()
+
+        if due:
+            image = _pose_input(frame_bgr, quality.scale)
+            with stage_metrics.time("pose"):
+                results = pose.process(image)
+            with stage_metrics.time("landmarks"):
+                image_landmarks, world_landmarks = self.landmark_converter(results)
+            if self._frames_since_estimate is not None:
+                self._estimate_gap = self._frames_since_estimate + 1
+            self._previous = self._last
+            self._last = (image_landmarks, world_landmarks)
+            self._frames_since_estimate = 0
+        else:
+            results = None
+            self._frames_since_estimate += 1
+            image_landmarks, world_landmarks = self._extrapolate(self._frames_since_estimate)
+
+        self.controller.observe(time.perf_counter() - start)
+        return image_landmarks, world_landmarks, results
+
+    def _extrapolate(self, offset):
+        last_image, last_world = self._last
+        if self._previous is None:
+            return last_image, last_world
+        prev_image, prev_world = self._previous
+        ratio = offset / float(self._estimate_gap)
+        return _extrapolate_array(prev_image, last_image, ratio), _extrapolate_array(prev_world, last_world, ratio)
+
+    def close(self):
+        if self._pose is not None:
+            self._pose.close()
+            self._pose = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+def _pose_input(frame_bgr, scale):
+    """Downscale a BGR frame by ``scale`` and convert it to the RGB input MediaPipe expects."""
+    if scale != 1.0:
+        frame_bgr = cv2.resize(frame_bgr, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+
+
+def _extrapolate_array(previous, last, ratio):
+    if last is None:
+        return None
+    if previous is None:
+        return last
+    estimate = last + (last - previous) * ratio
+    # Visibility is not extrapolated
+    estimate[:, 3] = last[:, 3]
+    return estimate
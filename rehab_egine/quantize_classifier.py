@@ -0,0 +1,107 @@
+"""
+Export the activity classifier to a quantized TensorFlow Lite model.
+
+Converts transformer_model.h5 for the engine's "tflite" classifier backend
+(REHAB_CLASSIFIER_BACKEND=tflite, see engine.load_classifier). Two modes:
+
+    dynamic  int8 weights, float activations; needs no data
+    int8     int8 weights and activations, calibrated on the windows of
+             recorded session logs (--calibration); only int8 kernels, with
+             float input and output quantized at the model's edges
+
+Windows with missing world landmarks (NaN rows) are left out of calibration.
+Check the result against the Keras model with bench_classifier.py.
+
+    python quantize_classifier.py --mode int8 --calibration session_logs
+"""
+import argparse
+import os
+
+import numpy as np
+
+DEFAULT_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transformer_model.h5")
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "transformer_model_int8.tflite")
+MODES = ("dynamic", "int8")
+
+
+def calibration_windows(paths, size=16, limit=500, seed=0):
+    """Up to ``limit`` complete classifier windows, drawn evenly from the session logs under ``paths``."""
+    from rescore import find_recordings, is_session_log
+    from session_log import SessionLog
+
+    windows = []
+    for path in find_recordings(paths):
+        if not is_session_log(path):
+            continue
+        session = SessionLog(path).classifier_windows(size)
+        windows.append(session[~np.isnan(session).any(axis=(1, 2))])
+    windows = np.concatenate(windows) if windows else np.empty((0, size, 132), dtype=np.float32)
+    if len(windows) > limit:
+        windows = windows[np.random.default_rng(seed).choice(len(windows), limit, replace=False)]
+    return windows
+
+
+def export_tflite(model, output_path, mode="dynamic", calibration=None, frames=16, features=132):
+    """
+    Convert a Keras classifier to a TFLite model taking one float32 (1, frames, features) window.
+
+    Args:
+        model: The Keras activity model.
+        output_path (str): Where to write the .tflite file.
+        mode (str): "dynamic" or "int8" (see the module docstring).
+        calibration (np.ndarray): (N, frames, features) windows; required for "int8".
+
+    Returns:
+        int: Size of the written model in bytes.
+    """
+    import tensorflow as tf
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown mode: {mode}")
+    if mode == "int8" and (calibration is None or len(calibration) == 0):
+        raise ValueError("int8 export needs calibration windows from recorded session logs")
+
+    @tf.function(input_signature=[tf.TensorSpec([1, frames, features], tf.float32)])
+    def forward(windows):
+        return model(windows, training=False)
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([forward.get_concrete_function()], model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if mode == "int8":
+        def representative_dataset():
+            for window in calibration:
+                yield [np.asarray(window, dtype=np.float32)[np.newaxis]]
+
+        converter.representative_dataset = representative_dataset
+        # Fail the export rather than silently keep float kernels for ops that cannot be quantized
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    flatbuffer = converter.convert()
+    with open(output_path, "wb") as output:
+        output.write(flatbuffer)
+    return len(flatbuffer)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=DEFAULT_MODEL, help="Keras model to convert")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="TFLite model to write")
+    parser.add_argument("--mode", choices=MODES, default="dynamic", help="Quantization mode")
+    parser.add_argument("--calibration", nargs="*", default=[], help="Session logs or directories (int8 mode)")
+    parser.add_argument("--calibration-windows", type=int, default=500, help="Windows used to calibrate")
+    args = parser.parse_args(argv)
+
+    from activity_model import load_activity_model
+
+    calibration = None
+    if args.mode == "int8":
+        calibration = calibration_windows(args.calibration, limit=args.calibration_windows)
+        print(f"[Quantize] Calibrating on {len(calibration)} windows")
+    model = load_activity_model(args.model)
+    size = export_tflite(model, args.output, mode=args.mode, calibration=calibration)
+    print(f"[Quantize] Wrote {args.output} ({size / 1024:.0f} KiB, {args.mode}; "
+          f"Keras model {os.path.getsize(args.model) / 1024:.0f} KiB)")
+    return args.output
+
+
+if __name__ == "__main__":
+    main()
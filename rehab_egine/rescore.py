@@ -0,0 +1,340 @@
+"""
+Bulk re-scoring of archived exercise recordings.
+
+Re-runs counting, SPARC and ROM over many recordings with the engine's
+headless paths: ``process_video_offline`` for video files and
+``replay_session_log`` for session logs (directories with a meta.json).
+Recordings are spread over a process pool; each worker keeps one MediaPipe
+Pose graph and one classifier for every file it handles, and is limited to
+--threads-per-worker threads so throughput grows with the number of workers.
+
+Each finished recording is appended to a JSON-lines journal next to the
+output (``<output>.journal.jsonl``) as soon as it completes, so an
+interrupted run resumes where it stopped. A recording is scored again when
+its size or modification time changed, or when the scoring options, the
+classifier backend, the model file or the engine sources differ from the
+run that scored it (see scoring_fingerprint). Videos need --activity;
+session logs count their own activity unless one is given, and always
+replay with their own frame timestamps and classifier schedule. When every
+recording is done the journal is consolidated into one columnar .npz file
+(see load_results).
+
+    python rescore.py /archive/videos --activity standing_shoulder_abduction --workers 8 --output rescored.npz
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv")
+
+ENGINE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Options that change a recording's scores, per kind (threads_per_worker only changes speed)
+SCORING_OPTIONS = {
+    "video": ("activity", "fps", "classifier_stride"),
+    "log": ("activity",),
+}
+# Engine modules that decide the scores
+SCORING_SOURCES = (
+    "engine.py", "motion_signal.py", "pose_features.py", "classifier_schedule.py", "session_log.py",
+    "inference.py", "activity_model.py",
+)
+
+# Per-rep lists are stored flattened, with an offsets column per list
+REP_COLUMNS = ("rep_sparc_scores", "rep_rom_scores", "repetition_times")
+TEXT_COLUMNS = ("path", "key", "kind", "activity", "stop_reason", "error")
+
+# Set in each worker process by _init_worker
+_worker = {}
+
+
+class MissingActivity(ValueError):
+    """Raised when videos are to be scored without an activity to count."""
+
+
+def is_session_log(path):
+    return os.path.isdir(path) and os.path.isfile(os.path.join(path, "meta.json"))
+
+
+def find_recordings(paths):
+    """Video files and session logs under ``paths``, as sorted absolute paths."""
+    found = set()
+    for path in paths:
+        path = os.path.abspath(path)
+        if is_session_log(path) or (os.path.isfile(path) and path.lower().endswith(VIDEO_EXTENSIONS)):
+            found.add(path)
+            continue
+        for root, dirs, files in os.walk(path):
+            for name in list(dirs):
+                if is_session_log(os.path.join(root, name)):
+                    found.add(os.path.join(root, name))
+                    dirs.remove(name)
+            found.update(os.path.join(root, name) for name in files if name.lower().endswith(VIDEO_EXTENSIONS))
+    return sorted(found)
+
+
+def recording_kind(path):
+    return "log" if os.path.isdir(path) else "video"
+
+
+def recording_key(path, fingerprint=None):
+    """Identifies one version of a recording (path, size, modification time) scored under ``fingerprint``."""
+    stat_path = os.path.join(path, "meta.json") if os.path.isdir(path) else path
+    stat = os.stat(stat_path)
+    key = f"{path}:{stat.st_size}:{stat.st_mtime_ns}"
+    return f"{key}:{fingerprint}" if fingerprint else key
+
+
+def _digest_file(digest, path):
+    digest.update(os.path.basename(path).encode())
+    if not os.path.exists(path):
+        digest.update(b"missing")
+        return
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            digest.update(chunk)
+
+
+def scoring_fingerprint(options, kind="video"):
+    """
+    Short digest of everything besides the recording that decides its scores.
+
+    Covers the SCORING_OPTIONS of ``kind`` in ``options``, the classifier
+    backend, the model file that backend loads and the SCORING_SOURCES of the
+    engine.
+    """
+    import engine
+
+    settings = {name: options.get(name) for name in SCORING_OPTIONS[kind]}
+    settings["kind"] = kind
+    settings["classifier_backend"] = engine.classifier_backend
+    digest = hashlib.sha256(json.dumps(settings, sort_keys=True).encode())
+    if engine.classifier_backend == "tflite":
+        model_path = engine.quantized_model_path
+    else:
+        model_path = os.path.join(engine.save_model_path, "transformer_model.h5")
+    for path in (model_path,) + tuple(os.path.join(ENGINE_DIR, name) for name in SCORING_SOURCES):
+        _digest_file(digest, path)
+    return digest.hexdigest()[:16]
+
+
+def _init_worker(options):
+    """Pool initializer: one engine, classifier and Pose graph per worker process."""
+    threads = str(options["threads_per_worker"])
+    for name in ("OMP_NUM_THREADS", "TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        os.environ.setdefault(name, threads)
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+    import cv2
+
+    cv2.setNumThreads(options["threads_per_worker"])
+    _attach_engine(options)
+
+
+def _attach_engine(options):
+    import engine
+
+    _worker.update(options=options, engine=engine, pose=None)
+
+
+def _release_engine():
+    """Close the Pose graph of an in-process run and forget its engine."""
+    if _worker.get("pose") is not None:
+        _worker["pose"].close()
+    _worker.clear()
+
+
+def _worker_pose():
+    if _worker["pose"] is None:
+        _worker["pose"] = _worker["engine"].mp.solutions.pose.Pose(
+            min_detection_confidence=0.9, min_tracking_confidence=0.9
+        )
+    return _worker["pose"]
+
+
+def rescore_one(path):
+    """Score one recording in this worker; returns a journal record (errors are recorded, not raised)."""
+    engine = _worker["engine"]
+    options = _worker["options"]
+    kind = recording_kind(path)
+    record = {
+        "path": path,
+        "key": recording_key(path, options["fingerprints"][kind]),
+        "kind": kind,
+    }
+    start = time.perf_counter()
+    try:
+        if record["kind"] == "log":
+            summary = engine.replay_session_log(path, activity=options["activity"])
+        else:
+            summary = engine.process_video_offline(
+                path,
+                activity=options["activity"],
+                fps=options["fps"],
+                classifier_stride=options["classifier_stride"],
+                pose=_worker_pose(),
+            )
+        record.update(summary)
+        record["error"] = None
+    except Exception as exc:
+        record["error"] = f"{type(exc).__name__}: {exc}"
+    record["seconds"] = time.perf_counter() - start
+    record["pid"] = os.getpid()
+    return record
+
+
+def read_journal(path):
+    """Records from a journal keyed by recording key; a line cut off by an interruption is ignored."""
+    records = {}
+    if not os.path.exists(path):
+        return records
+    with open(path) as journal:
+        for line in journal:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            records[record["key"]] = record
+    return records
+
+
+def write_results(records, path):
+    """Write records as one columnar .npz: one array per field, per-rep lists flattened with offsets."""
+    columns = {name: np.array([record.get(name) or "" for record in records], dtype=str) for name in TEXT_COLUMNS}
+    columns["repetition_count"] = np.array([record.get("repetition_count", -1) for record in records], dtype=np.int64)
+    columns["target_reached"] = np.array([bool(record.get("target_reached")) for record in records], dtype=bool)
+    columns["seconds"] = np.array([record.get("seconds", np.nan) for record in records], dtype=np.float64)
+    for name in REP_COLUMNS:
+        values = [record.get(name) or [] for record in records]
+        columns[name] = np.array([value for session in values for value in session], dtype=np.float64)
+        columns[name + "_offsets"] = np.cumsum([0] + [len(session) for session in values]).astype(np.int64)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **columns)
+    os.replace(tmp_path, path)
+
+
+def load_results(path):
+    """Read a results file back as one dict per recording."""
+    with np.load(path) as data:
+        columns = {name: data[name] for name in data.files}
+    records = []
+    for index in range(columns["path"].size):
+        record = {name: str(columns[name][index]) or None for name in TEXT_COLUMNS}
+        record["repetition_count"] = int(columns["repetition_count"][index])
+        record["target_reached"] = bool(columns["target_reached"][index])
+        record["seconds"] = float(columns["seconds"][index])
+        for name in REP_COLUMNS:
+            offsets = columns[name + "_offsets"]
+            record[name] = columns[name][offsets[index]:offsets[index + 1]].tolist()
+        records.append(record)
+    return records
+
+
+def rescore(paths, output, workers=None, activity=None, fps=None, classifier_stride=1, threads_per_worker=1,
+            retry_errors=False):
+    """
+    Re-score every recording under ``paths`` into ``output``; returns the run's statistics.
+
+    Recordings already in the journal with an unchanged key, scored with the
+    same options and engine, are not scored again (failed ones are retried
+    with ``retry_errors``). With one worker, recordings are scored in this
+    process, which keeps its own environment and thread settings.
+
+    Raises:
+        MissingActivity: ``paths`` contain videos but no ``activity`` was given.
+    """
+    options = {
+        "activity": activity,
+        "fps": fps,
+        "classifier_stride": classifier_stride,
+        "threads_per_worker": threads_per_worker,
+    }
+    recordings = find_recordings(paths)
+    if activity is None and any(recording_kind(path) == "video" for path in recordings):
+        raise MissingActivity("--activity is required to score videos (session logs carry their own)")
+    options["fingerprints"] = {kind: scoring_fingerprint(options, kind) for kind in SCORING_OPTIONS}
+    journal_path = output + ".journal.jsonl"
+    done = read_journal(journal_path)
+    keys = {path: recording_key(path, options["fingerprints"][recording_kind(path)]) for path in recordings}
+    pending = [
+        path for path in recordings
+        if keys[path] not in done or (retry_errors and done[keys[path]].get("error"))
+    ]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(pending) or 1))
+    print(f"[Rescore] {len(recordings)} recordings, {len(recordings) - len(pending)} already done, "
+          f"{len(pending)} to score on {workers} worker(s)")
+
+    start = time.perf_counter()
+    if pending:
+        with open(journal_path, "a") as journal:
+            if workers == 1:
+                _attach_engine(options)
+                results = map(rescore_one, pending)
+                pool = None
+            else:
+                # Spawned, not forked: TensorFlow and MediaPipe are not fork-safe
+                pool = multiprocessing.get_context("spawn").Pool(workers, _init_worker, (options,))
+                results = pool.imap_unordered(rescore_one, pending)
+            try:
+                for finished, record in enumerate(results, 1):
+                    journal.write(json.dumps(record, default=float) + "\n")
+                    journal.flush()
+                    done[record["key"]] = record
+                    status = record["error"] or f"{record['repetition_count']} reps"
+                    print(f"[Rescore] {finished}/{len(pending)} {record['path']}: {status} ({record['seconds']:.1f}s)")
+            finally:
+                if pool is not None:
+                    pool.terminate()
+                    pool.join()
+                else:
+                    _release_engine()
+    elapsed = time.perf_counter() - start
+
+    records = [done[keys[path]] for path in recordings]
+    write_results(records, output)
+    stats = {
+        "recordings": len(recordings),
+        "scored": len(pending),
+        "failed": sum(1 for record in records if record.get("error")),
+        "workers": workers,
+        "seconds": elapsed,
+        "recordings_per_second": len(pending) / elapsed if pending and elapsed > 0 else None,
+        "output": output,
+    }
+    print(f"[Rescore] {stats}")
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Video files, session logs or directories to search")
+    parser.add_argument("--output", default="rescored.npz", help="Columnar results file (.npz)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--activity", help="Activity to count (required for videos; session logs default to their own)")
+    parser.add_argument("--fps", type=float, help="Override the videos' frame rate")
+    parser.add_argument("--classifier-stride", type=int, default=1,
+                        help="Run the classifier every N frames in videos (session logs keep their own)")
+    parser.add_argument("--threads-per-worker", type=int, default=1, help="Math library threads in each worker")
+    parser.add_argument("--retry-errors", action="store_true", help="Score recordings that failed last time again")
+    args = parser.parse_args(argv)
+    try:
+        return rescore(
+            args.paths,
+            args.output,
+            workers=args.workers,
+            activity=args.activity,
+            fps=args.fps,
+            classifier_stride=args.classifier_stride,
+            threads_per_worker=args.threads_per_worker,
+            retry_errors=args.retry_errors,
+        )
+    except MissingActivity as exc:
+        parser.error(str(exc))
+
+
+if __name__ == "__main__":
+    main()
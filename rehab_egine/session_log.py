@@ -0,0 +1,191 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from pose_features import LANDMARK_DIMS, NUM_LANDMARKS
+
+SESSION_LOG_VERSION = 1
+
+# Column name -> (dtype, per-frame shape); the class-score width comes from the log's class list
+LANDMARK_SHAPE = (NUM_LANDMARKS, LANDMARK_DIMS)
+COLUMNS = {
+    "timestamps": ("float64", ()),
+    "image_landmarks": ("float32", LANDMARK_SHAPE),
+    "world_landmarks": ("float32", LANDMARK_SHAPE),
+    "class_scores": ("float32", None),
+}
+
+
+def _column_shape(name, num_classes):
+    shape = COLUMNS[name][1]
+    return (num_classes,) if shape is None else shape
+
+
+class SessionLogWriter:
+    """
+    Appends what the engine saw, frame by frame, to a columnar session log.
+
+    A log is a directory holding ``meta.json`` and one raw binary file per
+    column: timestamps (float64 seconds, so replayed frame intervals are
+    exact), image and world landmarks (float32, 33x4, NaN when no skeleton
+    was found) and the latest classifier scores (float32, NaN before the
+    first prediction). Rows are buffered in blocks of ``block`` frames, so
+    appending costs a copy into a preallocated array. Read logs back with
+    ``SessionLog``; ``meta.json`` is rewritten with the frame count on close.
+
+    Args:
+        path (str): Log directory (created if needed).
+        classes (list[str]): Classifier labels, in score order.
+        frame_width (int): Width in pixels of the frames the landmarks came from.
+        frame_height (int): Height in pixels of the frames the landmarks came from.
+        block (int): Frames buffered in memory between writes.
+        **meta: Extra JSON-serializable session details (activity, classifier_stride, ...).
+    """
+
+    def __init__(self, path, classes, frame_width=640, frame_height=480, block=256, **meta):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.frames = 0
+        self.block = max(1, int(block))
+        self.meta = dict(meta)
+        self.meta.update({
+            "version": SESSION_LOG_VERSION,
+            "created": time.time(),
+            "classes": list(classes),
+            "frame_width": int(frame_width),
+            "frame_height": int(frame_height),
+            "frames": None,
+        })
+        num_classes = len(self.meta["classes"])
+        self._buffers = {
+            name: np.full((self.block,) + _column_shape(name, num_classes), np.nan, dtype=dtype)
+            for name, (dtype, _) in COLUMNS.items()
+        }
+        self._files = {name: open(os.path.join(path, name + ".bin"), "wb") for name in COLUMNS}
+        self._pending = 0
+        self._write_meta()
+
+    def _write_meta(self):
+        with open(os.path.join(self.path, "meta.json"), "w") as meta_file:
+            json.dump(self.meta, meta_file, indent=2)
+
+    def append(self, timestamp, image_landmarks=None, world_landmarks=None, class_scores=None):
+        """Add one frame; any of the arrays may be None."""
+        row = self._pending
+        buffers = self._buffers
+        buffers["timestamps"][row] = timestamp
+        for name, values in (
+            ("image_landmarks", image_landmarks),
+            ("world_landmarks", world_landmarks),
+            ("class_scores", class_scores),
+        ):
+            if values is None:
+                buffers[name][row] = np.nan
+            else:
+                buffers[name][row] = np.asarray(values).reshape(buffers[name].shape[1:])
+        self._pending += 1
+        self.frames += 1
+        if self._pending == self.block:
+            self.flush()
+
+    def flush(self):
+        if self._pending:
+            for name, handle in self._files.items():
+                self._buffers[name][:self._pending].tofile(handle)
+                handle.flush()
+            self._pending = 0
+
+    def close(self):
+        if self._files:
+            self.flush()
+            for handle in self._files.values():
+                handle.close()
+            self._files = {}
+            self.meta["frames"] = self.frames
+            self._write_meta()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class SessionLog:
+    """
+    Read-only, memory-mapped view of a log written by ``SessionLogWriter``.
+
+    Columns are exposed as arrays (``timestamps``, ``image_landmarks``,
+    ``world_landmarks``, ``class_scores``) mapped straight from disk, so
+    opening an hour-long log reads nothing up front. A log whose writer did
+    not close cleanly is read up to its last complete row.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as meta_file:
+            self.meta = json.load(meta_file)
+        if self.meta.get("version") != SESSION_LOG_VERSION:
+            raise ValueError(f"Unsupported session log version: {self.meta.get('version')}")
+        self.classes = self.meta["classes"]
+        self.frame_width = self.meta["frame_width"]
+        self.frame_height = self.meta["frame_height"]
+        shapes = {name: _column_shape(name, len(self.classes)) for name in COLUMNS}
+        frames = self.meta.get("frames")
+        if frames is None:
+            frames = min(
+                os.path.getsize(self._column_path(name)) // (np.dtype(dtype).itemsize * int(np.prod(shapes[name])))
+                for name, (dtype, _) in COLUMNS.items()
+            )
+        self.frames = int(frames)
+        for name, (dtype, _) in COLUMNS.items():
+            shape = (self.frames,) + shapes[name]
+            if self.frames:
+                column = np.memmap(self._column_path(name), dtype=dtype, mode="r", shape=shape)
+            else:
+                column = np.empty(shape, dtype=dtype)
+            setattr(self, name, column)
+
+    def _column_path(self, name):
+        return os.path.join(self.path, name + ".bin")
+
+    def __len__(self):
+        return self.frames
+
+    def frame(self, index):
+        """
+        One frame as ``(timestamp, image_landmarks, world_landmarks, class_scores)``.
+
+        Landmarks come back as float64 (33, 4) arrays, the form the engine
+        produces live; missing values are None.
+        """
+        return (
+            float(self.timestamps[index]),
+            _row_or_none(self.image_landmarks[index], np.float64),
+            _row_or_none(self.world_landmarks[index], np.float64),
+            _row_or_none(self.class_scores[index], np.float32),
+        )
+
+    def classifier_windows(self, size=16):
+        """
+        The classifier inputs this session produced, as a (windows, size, 132) float32 array.
+
+        Like the counter, every frame with a skeleton adds one row of world
+        landmarks (NaN where they were missing) and each full ``size``-row
+        sliding window is one input.
+        """
+        detected = ~np.isnan(self.image_landmarks).all(axis=(1, 2))
+        rows = np.asarray(self.world_landmarks[detected], dtype=np.float32).reshape(-1, NUM_LANDMARKS * LANDMARK_DIMS)
+        if len(rows) < size:
+            return np.empty((0, size, rows.shape[1]), dtype=np.float32)
+        windows = np.lib.stride_tricks.sliding_window_view(rows, size, axis=0)
+        return np.ascontiguousarray(windows.transpose(0, 2, 1))
+
+
+def _row_or_none(row, dtype):
+    row = np.asarray(row, dtype=dtype)
+    if np.isnan(row).all():
+        return None
+    return row
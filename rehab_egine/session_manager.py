@@ -0,0 +1,274 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from event_stream import EventBroker
+
+
+def default_max_sessions():
+    """Concurrent session budget: REHAB_ENGINE_MAX_SESSIONS, else half the CPU cores."""
+    raw = os.environ.get("REHAB_ENGINE_MAX_SESSIONS")
+    if raw:
+        try:
+            return max(1, int(raw))
+        except ValueError:
+            pass
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+class SessionError(Exception):
+    """Session request that cannot be served; ``status_code`` is the HTTP status to return."""
+
+    def __init__(self, message, status_code=409, **details):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.details = details
+
+
+class EngineSession:
+    """One recognition session: its own stop event, progress and result buffers."""
+
+    def __init__(self, activity, target_reps=None, resume_reps=0, duration_minutes=1, source=None,
+                 input_mode=None):
+        self.session_id = uuid.uuid4().hex[:12]
+        self.activity = activity
+        self.target_reps = target_reps
+        self.resume_reps = resume_reps
+        self.duration_minutes = duration_minutes
+        # Video path for headless "file" sessions
+        self.source = source
+        # "camera" (local webcam), "file" (recorded video) or "push" (frames sent by the client)
+        self.input_mode = input_mode or ("file" if source is not None else "camera")
+        # FrameIngestor for "push" sessions, attached by the API when the session starts
+        self.ingestor = None
+        # FramePipeline of a running camera session, for queue-depth reporting
+        self.pipeline = None
+        # Live rep/classifier/session events for streaming clients
+        self.events = EventBroker()
+        self.created_at = time.time()
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.future = None
+
+        self.is_running = False
+        # Stop was requested but the worker has not finished yet; the session still counts as running
+        self.stopping = False
+        self.current_reps = 0
+        self.target_reached = False
+        self.stop_reason = None
+        self.rep_sparc_scores = []
+        self.rep_rom_scores = []
+        self.repetition_times = []
+
+    @property
+    def uses_camera(self):
+        return self.input_mode == "camera"
+
+    def attach_pipeline(self, pipeline):
+        with self.lock:
+            self.pipeline = pipeline
+
+    def apply_result(self, result):
+        """Store the summary returned by ``process_video`` / ``process_video_offline``."""
+        if isinstance(result, dict):
+            reps = int(result.get("repetition_count", 0) or 0)
+            target_reached = bool(result.get("target_reached"))
+            stop_reason = result.get("stop_reason")
+            rep_sparc_scores = result.get("rep_sparc_scores", []) or []
+            rep_rom_scores = result.get("rep_rom_scores", []) or []
+            repetition_times = result.get("repetition_times", []) or []
+        else:
+            reps = int(result or 0)
+            target_reached = False
+            stop_reason = None
+            rep_sparc_scores = []
+            rep_rom_scores = []
+            repetition_times = []
+        with self.lock:
+            self.current_reps = reps
+            self.target_reached = target_reached
+            self.rep_sparc_scores = rep_sparc_scores
+            self.rep_rom_scores = rep_rom_scores
+            self.repetition_times = repetition_times
+            if stop_reason:
+                self.stop_reason = stop_reason
+
+    def handle_engine_event(self, kind, data):
+        """Engine ``on_event`` hook: keep the status current and forward the event to streams."""
+        if kind == "rep":
+            self.update_progress(data)
+        self.events.publish(kind, data)
+
+    def finish(self):
+        """Publish the final status and end all event streams."""
+        self.events.publish("end", self.snapshot())
+        self.events.close()
+
+    def update_progress(self, summary):
+        """Publish in-progress counts without touching the stop reason."""
+        with self.lock:
+            self.current_reps = int(summary.get("repetition_count", 0) or 0)
+            self.target_reached = bool(summary.get("target_reached"))
+            self.rep_sparc_scores = list(summary.get("rep_sparc_scores", []) or [])
+            self.rep_rom_scores = list(summary.get("rep_rom_scores", []) or [])
+            self.repetition_times = list(summary.get("repetition_times", []) or [])
+
+    def mark_error(self):
+        with self.lock:
+            self.stop_reason = "error"
+            self.rep_sparc_scores = []
+            self.rep_rom_scores = []
+            self.repetition_times = []
+
+    def snapshot(self):
+        """Status payload for this session (same keys as the original /status response)."""
+        with self.lock:
+            running_pipeline = self.pipeline if self.is_running else None
+            return {
+                "session_id": self.session_id,
+                "input_mode": self.input_mode,
+                "is_running": self.is_running,
+                "stopping": self.stopping,
+                "current_activity": self.activity if self.is_running else None,
+                "current_reps": self.current_reps,
+                "target_reps": self.target_reps,
+                "target_reached": self.target_reached,
+                "stop_reason": self.stop_reason,
+                "rep_sparc_scores": list(self.rep_sparc_scores),
+                "rep_rom_scores": list(self.rep_rom_scores),
+                "repetition_times": list(self.repetition_times),
+                "queue_depths": running_pipeline.queue_depths() if running_pipeline else None,
+            }
+
+
+class SessionManager:
+    """
+    Runs recognition sessions on a bounded worker pool, keyed by session ID.
+
+    ``runner(session)`` does the actual work and returns the session summary
+    dict. Only one session may use the local camera at a time; headless
+    sessions (file or pushed frames) run concurrently up to ``max_sessions``.
+    """
+
+    def __init__(self, runner, max_sessions=None, keep_finished=32):
+        self.runner = runner
+        self.max_sessions = max_sessions or default_max_sessions()
+        self.keep_finished = keep_finished
+        self._executor = ThreadPoolExecutor(max_workers=self.max_sessions, thread_name_prefix="rehab-session")
+        self._sessions = OrderedDict()
+        self._latest_id = None
+        self._lock = threading.Lock()
+
+    def _active(self):
+        # Includes stopping sessions: they hold a worker (and maybe the camera) until they finish
+        return [s for s in self._sessions.values() if s.is_running]
+
+    def _prune(self):
+        finished = [sid for sid, s in self._sessions.items() if not s.is_running]
+        for sid in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self._sessions[sid]
+
+    def start(self, activity, target_reps=None, resume_reps=0, duration_minutes=1, source=None,
+              input_mode=None, prepare=None):
+        """
+        Create a session and schedule it; raises SessionError when over budget or the camera is busy.
+
+        ``prepare(session)`` runs before the session is scheduled, e.g. to attach an ingestor.
+        """
+        session = EngineSession(activity, target_reps, resume_reps, duration_minutes, source, input_mode)
+        if prepare is not None:
+            prepare(session)
+        with self._lock:
+            active = self._active()
+            if session.uses_camera:
+                camera_session = next((s for s in active if s.uses_camera), None)
+                if camera_session is not None:
+                    raise SessionError(
+                        "Engine is still stopping" if camera_session.stopping else "Engine is already running",
+                        current_activity=camera_session.activity,
+                        session_id=camera_session.session_id,
+                    )
+            if len(active) >= self.max_sessions:
+                raise SessionError(
+                    f"Engine is at capacity ({self.max_sessions} concurrent sessions)",
+                    status_code=503,
+                    active_sessions=[s.session_id for s in active],
+                )
+            session.is_running = True
+            self._prune()
+            self._sessions[session.session_id] = session
+            self._latest_id = session.session_id
+            session.future = self._executor.submit(self._run, session)
+        return session
+
+    def _run(self, session):
+        try:
+            session.apply_result(self.runner(session))
+        except Exception as exc:
+            print(f"[Rehab Engine] Session {session.session_id} error: {exc}")
+            session.mark_error()
+        finally:
+            with session.lock:
+                session.is_running = False
+                if session.stopping:
+                    session.stopping = False
+                    if not session.stop_reason:
+                        session.stop_reason = "manual_stop"
+                    session.target_reached = session.stop_reason == "target_reached"
+            session.finish()
+
+    def get(self, session_id=None):
+        """Return the session with ``session_id``, or the most recently started one."""
+        with self._lock:
+            return self._sessions.get(session_id or self._latest_id)
+
+    def stop(self, session_id=None, timeout=2.0):
+        """
+        Signal a session to stop and wait briefly for its worker; raises SessionError if not running.
+
+        A worker that does not finish within ``timeout`` leaves the session
+        ``stopping``: it keeps running (and holding the camera) until the
+        worker returns.
+        """
+        session = self.get(session_id)
+        if session is None:
+            raise SessionError("Unknown session" if session_id else "Engine is not running",
+                               status_code=404 if session_id else 409)
+        with session.lock:
+            if not session.is_running:
+                raise SessionError("Engine is not running", session_id=session.session_id)
+        session.stop_event.set()
+
+        if session.future is not None:
+            try:
+                session.future.result(timeout=timeout)
+            except FutureTimeout:
+                with session.lock:
+                    # _run finishes the stop once the worker returns
+                    session.stopping = session.is_running
+                    if session.stopping:
+                        return session
+            except Exception:
+                pass
+
+        with session.lock:
+            session.is_running = False
+            if not session.stop_reason:
+                session.stop_reason = "manual_stop"
+            session.target_reached = session.stop_reason == "target_reached"
+        return session
+
+    def sessions(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def shutdown(self):
+        for session in self.sessions():
+            session.stop_event.set()
+        self._executor.shutdown(wait=False)
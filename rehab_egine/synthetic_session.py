@@ -0,0 +1,33 @@
+"""
+Simulated landmarks of an arm abduction session, shared by the benchmarks and tests.
+
+No camera or MediaPipe is involved: a random resting skeleton from
+``synthetic_base`` is swept through 4 s abduction cycles by
+``synthetic_landmarks``, with a 20 s pause every 2 minutes and small jitter.
+"""
+import numpy as np
+
+
+def synthetic_base(rng):
+    """Resting (33, 4) image landmarks: random positions, full visibility."""
+    return np.column_stack([
+        rng.uniform(0.35, 0.65, 33), rng.uniform(0.2, 0.9, 33), rng.normal(scale=0.1, size=33), np.ones(33)
+    ])
+
+
+def synthetic_landmarks(frame_index, fps, rng, base):
+    """Image and world landmarks for one frame: 4 s abduction cycles, with a 20 s pause every 2 minutes."""
+    seconds = frame_index / fps
+    moving = (seconds % 140.0) < 120.0
+    phase = np.sin(2 * np.pi * seconds / 4.0) if moving else 0.0
+    image = base.copy()
+    # Both wrists and elbows sweep up and out with the cycle
+    for wrist, elbow, side in ((15, 13, -1), (16, 14, 1)):
+        image[wrist, 0] += side * 0.18 * phase
+        image[wrist, 1] -= 0.30 * phase
+        image[elbow, 0] += side * 0.09 * phase
+        image[elbow, 1] -= 0.15 * phase
+    image[:, :3] += rng.normal(scale=0.0015, size=(33, 3))
+    world = image.copy()
+    world[:, :3] -= image[[23, 24], :3].mean(axis=0)
+    return image, world
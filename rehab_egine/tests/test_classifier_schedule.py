@@ -0,0 +1,92 @@
+"""
+Unit tests for the classifier schedule: stride, early runs on motion changes and label hysteresis
+"""
+import unittest
+
+import numpy as np
+
+from classifier_schedule import ClassifierSchedule
+
+
+def still_row(offset=0.0):
+    row = np.zeros((33, 4), dtype=np.float32)
+    row[:, 0] = offset
+    return row.ravel()
+
+
+class TestClassifierSchedule(unittest.TestCase):
+    """When the classifier runs and which label it reports"""
+
+    def test_default_runs_every_stride_rows(self):
+        schedule = ClassifierSchedule(stride=3)
+        runs = [schedule.due(still_row()) for _ in range(10)]
+        self.assertEqual(runs, [index % 3 == 0 for index in range(10)])
+        self.assertEqual(schedule.stats(), {"runs": 4, "early_runs": 0, "skipped": 6})
+
+    def test_motion_change_runs_early(self):
+        schedule = ClassifierSchedule(stride=50, energy_ratio=2.0, energy_alpha=1.0)
+        for _ in range(5):
+            schedule.due(still_row())
+        self.assertEqual(schedule.runs, 1)
+        # The fastest landmark starts moving 5 cm a frame
+        moving = still_row().reshape(33, 4)
+        due = []
+        for step in range(1, 4):
+            moving[15, 1] = 0.05 * step
+            due.append(schedule.due(moving.ravel().copy()))
+        self.assertEqual(due, [True, False, False])
+        self.assertEqual(schedule.early_runs, 1)
+
+    def test_jitter_at_rest_does_not_run_early(self):
+        schedule = ClassifierSchedule(stride=50, energy_ratio=2.0)
+        rng = np.random.default_rng(0)
+        for _ in range(40):
+            schedule.due(still_row() + rng.normal(scale=0.001, size=132).astype(np.float32))
+        self.assertEqual(schedule.early_runs, 0)
+
+    def test_raw_argmax_without_smoothing(self):
+        schedule = ClassifierSchedule()
+        self.assertEqual(schedule.update([0.1, 0.7, 0.2]), 1)
+        self.assertEqual(schedule.update([0.5, 0.2, 0.3]), 0)
+        self.assertAlmostEqual(schedule.confidence, 0.5)
+
+    def test_hysteresis_holds_label_against_small_lead(self):
+        schedule = ClassifierSchedule(smoothing=0.5, hysteresis=0.1)
+        self.assertEqual(schedule.update([0.8, 0.2]), 0)
+        # One window favouring class 1 only narrows the smoothed lead
+        self.assertEqual(schedule.update([0.3, 0.7]), 0)
+        self.assertEqual(schedule.update([0.1, 0.9]), 1)
+        schedule.reset()
+        self.assertIsNone(schedule.label)
+
+    def test_counter_counts_the_same_with_fewer_runs(self):
+        import engine
+        from synthetic_session import synthetic_base, synthetic_landmarks
+
+        scores = np.eye(len(engine.classifierClasses))[engine.activitiesName.index("standing_shoulder_abduction")]
+        summaries = []
+        for schedule in (None, engine.ADAPTIVE_CLASSIFIER_SCHEDULE):
+            calls = []
+
+            def predict(window):
+                calls.append(1)
+                return scores
+
+            rng = np.random.default_rng(7)
+            base = synthetic_base(rng)
+            counter = engine.ExerciseCounter(
+                "standing_shoulder_abduction", predict=predict, classifier_schedule=schedule
+            )
+            for index in range(30 * 30):
+                image, world = synthetic_landmarks(index, 30.0, rng, base)
+                counter.process_frame(index / 30.0, image, world)
+            counter.close()
+            summaries.append((counter.summary()["repetition_count"], len(calls)))
+        (reps, calls), (adaptive_reps, adaptive_calls) = summaries
+        self.assertGreater(reps, 0)
+        self.assertEqual(adaptive_reps, reps)
+        self.assertLessEqual(adaptive_calls * 6, calls)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Unit tests for the cached info panel renderer
+"""
+import os
+import unittest
+
+import cv2
+import numpy as np
+
+from display_panel import InfoPanelRenderer
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+# Name -> (activity, reps, target, elapsed seconds, duration minutes, skeleton detected). The
+# tests/data/panel_<name>.png frames were drawn by the original inline panel code of process_video
+# (commit 728fe17), from golden_input()
+GOLDEN_CASES = {
+    "abduction": ("standing_shoulder_abduction", 3, 10, 75.4, 2, True),
+    "elbow_no_target": ("custom_elbow_flexion", 0, None, 5.9, 1, False),
+    "unknown_activity": (None, 12, None, 3599.9, 60, True),
+}
+
+
+def golden_input(height=480, width=640):
+    """Deterministic BGR camera frame: an 8x8 board of coloured squares (scaled unevenly by the resize)."""
+    rows, cols = np.indices((height, width))
+    board = (rows * 8 // height + cols * 8 // width) % 2
+    return np.dstack([40 + 160 * board, 200 - 120 * board, np.full((height, width), 96)]).astype(np.uint8)
+
+
+class TestInfoPanelRenderer(unittest.TestCase):
+    """Incremental redraws must match a full redraw"""
+
+    def test_incremental_matches_full_redraw(self):
+        rng = np.random.default_rng(0)
+        renderer = InfoPanelRenderer("standing_shoulder_abduction", 10, 2)
+        reps = 0
+        for index in range(120):
+            frame = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+            reps += index % 29 == 0
+            elapsed = index * 0.4
+            skeleton = (index // 11) % 2 == 0
+            output = renderer.render(frame, reps, elapsed, skeleton)
+            fresh = InfoPanelRenderer("standing_shoulder_abduction", 10, 2).render(frame, reps, elapsed, skeleton)
+            np.testing.assert_array_equal(output, fresh)
+
+    def test_matches_original_panel(self):
+        for name, (activity, reps, target, elapsed, duration, skeleton) in GOLDEN_CASES.items():
+            with self.subTest(name=name):
+                golden = cv2.imread(os.path.join(DATA_DIR, f"panel_{name}.png"))
+                output = InfoPanelRenderer(activity, target, duration).render(golden_input(), reps, elapsed, skeleton)
+                np.testing.assert_array_equal(output, golden)
+
+    def test_output_buffer_is_reused(self):
+        renderer = InfoPanelRenderer(None, None, 1, width=320, height=400, panel_width=260)
+        frame = np.zeros((240, 320, 3), dtype=np.uint8)
+        first = renderer.render(frame, 0, 0.0, False)
+        second = renderer.render(frame, 1, 1.0, True)
+        self.assertIs(first, second)
+        self.assertEqual(second.shape, (400, 580, 3))
+
+    def test_unchanged_values_are_not_redrawn(self):
+        renderer = InfoPanelRenderer("run", 5, 1)
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        renderer.render(frame, 2, 3.2, True)
+        drawn = dict(renderer._drawn)
+        renderer._panel[:] = 0  # anything redrawn would repaint the cards
+        renderer.render(frame, 2, 3.9, True)
+        self.assertEqual(renderer._drawn, drawn)
+        self.assertFalse(renderer._panel[:500].any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+"""
+Unit tests for request validation in the engine API
+"""
+import json
+import os
+import tempfile
+import unittest
+
+import engine_api
+from session_manager import EngineSession
+
+
+class TestMediaPath(unittest.TestCase):
+    """File sessions may only read files under the media directory"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.media = os.path.join(self.tmp.name, "media")
+        os.makedirs(os.path.join(self.media, "patient"))
+        self.video = os.path.join(self.media, "patient", "session.mp4")
+        open(self.video, "wb").close()
+        self.outside = os.path.join(self.tmp.name, "secret.mp4")
+        open(self.outside, "wb").close()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_relative_and_absolute_inside(self):
+        expected = os.path.realpath(self.video)
+        self.assertEqual(engine_api._resolve_media_path("patient/session.mp4", self.media), expected)
+        self.assertEqual(engine_api._resolve_media_path(self.video, self.media), expected)
+
+    def test_rejects_paths_outside(self):
+        for source in ("../secret.mp4", self.outside, "patient/../../secret.mp4", "patient", "", None, 3):
+            self.assertIsNone(engine_api._resolve_media_path(source, self.media), source)
+
+    def test_rejects_symlink_out(self):
+        link = os.path.join(self.media, "link.mp4")
+        try:
+            os.symlink(self.outside, link)
+        except (OSError, NotImplementedError):
+            self.skipTest("symlinks unavailable")
+        self.assertIsNone(engine_api._resolve_media_path("link.mp4", self.media))
+
+    def test_start_rejects_outside_source(self):
+        client = engine_api.app.test_client()
+        response = client.post("/start", json={"activity": "custom_elbow_flexion", "source": self.outside})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(engine_api.sessions.sessions(), [])
+
+
+class TestPushFrames(unittest.TestCase):
+    """Malformed pushed frames are rejected, not crashed on"""
+
+    def test_non_object_frames(self):
+        client = engine_api.app.test_client()
+        started = client.post("/start", json={"activity": "custom_elbow_flexion", "input": "push"}).get_json()
+        session_id = started["session_id"]
+        try:
+            url = f"/sessions/{session_id}/frames"
+            response = client.post(url, json={"frames": [[0.0] * 132]})
+            self.assertEqual(response.status_code, 400)
+            response = client.post(url, data='"frame"\n{"landmarks": null}\n', content_type="application/x-ndjson")
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+            self.assertIn("error", lines[0])
+            self.assertEqual(lines[1]["frame"], 1)
+        finally:
+            client.post("/stop", json={"session_id": session_id})
+
+
+class SessionRecorder:
+    def __init__(self):
+        self.calls = []
+
+    def run_session(self, **session_args):
+        self.calls.append(session_args)
+        return {"repetition_count": 0}
+
+
+class TestClassifierSchedule(unittest.TestCase):
+    """Every kind of session classifies on the configured schedule"""
+
+    def setUp(self):
+        self.saved = engine_api.camera_worker
+        engine_api.camera_worker = SessionRecorder()
+
+    def tearDown(self):
+        engine_api.camera_worker = self.saved
+
+    def test_default_is_adaptive(self):
+        self.assertEqual(engine_api.CLASSIFIER_SCHEDULE, engine_api.ADAPTIVE_CLASSIFIER_SCHEDULE)
+
+    def test_camera_session(self):
+        session = EngineSession("custom_elbow_flexion")
+        engine_api._run_engine(session)
+        call, = engine_api.camera_worker.calls
+        self.assertEqual(call["classifier_schedule"], engine_api.CLASSIFIER_SCHEDULE)
+
+    def test_push_session(self):
+        client = engine_api.app.test_client()
+        started = client.post("/start", json={"activity": "custom_elbow_flexion", "input": "push"}).get_json()
+        try:
+            session = engine_api.sessions.get(started["session_id"])
+            schedule = session.ingestor.counter.schedule
+            self.assertEqual(schedule.stride, engine_api.CLASSIFIER_SCHEDULE["stride"])
+            self.assertEqual(schedule.smoothing, engine_api.CLASSIFIER_SCHEDULE["smoothing"])
+        finally:
+            client.post("/stop", json={"session_id": started["session_id"]})
+
+
+class StartRecorder:
+    def __init__(self):
+        self.starts = 0
+
+    def start(self):
+        self.starts += 1
+        return self
+
+
+class TestStartWarmUp(unittest.TestCase):
+    """Warm-up runs in every serving process, but not in the reloader's watcher"""
+
+    def setUp(self):
+        self.saved = (engine_api.classifier_loader, engine_api.camera_worker, os.environ.get("WERKZEUG_RUN_MAIN"))
+        engine_api.classifier_loader = StartRecorder()
+        engine_api.camera_worker = StartRecorder()
+        os.environ.pop("WERKZEUG_RUN_MAIN", None)
+
+    def tearDown(self):
+        engine_api.classifier_loader, engine_api.camera_worker, run_main = self.saved
+        if run_main is None:
+            os.environ.pop("WERKZEUG_RUN_MAIN", None)
+        else:
+            os.environ["WERKZEUG_RUN_MAIN"] = run_main
+
+    def test_without_reloader(self):
+        self.assertTrue(engine_api.start_warm_up(debug=False))
+        self.assertEqual(engine_api.camera_worker.starts, 1)
+        self.assertEqual(engine_api.classifier_loader.starts, 1)
+
+    def test_reloader_watcher_skips(self):
+        self.assertFalse(engine_api.start_warm_up(debug=True))
+        self.assertEqual(engine_api.camera_worker.starts, 0)
+
+    def test_reloader_child_warms_up(self):
+        os.environ["WERKZEUG_RUN_MAIN"] = "true"
+        self.assertTrue(engine_api.start_warm_up(debug=True))
+        self.assertEqual(engine_api.camera_worker.starts, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+"""
+Unit tests for the warm camera worker and background model loader
+"""
+import threading
+import unittest
+
+from engine_worker import BackgroundLoader, CameraWorker
+
+
+class FakeResources:
+    opened = 0
+
+    def __init__(self, camera_ok=True):
+        self.camera_ok = camera_ok
+        self.is_open = False
+        self.closed = False
+        self.warm_up_seconds = None
+        self.last_start_seconds = None
+
+    def open(self):
+        FakeResources.opened += 1
+        self.is_open = self.camera_ok
+        self.warm_up_seconds = 0.5
+        return self
+
+    def close(self):
+        self.closed = True
+        self.is_open = False
+
+
+class TestCameraWorker(unittest.TestCase):
+    """Warm-up, reuse across sessions and cold fallback"""
+
+    def setUp(self):
+        self.calls = []
+
+    def process(self, resources=None, **session_args):
+        self.calls.append((resources, session_args))
+        if resources is not None:
+            resources.last_start_seconds = 0.01
+        return {"activity": session_args.get("activity")}
+
+    def test_sessions_reuse_warm_resources(self):
+        worker = CameraWorker(FakeResources, self.process).start()
+        self.assertTrue(worker.wait_ready(5))
+        opened = FakeResources.opened
+        worker.run_session(activity="run")
+        worker.run_session(activity="jump")
+        self.assertEqual(FakeResources.opened, opened)
+        self.assertIs(self.calls[0][0], worker.resources)
+        self.assertIs(self.calls[1][0], worker.resources)
+        self.assertEqual(self.calls[1][1], {"activity": "jump"})
+        probe = worker.readiness()
+        self.assertEqual(probe["status"], "ready")
+        self.assertEqual(probe["warm_sessions"], 2)
+        self.assertEqual(probe["last_start_seconds"], 0.01)
+        self.assertEqual(probe["warm_up_seconds"], 0.5)
+
+    def test_not_ready_runs_cold(self):
+        worker = CameraWorker(FakeResources, self.process)
+        self.assertEqual(worker.readiness()["status"], "idle")
+        worker.run_session(activity="run")
+        self.assertIsNone(self.calls[0][0])
+        self.assertEqual(worker.readiness()["cold_sessions"], 1)
+
+    def test_camera_failure_reports_error(self):
+        worker = CameraWorker(lambda: FakeResources(camera_ok=False), self.process).start()
+        self.assertFalse(worker.wait_ready(5))
+        probe = worker.readiness()
+        self.assertEqual(probe["status"], "error")
+        self.assertIn("camera", probe["error"])
+        worker.run_session(activity="run")
+        self.assertIsNone(self.calls[0][0])
+
+    def test_busy_resources_wait_then_fail(self):
+        entered = threading.Event()
+        release = threading.Event()
+
+        def blocking_process(resources=None, **session_args):
+            self.calls.append((resources, session_args))
+            if resources is not None:
+                entered.set()
+                release.wait(5)
+            return {}
+
+        worker = CameraWorker(FakeResources, blocking_process, wait_seconds=0.05).start()
+        worker.wait_ready(5)
+        first = threading.Thread(target=worker.run_session, kwargs={"activity": "run"})
+        first.start()
+        self.assertTrue(entered.wait(5))
+        self.assertTrue(worker.readiness()["busy"])
+        with self.assertRaises(RuntimeError):
+            worker.run_session(activity="jump")
+        self.assertEqual(len(self.calls), 1)
+
+        # Once the previous session lets go, the next one gets the warm resources
+        worker.wait_seconds = 5
+        second = threading.Thread(target=worker.run_session, kwargs={"activity": "jump"})
+        second.start()
+        release.set()
+        first.join(5)
+        second.join(5)
+        self.assertIs(self.calls[1][0], worker.resources)
+        self.assertEqual(worker.readiness()["cold_sessions"], 0)
+        self.assertFalse(worker.readiness()["busy"])
+
+    def test_session_during_warm_up_waits(self):
+        release = threading.Event()
+
+        class SlowResources(FakeResources):
+            def open(self):
+                release.wait(5)
+                return super().open()
+
+        worker = CameraWorker(SlowResources, self.process, wait_seconds=0.05).start()
+        with self.assertRaises(RuntimeError):
+            worker.run_session(activity="run")
+        self.assertEqual(self.calls, [])
+        release.set()
+        worker.wait_seconds = 5
+        worker.run_session(activity="run")
+        self.assertIs(self.calls[0][0], worker.resources)
+
+    def test_close_releases_resources(self):
+        worker = CameraWorker(FakeResources, self.process).start()
+        worker.wait_ready(5)
+        resources = worker.resources
+        worker.close()
+        self.assertTrue(resources.closed)
+        self.assertEqual(worker.readiness()["status"], "idle")
+
+
+class TestBackgroundLoader(unittest.TestCase):
+    """Background loading, on-demand loading and failures"""
+
+    def test_background_load(self):
+        release = threading.Event()
+        loader = BackgroundLoader(lambda: release.wait(5) and "model", name="test")
+        self.assertEqual(loader.status()["state"], "idle")
+        loader.start()
+        self.assertEqual(loader.state, "loading")
+        with self.assertRaises(TimeoutError):
+            loader.get(timeout=0.01)
+        release.set()
+        self.assertEqual(loader.get(timeout=5), "model")
+        status = loader.status()
+        self.assertEqual(status["state"], "ready")
+        self.assertIsNotNone(status["load_seconds"])
+
+    def test_get_loads_once_on_demand(self):
+        calls = []
+        loader = BackgroundLoader(lambda: calls.append(1) or "model")
+        self.assertEqual(loader.get(), "model")
+        self.assertEqual(loader.get(), "model")
+        loader.start()
+        self.assertEqual(len(calls), 1)
+
+    def test_failure_is_reported(self):
+        def fail():
+            raise IOError("missing model file")
+
+        loader = BackgroundLoader(fail, name="test").start()
+        with self.assertRaises(RuntimeError):
+            loader.get(timeout=5)
+        self.assertEqual(loader.status(), {"state": "error", "load_seconds": None, "error": "missing model file"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Unit tests for the engine event broker
+"""
+import threading
+import unittest
+
+from event_stream import EventBroker
+
+
+class TestEventBroker(unittest.TestCase):
+    """Test fan-out, replay and shutdown of event streams"""
+
+    def setUp(self):
+        self.broker = EventBroker(history=4, subscriber_queue=3)
+
+    def test_fan_out_to_subscribers(self):
+        first = self.broker.subscribe()
+        second = self.broker.subscribe()
+        self.broker.publish("rep", {"repetition_count": 1})
+        for subscription in (first, second):
+            event = subscription.get(timeout=0.1)
+            self.assertEqual(event["event"], "rep")
+            self.assertEqual(event["data"], {"repetition_count": 1})
+
+    def test_get_times_out_without_events(self):
+        subscription = self.broker.subscribe()
+        self.assertIsNone(subscription.get(timeout=0.01))
+
+    def test_slow_subscriber_drops_oldest(self):
+        subscription = self.broker.subscribe()
+        for count in range(5):
+            self.broker.publish("rep", count)
+        self.assertEqual([subscription.get(0)["data"] for _ in range(3)], [2, 3, 4])
+        self.assertEqual(subscription.dropped, 2)
+
+    def test_resume_after_last_event_id(self):
+        for count in range(6):
+            self.broker.publish("rep", count)
+        subscription = self.broker.subscribe(last_event_id=4)
+        self.assertEqual([subscription.get(0)["id"] for _ in range(2)], [5, 6])
+
+    def test_close_ends_stream_after_drain(self):
+        subscription = self.broker.subscribe()
+        self.broker.publish("end", {})
+        threading.Timer(0.05, self.broker.close).start()
+        self.assertEqual(subscription.get(timeout=1)["event"], "end")
+        with self.assertRaises(EOFError):
+            subscription.get(timeout=1)
+        self.assertIsNone(self.broker.publish("rep", {}))
+        self.assertEqual(self.broker.subscriber_count, 0)
+
+    def test_unsubscribe(self):
+        subscription = self.broker.subscribe()
+        subscription.close()
+        self.broker.publish("rep", {})
+        self.assertEqual(self.broker.subscriber_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+Unit tests for pushed-frame ingestion and its serving loop
+"""
+import threading
+import time
+import unittest
+
+import engine
+
+
+class RecordingIngestor(engine.FrameIngestor):
+    """Notes the thread that counted each frame."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def _count(self, *args):
+        self.threads.append(threading.current_thread())
+        return super()._count(*args)
+
+
+class TestFrameIngestor(unittest.TestCase):
+    """Inline processing, worker-thread processing and session end"""
+
+    def serve_in_background(self, ingestor, **kwargs):
+        stop = threading.Event()
+        thread = threading.Thread(target=ingestor.serve, args=(stop,), kwargs=kwargs, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 2.0
+        while not ingestor._serving and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return stop, thread
+
+    def test_inline_without_serve(self):
+        ingestor = RecordingIngestor("custom_elbow_flexion")
+        update = ingestor.push_landmarks(None, timestamp=0.0)
+        self.assertEqual(update["frame"], 1)
+        self.assertFalse(update["skeleton_detected"])
+        self.assertIs(ingestor.threads[0], threading.current_thread())
+
+    def test_frames_processed_on_serving_thread(self):
+        ingestor = RecordingIngestor("custom_elbow_flexion")
+        stop, thread = self.serve_in_background(ingestor)
+        for index in range(3):
+            update = ingestor.push_landmarks(None, timestamp=index / 30.0)
+        self.assertEqual(update["frame"], 3)
+        self.assertTrue(all(worker is thread for worker in ingestor.threads))
+        stop.set()
+        thread.join(2.0)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(ingestor.summary()["stop_reason"], "manual_stop")
+        with self.assertRaises(engine.IngestorClosed):
+            ingestor.push_landmarks(None)
+
+    def test_errors_reach_the_caller(self):
+        ingestor = engine.FrameIngestor("custom_elbow_flexion")
+        stop, thread = self.serve_in_background(ingestor)
+        with self.assertRaises(ValueError):
+            ingestor.push_jpeg(b"not a jpeg")
+        self.assertEqual(ingestor.push_landmarks(None)["frame"], 1)
+        stop.set()
+        thread.join(2.0)
+
+    def test_idle_timeout(self):
+        ingestor = engine.FrameIngestor("custom_elbow_flexion")
+        ingestor.serve(threading.Event(), idle_timeout=0.05, poll_seconds=0.01)
+        self.assertEqual(ingestor.summary()["stop_reason"], "idle_timeout")
+        with self.assertRaises(engine.IngestorClosed):
+            ingestor.push_landmarks(None)
+
+    def test_deadline(self):
+        ingestor = engine.FrameIngestor("custom_elbow_flexion")
+        ingestor.serve(threading.Event(), idle_timeout=10.0, deadline=time.monotonic() + 0.05, poll_seconds=0.01)
+        self.assertEqual(ingestor.summary()["stop_reason"], "duration_exceeded")
+
+
+if __name__ == '__main__':
+    unittest.main()
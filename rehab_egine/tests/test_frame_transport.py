@@ -0,0 +1,91 @@
+"""
+Unit tests for the shared-memory frame ring and the inference process
+"""
+import functools
+import time
+import unittest
+from multiprocessing import shared_memory
+
+from frame_transport import InferenceProcess, SharedFrameRing
+
+
+class FrameStats:
+    """Worker run in the child: reports what it saw in the shared buffer."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+
+    def __call__(self, frame, timestamp):
+        time.sleep(self.delay)
+        return int(frame[0, 0, 0]), int(frame.sum()), timestamp * 2
+
+
+class Failing:
+    def __call__(self, frame, timestamp):
+        raise ValueError("no pose graph")
+
+
+class TestSharedFrameRing(unittest.TestCase):
+    """Views onto one block, attached by name"""
+
+    def test_attach_sees_the_same_buffers(self):
+        ring = SharedFrameRing(3, (4, 5, 3))
+        other = SharedFrameRing.attach(ring.spec())
+        ring.frames[1][...] = 7
+        self.assertEqual(int(other.frames[1].sum()), 7 * 60)
+        other.frames[2][0, 0, 0] = 9
+        self.assertEqual(ring.frames[2][0, 0, 0], 9)
+        other.close()
+        name = ring.spec()[0]
+        ring.close()
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+class TestInferenceProcess(unittest.TestCase):
+    """Results, skipping stale frames and failures"""
+
+    def test_results_come_back_for_each_slot(self):
+        with InferenceProcess(FrameStats, (6, 8, 3), slots=3) as remote:
+            slots = []
+            for value in range(3):
+                slot = remote.acquire()
+                remote.frame(slot)[...] = value
+                remote.submit(slot, float(value))
+                slots.append(slot)
+                # One at a time, so nothing is skipped
+                result_slot, timestamp, output = remote.result(timeout=60)
+                self.assertEqual(result_slot, slot)
+                self.assertEqual(output, (value, value * 6 * 8 * 3, value * 2.0))
+                remote.release(result_slot)
+            self.assertEqual(remote.in_flight, 0)
+            self.assertEqual(remote.stats()["completed"], 3)
+
+    def test_slow_worker_skips_to_newest_frame(self):
+        with InferenceProcess(functools.partial(FrameStats, delay=0.2), (2, 2, 3), slots=4) as remote:
+            for value in range(4):
+                slot = remote.acquire()
+                remote.frame(slot)[...] = value
+                remote.submit(slot, float(value))
+            self.assertIsNone(remote.acquire())
+            outputs = []
+            while remote.in_flight:
+                slot, timestamp, output = remote.result(timeout=60)
+                outputs.append(output)
+                remote.release(slot)
+            # The newest frame is always processed; every slot comes back
+            self.assertEqual(outputs[-1][0], 3)
+            self.assertEqual(len(outputs), 4)
+            self.assertEqual(remote.stats()["skipped"], outputs.count(None))
+            self.assertIsNotNone(remote.acquire())
+
+    def test_worker_failure_is_raised(self):
+        with InferenceProcess(Failing, (2, 2, 3)) as remote:
+            slot = remote.acquire()
+            remote.submit(slot, 0.0)
+            with self.assertRaises(RuntimeError):
+                remote.result(timeout=60)
+
+
+if __name__ == '__main__':
+    unittest.main()
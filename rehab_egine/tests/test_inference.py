@@ -0,0 +1,43 @@
+"""
+Unit tests for the graph-compiled classifier inference path
+"""
+import unittest
+
+import numpy as np
+
+from activity_model import load_activity_model
+from inference import CompiledClassifier, _TimedClassifier
+from quantize_classifier import DEFAULT_MODEL
+
+
+class TestCompiledClassifier(unittest.TestCase):
+    """Same probabilities as the Keras model, single and batched"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model = load_activity_model(DEFAULT_MODEL)
+        cls.windows = np.random.default_rng(4).normal(scale=0.3, size=(3, 16, 132)).astype(np.float32)
+
+    def test_matches_model_predict(self):
+        classifier = CompiledClassifier(self.model)
+        expected = self.model.predict(self.windows, verbose=0)
+        np.testing.assert_allclose(classifier.predict(self.windows[0]), expected[0], rtol=1e-5, atol=1e-6)
+        np.testing.assert_allclose(classifier.predict_batch(self.windows), expected, rtol=1e-5, atol=1e-6)
+
+    def test_latency_stats(self):
+        classifier = CompiledClassifier(self.model)
+        self.assertIsNone(classifier.latency_stats()["p99_ms"])
+        for window in self.windows:
+            classifier.predict(window)
+        stats = classifier.latency_stats()
+        self.assertEqual(stats["calls"], 3)
+        self.assertLessEqual(stats["p50_ms"], stats["p99_ms"])
+        self.assertIsNotNone(classifier.last_latency)
+
+    def test_backend_base_is_abstract(self):
+        with self.assertRaises(TypeError):
+            _TimedClassifier()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+"""
+Unit tests for engine stage metrics
+"""
+import unittest
+
+from metrics import StageMetrics, prometheus_text
+
+
+class TestStageMetrics(unittest.TestCase):
+    """Test rolling quantiles and Prometheus rendering"""
+
+    def setUp(self):
+        self.metrics = StageMetrics(window=100)
+
+    def test_rolling_quantiles(self):
+        for value in range(1, 201):
+            self.metrics.observe("pose", value / 1000.0)
+        snap = self.metrics.snapshot()["pose"]
+        self.assertEqual(snap["count"], 200)
+        self.assertAlmostEqual(snap["sum"], sum(range(1, 201)) / 1000.0)
+        # Only the last 100 samples (0.101 .. 0.200 s) are in the window
+        self.assertAlmostEqual(snap["quantiles"][0.5], 0.1505, places=6)
+        self.assertGreater(snap["quantiles"][0.99], snap["quantiles"][0.95])
+
+    def test_timer_records_sample(self):
+        with self.metrics.time("inference"):
+            pass
+        self.assertEqual(self.metrics.snapshot()["inference"]["count"], 1)
+
+    def test_prometheus_text(self):
+        self.metrics.observe("render", 0.004)
+        text = prometheus_text(self.metrics, series=[
+            ("queue_depth", "gauge", "Frames waiting.", [({"session_id": "abc", "queue": "pose"}, 2)]),
+        ])
+        self.assertIn("# TYPE rehab_engine_stage_latency_seconds summary", text)
+        self.assertIn('rehab_engine_stage_latency_seconds{stage="render",quantile="0.99"} 0.004', text)
+        self.assertIn('rehab_engine_stage_latency_seconds_count{stage="render"} 1', text)
+        self.assertIn('rehab_engine_queue_depth{session_id="abc",queue="pose"} 2', text)
+        self.assertTrue(text.endswith("\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
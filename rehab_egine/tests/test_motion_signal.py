@@ -0,0 +1,64 @@
+"""
+Unit tests for the rehab engine motion-signal helpers
+"""
+import unittest
+import numpy as np
+
+from motion_signal import MotionAutocorrelation, pearson_autocorrelation, pearson_autocorrelation_fft
+
+
+def synthetic_motion(n, period=45, seed=0):
+    """Noisy periodic motion trace similar to `motion_amplitude * overall_direction`"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n)
+    return 20 * np.sin(2 * np.pi * t / period) + rng.normal(0, 2, n)
+
+
+class TestPearsonAutocorrelation(unittest.TestCase):
+    """Test the FFT autocorrelation against the reference loop"""
+
+    def test_matches_reference(self):
+        for n in (1, 2, 5, 64, 301, 800):
+            signal = synthetic_motion(n, seed=n)
+            np.testing.assert_allclose(
+                pearson_autocorrelation_fft(signal), pearson_autocorrelation(signal), atol=1e-9
+            )
+
+    def test_constant_signal_is_zero(self):
+        np.testing.assert_array_equal(pearson_autocorrelation_fft(np.full(50, 3.0)), np.zeros(50))
+
+    def test_empty_signal(self):
+        self.assertEqual(pearson_autocorrelation_fft([]).size, 0)
+
+
+class TestMotionAutocorrelation(unittest.TestCase):
+    """Test the motion-distance buffer used by process_video"""
+
+    def test_tracks_list_semantics(self):
+        """append / pop(0) / [k:] should behave like the original list"""
+        buffer = MotionAutocorrelation(capacity=100)
+        reference = []
+        for i, value in enumerate(synthetic_motion(600)):
+            buffer.append(value)
+            reference.append(value)
+            if len(reference) > 100:
+                reference.pop(0)
+                buffer.popleft()
+            if i % 97 == 0:
+                reference = reference[13:]
+                buffer.popleft(13)
+            np.testing.assert_array_equal(buffer.values(), reference)
+
+        np.testing.assert_allclose(
+            buffer.autocorrelation(), pearson_autocorrelation(np.array(reference)), atol=1e-9
+        )
+
+    def test_grows_past_capacity(self):
+        buffer = MotionAutocorrelation(capacity=4)
+        for value in range(20):
+            buffer.append(value)
+        np.testing.assert_array_equal(buffer.values(), np.arange(20))
+
+
+if __name__ == '__main__':
+    unittest.main()
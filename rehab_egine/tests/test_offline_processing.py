@@ -0,0 +1,151 @@
+"""
+Unit tests for offline processing of frame iterables with process_video_offline
+"""
+import math
+import threading
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+import engine
+
+FPS = 30.0
+PERIOD = 50
+
+
+def elbow_flexion_pose(frame_index, rng):
+    """(33, 4) image landmarks of a right elbow flexing once every PERIOD frames."""
+    landmarks = np.zeros((33, 4))
+    landmarks[:, 0] = 0.5 + rng.normal(0, 0.002, 33)
+    landmarks[:, 1] = np.linspace(0.1, 0.9, 33) + rng.normal(0, 0.002, 33)
+    landmarks[:, 3] = 0.99
+    landmarks[11, :2] = (0.60, 0.30)
+    landmarks[12, :2] = (0.40, 0.30)
+    landmarks[23, :2] = (0.58, 0.60)
+    landmarks[24, :2] = (0.42, 0.60)
+    landmarks[14, :2] = (0.42, 0.45)
+    angle = (1 - math.cos(2 * math.pi * frame_index / PERIOD)) / 2 * math.pi * 0.8
+    landmarks[16, :2] = (0.42, 0.45 + 0.15 * math.cos(angle))
+    landmarks[16, 2] = -0.15 * math.sin(angle)
+    landmarks[:, :2] += rng.normal(0, 0.001, (33, 2))
+    return landmarks
+
+
+def encoded_frames(count, height=48, width=64):
+    """Small BGR frames carrying their index in the first two pixels, for ScriptedPose."""
+    for index in range(count):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        frame[0, 0, 1] = index % 256
+        frame[0, 1, 1] = index // 256
+        yield frame
+
+
+class ScriptedPose:
+    """Stands in for the MediaPipe pose graph: returns elbow_flexion_pose for the frame index in the pixels."""
+
+    def __init__(self):
+        self.rng = np.random.default_rng(5)
+        self.resets = 0
+        self.closed = False
+        self.frames = 0
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+    def process(self, image):
+        self.frames += 1
+        index = int(image[0, 0, 1]) + 256 * int(image[0, 1, 1])
+        rows = elbow_flexion_pose(index, self.rng)
+        landmark = [SimpleNamespace(x=x, y=y, z=z, visibility=v) for x, y, z, v in rows]
+        world = [SimpleNamespace(x=x - 0.5, y=y - 0.5, z=z, visibility=v) for x, y, z, v in rows]
+        return SimpleNamespace(
+            pose_landmarks=SimpleNamespace(landmark=landmark),
+            pose_world_landmarks=SimpleNamespace(landmark=world),
+        )
+
+
+class TestProcessVideoOffline(unittest.TestCase):
+    """Counting, stop reasons and pose graph ownership on a frame iterable"""
+
+    def run_offline(self, frames=10 * PERIOD, **kwargs):
+        pose = ScriptedPose()
+        summary = engine.process_video_offline(
+            encoded_frames(frames), activity="custom_elbow_flexion", fps=FPS, pose=pose, **kwargs
+        )
+        return summary, pose
+
+    def test_counts_every_flexion(self):
+        summary, pose = self.run_offline()
+        self.assertEqual(pose.frames, 10 * PERIOD)
+        self.assertEqual(summary["repetition_count"], 10)
+        self.assertEqual(summary["stop_reason"], "stopped")
+
+    def test_reused_pose_is_reset_not_closed(self):
+        _, pose = self.run_offline(frames=PERIOD)
+        self.assertEqual(pose.resets, 1)
+        self.assertFalse(pose.closed)
+
+    def test_stops_at_target(self):
+        summary, pose = self.run_offline(target_reps=3)
+        self.assertEqual(summary["repetition_count"], 3)
+        self.assertEqual(summary["stop_reason"], "target_reached")
+        self.assertLess(pose.frames, 4 * PERIOD)
+
+    def test_stops_at_duration(self):
+        summary, pose = self.run_offline(duration_minutes=5 / 60)
+        self.assertEqual(summary["stop_reason"], "duration_exceeded")
+        self.assertEqual(pose.frames, int(5 * FPS) + 1)
+
+    def test_stop_event(self):
+        stop = threading.Event()
+        stop.set()
+        summary, pose = self.run_offline(stop_event=stop)
+        self.assertEqual(summary["stop_reason"], "manual_stop")
+        self.assertEqual(pose.frames, 0)
+
+
+class TestRepSampleLimit(unittest.TestCase):
+    """Per-rep buffers are sized per counter, without touching the module default"""
+
+    def test_unbounded_counter(self):
+        counter = engine.ExerciseCounter("custom_elbow_flexion", rep_sample_limit=None)
+        self.assertIsNone(counter.current_rep_signal.maxlen)
+        self.assertIsNone(counter.custom_detector.current_rep_angles.maxlen)
+        default = engine.ExerciseCounter("custom_elbow_flexion")
+        self.assertEqual(default.current_rep_angles.maxlen, engine.REP_SAMPLE_LIMIT)
+        self.assertEqual(default.custom_detector.current_rep_angles.maxlen, engine.REP_SAMPLE_LIMIT)
+
+
+class TestPredictWithoutScores(unittest.TestCase):
+    """A predictor returning None leaves the classifier label alone"""
+
+    def test_none_keeps_label(self):
+        activity = "standing_shoulder_abduction"
+        scores = np.eye(len(engine.classifierClasses))[engine.activitiesName.index(activity)]
+        replies = []
+
+        def predict(window):
+            return replies.pop(0) if replies else None
+
+        counter = engine.ExerciseCounter(activity, predict=predict)
+        rng = np.random.default_rng(2)
+        for index in range(counter.noOfFrameSize + 3):
+            image = elbow_flexion_pose(index, rng)
+            counter.process_frame(index / FPS, image, image)
+        self.assertIsNone(counter.class_scores)
+        self.assertIsNone(counter.schedule.label)
+
+        replies.append(scores)
+        counter.process_frame(1.0, image, image)
+        self.assertEqual(counter.current_activity, activity)
+        counter.process_frame(1.1, image, image)
+        self.assertEqual(counter.current_activity, activity)
+        np.testing.assert_array_equal(counter.class_scores, scores)
+
+
+if __name__ == '__main__':
+    unittest.main()
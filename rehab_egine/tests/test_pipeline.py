@@ -0,0 +1,123 @@
+"""
+Unit tests for the threaded frame pipeline
+"""
+import threading
+import time
+import unittest
+
+from pipeline import END, FramePipeline, StageQueue
+
+
+def counting_source(limit):
+    items = iter(range(limit))
+
+    def source():
+        return next(items, END)
+    return source
+
+
+class TestStageQueue(unittest.TestCase):
+    """Test drop-stale and back-pressure hand-off"""
+
+    def test_drop_stale_keeps_freshest(self):
+        q = StageQueue("capture", maxsize=1, drop_stale=True)
+        for item in range(5):
+            self.assertTrue(q.put(item))
+        self.assertEqual(q.get(timeout=0.1), 4)
+        self.assertEqual(q.dropped, 4)
+
+    def test_end_marker_does_not_replace_frame(self):
+        q = StageQueue("capture", maxsize=1, drop_stale=True)
+        q.put("last")
+        halt = threading.Event()
+        threading.Timer(0.1, lambda: q.get(timeout=1)).start()
+        self.assertTrue(q.put(END, halt))
+        self.assertIs(q.get(timeout=0.1), END)
+
+    def test_blocking_put_stops_on_halt(self):
+        q = StageQueue("pose", maxsize=1, drop_stale=False)
+        q.put(1)
+        halt = threading.Event()
+        halt.set()
+        self.assertFalse(q.put(2, halt))
+        self.assertEqual(q.dropped, 0)
+
+
+class TestFramePipeline(unittest.TestCase):
+    """Test stage chaining, shutdown and stats"""
+
+    def test_lossless_pipeline_preserves_order(self):
+        pipeline = (
+            FramePipeline()
+            .add_stage("capture", counting_source(50), maxsize=2, drop_stale=False)
+            .add_stage("double", lambda x: x * 2, maxsize=2, drop_stale=False)
+            .start()
+        )
+        self.assertEqual(list(pipeline.results()), [x * 2 for x in range(50)])
+        pipeline.stop()
+        stats = pipeline.stats()
+        self.assertEqual(stats["processed"], {"capture": 50, "double": 50})
+        self.assertEqual(set(pipeline.queue_depths()), {"capture", "double"})
+
+    def test_slow_consumer_drops_stale_frames(self):
+        def slow(x):
+            time.sleep(0.005)
+            return x
+
+        pipeline = (
+            FramePipeline()
+            .add_stage("capture", counting_source(200), maxsize=1, drop_stale=True)
+            .add_stage("slow", slow, maxsize=4, drop_stale=False)
+            .start()
+        )
+        seen = list(pipeline.results())
+        pipeline.stop()
+        self.assertEqual(seen, sorted(seen))
+        self.assertEqual(seen[-1], 199)
+        self.assertGreater(pipeline.stats()["queues"]["capture"]["dropped"], 0)
+
+    def test_last_predicate_ends_stream(self):
+        pipeline = (
+            FramePipeline()
+            .add_stage("capture", counting_source(100), maxsize=4, drop_stale=False)
+            .add_stage("count", lambda x: x, maxsize=4, drop_stale=False, last=lambda x: x == 9)
+            .start()
+        )
+        self.assertEqual(list(pipeline.results()), list(range(10)))
+        pipeline.stop()
+
+    def test_stage_error_halts_pipeline(self):
+        def broken(x):
+            raise RuntimeError("pose failed")
+
+        pipeline = (
+            FramePipeline()
+            .add_stage("capture", counting_source(10), maxsize=1, drop_stale=False)
+            .add_stage("pose", broken, maxsize=1, drop_stale=False)
+            .start()
+        )
+        self.assertEqual(list(pipeline.results()), [])
+        pipeline.stop()
+        self.assertIsInstance(pipeline.error, RuntimeError)
+
+    def test_stop_reports_stages_still_running(self):
+        release = threading.Event()
+
+        def slow(x):
+            release.wait(5)
+            return x
+
+        pipeline = (
+            FramePipeline()
+            .add_stage("capture", counting_source(10), maxsize=1, drop_stale=False)
+            .add_stage("classify", slow, maxsize=1, drop_stale=False)
+            .start()
+        )
+        time.sleep(0.05)
+        self.assertFalse(pipeline.stop(timeout=0.05))
+        release.set()
+        self.assertTrue(pipeline.join())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+"""
+Unit tests for the rehab engine landmark feature helpers
+"""
+import unittest
+import numpy as np
+
+from types import SimpleNamespace
+
+from pose_features import (
+    JOINT_TRIPLETS,
+    RIGHT_ELBOW_ANGLE,
+    LandmarkWindow,
+    joint_angles,
+    landmark_motion,
+    landmarks_to_array,
+)
+
+
+class TestLandmarkWindow(unittest.TestCase):
+    """Test the ring-buffer classifier window"""
+
+    def test_partial_window_returns_filled_rows(self):
+        window = LandmarkWindow(size=4, features=3)
+        window.append([1, 1, 1])
+        window.append([2, 2, 2])
+
+        self.assertFalse(window.is_full())
+        np.testing.assert_array_equal(window.view()[:, 0], [1, 2])
+
+    def test_matches_dataframe_sliding_window(self):
+        """Window contents should equal the last `size` rows, oldest first"""
+        window = LandmarkWindow(size=16, features=132)
+        rows = np.random.default_rng(0).random((40, 132)).astype(np.float32)
+        for i, row in enumerate(rows):
+            window.append(row)
+            expected = rows[max(0, i - 15):i + 1]
+            np.testing.assert_array_equal(window.view(), expected)
+
+    def test_view_is_contiguous_and_zero_copy(self):
+        window = LandmarkWindow(size=16, features=132)
+        for i in range(21):
+            window.append(np.full(132, i, dtype=np.float32))
+
+        view = window.view()
+        self.assertTrue(view.flags['C_CONTIGUOUS'])
+        self.assertTrue(np.shares_memory(view, window._buffer))
+        self.assertEqual(view.reshape(1, 16, 132, 1).shape, (1, 16, 132, 1))
+
+    def test_missing_landmarks_stored_as_nan(self):
+        window = LandmarkWindow(size=2, features=4)
+        window.append([])
+        self.assertTrue(np.isnan(window.view()).all())
+
+
+class TestLandmarkMotion(unittest.TestCase):
+    """Test per-frame landmark conversion and motion deltas"""
+
+    def test_landmarks_to_array(self):
+        landmarks = [SimpleNamespace(x=i, y=i + 0.5, z=-i, visibility=0.9) for i in range(33)]
+        array = landmarks_to_array(landmarks)
+        self.assertEqual(array.shape, (33, 4))
+        np.testing.assert_allclose(array[5], [5, 5.5, -5, 0.9])
+
+    def test_motion_matches_per_landmark_loop(self):
+        rng = np.random.default_rng(1)
+        prev = rng.random((33, 4))
+        curr = prev + rng.normal(0, 0.1, (33, 4))
+        width, height, delta_limit = 640, 480, 60
+
+        total_dx, total_dy = 0, 0
+        for i in range(33):
+            dx = curr[i, 0] * width - prev[i, 0] * width
+            dy = curr[i, 1] * height - prev[i, 1] * height
+            total_dx += max(-delta_limit, min(delta_limit, dx))
+            total_dy += max(-delta_limit, min(delta_limit, dy))
+
+        _, _, deltas = landmark_motion(curr, prev, width, height, delta_limit)
+        np.testing.assert_allclose(deltas.sum(axis=0), [total_dx, total_dy])
+        self.assertTrue((np.abs(deltas) <= delta_limit).all())
+
+
+
+def reference_angle(a, b, c):
+    """Angle ABC in degrees from landmark objects, as the engine computed it one angle at a time."""
+    ba = np.array([a.x, a.y, a.z]) - np.array([b.x, b.y, b.z])
+    bc = np.array([c.x, c.y, c.z]) - np.array([b.x, b.y, b.z])
+    ba_norm = np.linalg.norm(ba)
+    bc_norm = np.linalg.norm(bc)
+    if ba_norm == 0 or bc_norm == 0:
+        return 0.0
+    cos_angle = np.clip(np.dot(ba, bc) / (ba_norm * bc_norm), -1.0, 1.0)
+    return np.degrees(np.arccos(cos_angle))
+
+
+class TestJointAngles(unittest.TestCase):
+    """Test the batched joint-angle kernel"""
+
+    def test_matches_per_angle_calculation(self):
+        landmarks = np.random.default_rng(2).normal(size=(33, 4))
+        points = [SimpleNamespace(x=x, y=y, z=z) for x, y, z, _ in landmarks]
+        expected = [reference_angle(*(points[index] for index in triplet)) for triplet in JOINT_TRIPLETS]
+        np.testing.assert_allclose(joint_angles(landmarks), expected, rtol=1e-12)
+
+    def test_right_angle_and_degenerate_side(self):
+        landmarks = np.zeros((33, 4))
+        shoulder, elbow, wrist = JOINT_TRIPLETS[RIGHT_ELBOW_ANGLE]
+        landmarks[shoulder, :3] = (0.0, -1.0, 0.0)
+        landmarks[wrist, :3] = (1.0, 0.0, 0.0)
+        self.assertAlmostEqual(joint_angles(landmarks)[RIGHT_ELBOW_ANGLE], 90.0)
+        landmarks[wrist] = landmarks[elbow]
+        self.assertEqual(joint_angles(landmarks)[RIGHT_ELBOW_ANGLE], 0.0)
+
+    def test_custom_triplets(self):
+        landmarks = np.zeros((3, 3))
+        landmarks[0] = (1.0, 0.0, 0.0)
+        landmarks[2] = (-1.0, 0.0, 0.0)
+        angles = joint_angles(landmarks, np.array([(0, 1, 2), (0, 1, 0)]))
+        np.testing.assert_allclose(angles, [180.0, 0.0], atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
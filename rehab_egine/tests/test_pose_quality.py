@@ -0,0 +1,202 @@
+"""
+Unit tests for the adaptive pose quality controller and estimator
+"""
+import time
+import unittest
+
+import numpy as np
+
+from pose_quality import (
+    DEFAULT_QUALITY_LEVEL,
+    QUALITY_LEVELS,
+    AdaptivePoseEstimator,
+    PoseQuality,
+    PoseQualityController,
+    available_quality_levels,
+    installed_model_complexities,
+)
+
+
+class FakePose:
+    """Records the frame sizes it sees and returns the call number as its result"""
+
+    def __init__(self, model_complexity):
+        self.model_complexity = model_complexity
+        self.shapes = []
+        self.closed = False
+
+    def process(self, image):
+        self.shapes.append(image.shape)
+        return len(self.shapes)
+
+    def close(self):
+        self.closed = True
+
+
+def moving_landmarks(call):
+    """Landmarks drifting by 0.01 per estimate, with visibility equal to the call number"""
+    image = np.full((33, 4), 0.01 * call)
+    image[:, 3] = call
+    return image, image.copy()
+
+
+class TestPoseQualityController(unittest.TestCase):
+    """Level changes from synthetic per-frame costs"""
+
+    def run_costs(self, controller, seconds, frames):
+        return [controller.observe(seconds) for _ in range(frames)]
+
+    def test_slow_frames_step_down_after_settling(self):
+        controller = PoseQualityController(target_fps=20, settle_frames=10)
+        changes = self.run_costs(controller, 0.1, 9)
+        self.assertFalse(any(changes))
+        self.assertTrue(controller.observe(0.1))
+        self.assertEqual(controller.level, 2)
+        self.run_costs(controller, 0.1, 10)
+        self.assertEqual(controller.level, 3)
+
+    def test_steady_target_holds_level(self):
+        controller = PoseQualityController(target_fps=20, settle_frames=10)
+        self.assertFalse(any(self.run_costs(controller, 1 / 25.0, 200)))
+        self.assertEqual(controller.quality, QUALITY_LEVELS[1])
+        self.assertAlmostEqual(controller.estimated_fps, 25.0)
+
+    def test_headroom_steps_up(self):
+        controller = PoseQualityController(target_fps=20, start_level=4, settle_frames=10)
+        self.run_costs(controller, 0.01, 10)
+        self.assertEqual(controller.level, 3)
+
+    def test_failed_upgrade_backs_off(self):
+        controller = PoseQualityController(target_fps=20, start_level=2, settle_frames=10)
+        self.run_costs(controller, 0.01, 10)
+        self.assertEqual(controller.level, 1)
+        # Level 1 is too slow: drop back and wait longer before retrying it
+        self.run_costs(controller, 0.1, 10)
+        self.assertEqual(controller.level, 2)
+        self.run_costs(controller, 0.01, 79)
+        self.assertEqual(controller.level, 2)
+        self.run_costs(controller, 0.01, 1)
+        self.assertEqual(controller.level, 1)
+        self.run_costs(controller, 0.1, 10)
+        self.run_costs(controller, 0.01, 159)
+        self.assertEqual(controller.level, 2)
+
+    def test_default_never_steps_above_original_level(self):
+        controller = PoseQualityController(target_fps=20, settle_frames=5)
+        self.assertFalse(any(self.run_costs(controller, 0.001, 50)))
+        self.assertEqual(controller.level, DEFAULT_QUALITY_LEVEL)
+
+    def test_bounds(self):
+        controller = PoseQualityController(target_fps=20, start_level=0, settle_frames=5, min_level=0)
+        self.assertFalse(any(self.run_costs(controller, 0.001, 50)))
+        last = len(QUALITY_LEVELS) - 1
+        controller = PoseQualityController(target_fps=20, start_level=last, settle_frames=5)
+        self.assertFalse(any(self.run_costs(controller, 1.0, 50)))
+        controller = PoseQualityController(target_fps=20, start_level=3, settle_frames=5, min_level=3)
+        self.assertFalse(any(self.run_costs(controller, 0.001, 50)))
+
+
+class TestAvailableLevels(unittest.TestCase):
+    """Levels whose pose model is not installed are left out"""
+
+    def test_filters_by_complexity(self):
+        levels = available_quality_levels(complexities={1})
+        self.assertTrue(levels)
+        self.assertTrue(all(level.model_complexity == 1 for level in levels))
+        self.assertIn(QUALITY_LEVELS[DEFAULT_QUALITY_LEVEL], levels)
+
+    def test_installed_complexities_need_no_download(self):
+        self.assertLessEqual(installed_model_complexities(), {0, 1, 2})
+        self.assertEqual(available_quality_levels(complexities=set()), ())
+
+
+class TestAdaptivePoseEstimator(unittest.TestCase):
+    """Stride, downscaling and extrapolation of skipped frames"""
+
+    def make_estimator(self, *levels, **controller_args):
+        self.poses = []
+
+        def factory(model_complexity):
+            pose = FakePose(model_complexity)
+            self.poses.append(pose)
+            return pose
+
+        controller = PoseQualityController(levels=levels, start_level=0, settle_frames=10 ** 6, **controller_args)
+        return AdaptivePoseEstimator(factory, controller, moving_landmarks)
+
+    def test_downscales_before_inference(self):
+        estimator = self.make_estimator(PoseQuality(model_complexity=0, scale=0.5, stride=1))
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        image, world, results = estimator.estimate(frame)
+        self.assertEqual(self.poses[0].shapes, [(240, 320, 3)])
+        self.assertEqual(self.poses[0].model_complexity, 0)
+        self.assertEqual(results, 1)
+        np.testing.assert_allclose(image[:, :3], 0.01)
+
+    def test_stride_extrapolates_skipped_frames(self):
+        estimator = self.make_estimator(PoseQuality(model_complexity=1, scale=1.0, stride=3))
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        outputs = [estimator.estimate(frame) for _ in range(7)]
+        self.assertEqual(len(self.poses[0].shapes), 3)
+        self.assertEqual([results for _, _, results in outputs], [1, None, None, 2, None, None, 3])
+        # Before a second estimate the last one is held
+        np.testing.assert_allclose(outputs[1][0][:, :3], 0.01)
+        # Afterwards positions continue along the last step; visibility is not extrapolated
+        np.testing.assert_allclose(outputs[4][0][:, :3], 0.02 + 0.01 / 3)
+        np.testing.assert_allclose(outputs[5][1][:, :3], 0.02 + 0.02 / 3)
+        np.testing.assert_allclose(outputs[5][0][:, 3], 2)
+
+    def test_missing_landmarks_stay_missing(self):
+        estimator = self.make_estimator(PoseQuality(model_complexity=1, scale=1.0, stride=2))
+        estimator.landmark_converter = lambda results: (None, None)
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        for _ in range(4):
+            image, world, _ = estimator.estimate(frame)
+            self.assertIsNone(image)
+            self.assertIsNone(world)
+
+    def test_complexity_change_recreates_pose(self):
+        estimator = self.make_estimator(
+            PoseQuality(model_complexity=1, scale=1.0, stride=1),
+            PoseQuality(model_complexity=0, scale=1.0, stride=1),
+        )
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        estimator.estimate(frame)
+        estimator.controller.level = 1
+        estimator.estimate(frame)
+        self.assertEqual([pose.model_complexity for pose in self.poses], [1, 0])
+        self.assertTrue(self.poses[0].closed)
+        with estimator:
+            pass
+        self.assertTrue(self.poses[1].closed)
+
+    def test_graph_rebuild_is_not_timed(self):
+        def slow_factory(model_complexity):
+            time.sleep(0.2)
+            return FakePose(model_complexity)
+
+        controller = PoseQualityController(
+            levels=(PoseQuality(model_complexity=1, scale=1.0, stride=1),), start_level=0, min_level=0,
+            settle_frames=10 ** 6,
+        )
+        estimator = AdaptivePoseEstimator(slow_factory, controller, moving_landmarks)
+        estimator.estimate(np.zeros((48, 64, 3), dtype=np.uint8))
+        self.assertGreater(controller.estimated_fps, 20)
+
+    def test_reset_starts_a_fresh_session(self):
+        estimator = self.make_estimator(PoseQuality(model_complexity=1, scale=0.5, stride=2))
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        estimator.warm_up(frame)
+        self.assertEqual(self.poses[0].shapes, [(24, 32, 3)])
+        self.assertIsNone(estimator.controller.estimated_fps)
+        for _ in range(3):
+            estimator.estimate(frame)
+        estimator.reset()
+        self.assertIsNone(estimator.controller.estimated_fps)
+        # The first frame after a reset is always estimated, on the same pose graph
+        self.assertEqual(estimator.estimate(frame)[2], 4)
+        self.assertEqual(len(self.poses), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
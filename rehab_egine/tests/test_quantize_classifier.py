@@ -0,0 +1,68 @@
+"""
+Unit tests for the quantized classifier export and the TFLite backend
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import bench_classifier
+import quantize_classifier
+from activity_model import load_activity_model
+from inference import CompiledClassifier, TFLiteClassifier
+
+
+class TestQuantizedClassifier(unittest.TestCase):
+    """Export, the TFLite backend and the comparison against Keras"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.model = load_activity_model(quantize_classifier.DEFAULT_MODEL)
+        cls.path = os.path.join(cls.tmp.name, "classifier.tflite")
+        quantize_classifier.export_tflite(cls.model, cls.path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+
+    def test_tflite_backend_matches_keras(self):
+        windows = bench_classifier.synthetic_windows(40)
+        reference = CompiledClassifier(self.model)
+        candidate = TFLiteClassifier(self.path)
+        result = bench_classifier.compare(reference, candidate, windows)
+        self.assertEqual(result["windows"], 40)
+        self.assertGreaterEqual(result["agreement"], 0.9)
+        self.assertEqual(sum(label["windows"] for label in result["per_label"].values()), 40)
+        self.assertEqual(set(result["latency"]), {"keras", "tflite"})
+
+    def test_batch_matches_single_windows(self):
+        windows = bench_classifier.synthetic_windows(3)
+        classifier = TFLiteClassifier(self.path)
+        batch = classifier.predict_batch(windows)
+        self.assertEqual(batch.shape, (3, 12))
+        np.testing.assert_allclose(batch[1], classifier.predict(windows[1]), rtol=1e-6)
+        self.assertEqual(classifier.latency_stats()["calls"], 2)
+
+    def test_int8_export_uses_int8_kernels(self):
+        path = os.path.join(self.tmp.name, "classifier_int8.tflite")
+        quantize_classifier.export_tflite(
+            self.model, path, mode="int8", calibration=bench_classifier.synthetic_windows(20)
+        )
+        import tensorflow as tf
+
+        tensors = tf.lite.Interpreter(model_path=path).get_tensor_details()
+        self.assertTrue(any(tensor["dtype"] == np.int8 for tensor in tensors))
+        candidate = TFLiteClassifier(path)
+        windows = bench_classifier.synthetic_windows(20)
+        result = bench_classifier.compare(CompiledClassifier(self.model), candidate, windows)
+        self.assertGreaterEqual(result["agreement"], 0.9)
+
+    def test_int8_needs_calibration(self):
+        with self.assertRaises(ValueError):
+            quantize_classifier.export_tflite(self.model, os.path.join(self.tmp.name, "x.tflite"), mode="int8")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,220 @@
+"""
+Parity tests for the online repetition detector against the original
+autocorrelation peak counter, on motion traces of ExerciseCounter driven by
+synthetic (generated, not recorded) abduction landmarks, on irregular
+generated traces with noise, drift, pauses and varying tempo, and on
+generated run, jump and extension traces against the counter tuned for each
+"""
+import csv
+import os
+import unittest
+
+import numpy as np
+
+import engine
+from motion_signal import AutocorrelationRepCounter, OnlineRepDetector
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+TRACE_PERIODS = (40, 50, 70, 90)
+
+MOTION_AMPLITUDE_THRESHOLD = 8
+MIN_COUNT_FRAME_GAP = 30
+IRREGULAR_CYCLES = 14
+ACTIVITY_CYCLES = 12
+TUNED_ACTIVITIES = ("run", "jump", "standing_shoulder_extension")
+
+
+def load_trace(period):
+    """Rows of (frame, amplitude, direction, activity_match) from ExerciseCounter on synthetic abduction."""
+    with open(os.path.join(DATA_DIR, f"synthetic_abduction_motion_p{period}.csv"), newline="") as handle:
+        return [
+            (int(row["frame"]), float(row["amplitude"]), int(row["direction"]), row["activity_match"] == "1")
+            for row in csv.DictReader(handle)
+        ]
+
+
+def irregular_trace(seed, cycles=IRREGULAR_CYCLES):
+    """
+    Rows like load_trace for ``cycles`` reps of uneven tempo and range, with
+    mid-rep hesitations, slow drift, frame noise and brief activity dropouts.
+    """
+    rng = np.random.default_rng(seed)
+    velocity = []
+    for _ in range(cycles):
+        period = int(rng.integers(35, 95))
+        cycle = rng.uniform(12, 35) * np.sin(2 * np.pi * np.arange(period) / period)
+        if rng.uniform() < 0.3:
+            pause = int(rng.integers(0, period))
+            cycle = np.insert(cycle, pause, np.full(int(rng.integers(5, 25)), cycle[pause] * 0.1))
+        velocity.extend(cycle)
+    velocity = np.asarray(velocity)
+    velocity += 1.5 * np.sin(np.arange(len(velocity)) / 160.0) + rng.normal(0, 2.0, len(velocity))
+    activity_match = np.ones(len(velocity), dtype=bool)
+    for start in rng.integers(60, len(velocity) - 20, 3):
+        activity_match[start:start + int(rng.integers(3, 12))] = False
+    return [
+        (frame, float(abs(value)), int(np.sign(value)), bool(match))
+        for frame, (value, match) in enumerate(zip(velocity, activity_match), start=1)
+    ]
+
+
+def periodic_trace(period, seed, cycles=ACTIVITY_CYCLES, lead_in=40):
+    """Rows like load_trace for ``cycles`` even reps of ``period`` frames after a still lead-in."""
+    rng = np.random.default_rng(seed)
+    velocity = 20 * np.sin(2 * np.pi * np.arange(period * cycles) / period)
+    velocity = np.concatenate([np.zeros(lead_in), velocity]) + rng.normal(0, 1.5, lead_in + period * cycles)
+    return [
+        (frame, float(abs(value)), int(np.sign(value)), frame > lead_in)
+        for frame, value in enumerate(velocity, start=1)
+    ]
+
+
+def tuned_reference(activity):
+    """The autocorrelation counter ExerciseCounter builds for ``activity``, with its per-activity tuning."""
+    return engine.ExerciseCounter(activity, rep_detector="autocorrelation").rep_detector
+
+
+def replay(rows, detector):
+    """Apply ExerciseCounter's counting gates to a trace; returns the frames where reps were counted."""
+    rep_frames = []
+    last_count_frame = -9999
+    first_activity_detected = False
+    for frame, amplitude, direction, activity_match in rows:
+        if (
+            activity_match
+            and not first_activity_detected
+            and frame - last_count_frame > MIN_COUNT_FRAME_GAP
+            and frame > 30
+            and amplitude > MOTION_AMPLITUDE_THRESHOLD
+        ):
+            rep_frames.append(frame)
+            first_activity_detected = True
+            last_count_frame = frame
+
+        eligible = (
+            amplitude > MOTION_AMPLITUDE_THRESHOLD
+            and activity_match
+            and frame - last_count_frame > MIN_COUNT_FRAME_GAP
+        )
+        if detector.update(frame, amplitude * direction, eligible):
+            rep_frames.append(frame)
+            last_count_frame = frame
+    return rep_frames
+
+
+def counts_by_frame(rep_frames, frames):
+    return np.searchsorted(np.asarray(rep_frames), np.asarray(frames), side="right")
+
+
+class TestOnlineRepDetectorParity(unittest.TestCase):
+    """Compare rep counts of the online detector and the autocorrelation counter"""
+
+    def assert_parity(self, rows, reference_detector=None):
+        if reference_detector is None:
+            reference_detector = AutocorrelationRepCounter(buffer_limit=800, min_distance=20)
+        reference = replay(rows, reference_detector)
+        online = replay(rows, OnlineRepDetector(threshold=MOTION_AMPLITUDE_THRESHOLD))
+        self.assertEqual(len(online), len(reference))
+
+        # Reps may land a few frames apart, but never more than one rep apart at any point
+        frames = [row[0] for row in rows]
+        drift = counts_by_frame(online, frames) - counts_by_frame(reference, frames)
+        self.assertLessEqual(np.abs(drift).max(), 1)
+        return reference, online
+
+    def test_synthetic_traces(self):
+        for period in TRACE_PERIODS:
+            with self.subTest(period=period):
+                reference, _ = self.assert_parity(load_trace(period))
+                self.assertGreater(len(reference), 5)
+
+    def test_activity_mismatch_blocks_counting(self):
+        rows = [(frame, amplitude, direction, False) for frame, amplitude, direction, _ in load_trace(50)]
+        reference, online = self.assert_parity(rows)
+        self.assertEqual(online, [])
+
+    def test_pause_between_sets(self):
+        rows = load_trace(50)
+        paused = rows[:400] + [(frame + 300, 0.5, 1, True) for frame, _, _, _ in rows[100:400]]
+        paused += [(frame + 300, amplitude, direction, match) for frame, amplitude, direction, match in rows[400:]]
+        self.assert_parity(paused)
+
+    def test_irregular_traces(self):
+        # The autocorrelation counter misses reps here, so compare both against the true rep count
+        for seed in range(5):
+            with self.subTest(seed=seed):
+                rows = irregular_trace(seed)
+                reference = replay(rows, AutocorrelationRepCounter(buffer_limit=800, min_distance=20))
+                online = replay(rows, OnlineRepDetector(threshold=MOTION_AMPLITUDE_THRESHOLD))
+                self.assertLessEqual(abs(len(online) - IRREGULAR_CYCLES), 1)
+                self.assertLessEqual(abs(len(online) - IRREGULAR_CYCLES), abs(len(reference) - IRREGULAR_CYCLES))
+
+    def test_tuned_activities(self):
+        # Run and jump use min_distance=2 and peak height 0.4, extension a 500-sample buffer
+        for activity in TUNED_ACTIVITIES:
+            for period in (40, 50, 70, 90):
+                with self.subTest(activity=activity, period=period):
+                    reference, _ = self.assert_parity(periodic_trace(period, seed=period), tuned_reference(activity))
+                    self.assertEqual(len(reference), ACTIVITY_CYCLES)
+
+    def test_fast_cycles_undercount(self):
+        # Below ~40 frames per cycle the 30-frame count gap drops online reps the reference still
+        # finds, which is why ExerciseCounter keeps the autocorrelation counter by default
+        for activity in TUNED_ACTIVITIES:
+            for period in (20, 30):
+                with self.subTest(activity=activity, period=period):
+                    rows = periodic_trace(period, seed=period)
+                    reference = replay(rows, tuned_reference(activity))
+                    online = replay(rows, OnlineRepDetector(threshold=MOTION_AMPLITUDE_THRESHOLD))
+                    self.assertLess(len(online), len(reference))
+
+
+class TestRepDetectorSelection(unittest.TestCase):
+    """ExerciseCounter counts with the tuned autocorrelation counter unless asked for the online one"""
+
+    def test_default_is_tuned_autocorrelation(self):
+        for activity, min_distance, peak_height, buffer_limit in (
+            ("run", 2, 0.4, 800),
+            ("jump", 2, 0.4, 800),
+            ("standing_shoulder_extension", 20, 0.0, 500),
+            ("standing_shoulder_abduction", 20, 0.0, 800),
+        ):
+            with self.subTest(activity=activity):
+                detector = engine.ExerciseCounter(activity).rep_detector
+                self.assertIsInstance(detector, AutocorrelationRepCounter)
+                self.assertEqual(
+                    (detector.min_distance, detector.peak_height, detector.buffer_limit),
+                    (min_distance, peak_height, buffer_limit),
+                )
+
+    def test_online_opt_in(self):
+        counter = engine.ExerciseCounter("run", rep_detector="online")
+        self.assertIsInstance(counter.rep_detector, OnlineRepDetector)
+
+
+class TestOnlineRepDetector(unittest.TestCase):
+    """Test cycle detection and hysteresis"""
+
+    def test_counts_one_rep_per_cycle(self):
+        detector = OnlineRepDetector(threshold=8)
+        signal = 20 * np.sin(2 * np.pi * np.arange(300) / 50)
+        fired = [frame for frame, sample in enumerate(signal) if detector.update(frame, sample)]
+        # The first half-cycle only primes the detector
+        self.assertEqual(len(fired), 5)
+        self.assertEqual(detector.cycle_frames, 50)
+
+    def test_jitter_inside_band_is_ignored(self):
+        detector = OnlineRepDetector(threshold=8)
+        jitter = [7, -7, 6, -6, 7.9, -7.9] * 20
+        self.assertFalse(any(detector.update(frame, sample) for frame, sample in enumerate(jitter)))
+
+    def test_ineligible_cycle_is_consumed(self):
+        detector = OnlineRepDetector(threshold=8)
+        for frame, sample in enumerate([10, -10]):
+            detector.update(frame, sample)
+        self.assertFalse(detector.update(2, 10, eligible=False))
+        self.assertFalse(detector.update(3, 10, eligible=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+"""
+Unit tests for bulk re-scoring: discovery, resuming and the columnar results file
+"""
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+import rescore
+from session_log import SessionLogWriter
+
+
+def write_session_log(path, seconds, fps=30.0):
+    import engine
+    from synthetic_session import synthetic_base, synthetic_landmarks
+
+    rng = np.random.default_rng(11)
+    base = synthetic_base(rng)
+    scores = np.eye(len(engine.classifierClasses))[engine.activitiesName.index("standing_shoulder_abduction")]
+    with SessionLogWriter(path, engine.classifierClasses, activity="standing_shoulder_abduction") as writer:
+        for index in range(int(seconds * fps)):
+            image, world = synthetic_landmarks(index, fps, rng, base)
+            writer.append(index / fps, image, world, scores)
+
+
+class TestRescore(unittest.TestCase):
+    """Discovery, resuming and the results file"""
+
+    def test_find_recordings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "patient", "log1"))
+            open(os.path.join(tmp, "patient", "log1", "meta.json"), "w").close()
+            for name in ("a.mp4", "b.AVI", "notes.txt", os.path.join("patient", "c.mov")):
+                open(os.path.join(tmp, name), "w").close()
+            found = rescore.find_recordings([tmp])
+        self.assertEqual(
+            [os.path.relpath(path, tmp) for path in found],
+            ["a.mp4", "b.AVI", os.path.join("patient", "c.mov"), os.path.join("patient", "log1")],
+        )
+
+    def test_results_round_trip(self):
+        records = [
+            {"path": "/a.mp4", "key": "a", "kind": "video", "activity": "run", "stop_reason": "stopped",
+             "error": None, "repetition_count": 2, "target_reached": False, "seconds": 1.5,
+             "rep_sparc_scores": [-3.0, -4.0], "rep_rom_scores": [90.0], "repetition_times": [2.0, 2.5]},
+            {"path": "/b.mp4", "key": "b", "kind": "video", "error": "IOError: unreadable", "seconds": 0.1},
+        ]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "results.npz")
+            rescore.write_results(records, path)
+            loaded = rescore.load_results(path)
+            with np.load(path) as data:
+                self.assertEqual(data["rep_sparc_scores_offsets"].tolist(), [0, 2, 2])
+        self.assertEqual(loaded[0]["rep_sparc_scores"], [-3.0, -4.0])
+        self.assertEqual(loaded[0]["rep_rom_scores"], [90.0])
+        self.assertIsNone(loaded[0]["error"])
+        self.assertEqual(loaded[1]["repetition_count"], -1)
+        self.assertEqual(loaded[1]["error"], "IOError: unreadable")
+        self.assertEqual(loaded[1]["repetition_times"], [])
+
+    def test_fingerprint_tracks_scoring_options_only(self):
+        options = {"activity": None, "fps": None, "classifier_stride": 1, "threads_per_worker": 1}
+        fingerprint = rescore.scoring_fingerprint(options)
+        self.assertEqual(rescore.scoring_fingerprint(dict(options, threads_per_worker=8)), fingerprint)
+        self.assertNotEqual(rescore.scoring_fingerprint(dict(options, classifier_stride=2)), fingerprint)
+        self.assertNotEqual(rescore.scoring_fingerprint(dict(options, activity="custom_elbow_flexion")), fingerprint)
+
+    def test_log_fingerprint_ignores_video_options(self):
+        # Session logs replay with their own timestamps and classifier schedule
+        options = {"activity": None, "fps": None, "classifier_stride": 1, "threads_per_worker": 1}
+        fingerprint = rescore.scoring_fingerprint(options, "log")
+        self.assertNotEqual(rescore.scoring_fingerprint(options, "video"), fingerprint)
+        self.assertEqual(rescore.scoring_fingerprint(dict(options, fps=25.0, classifier_stride=3), "log"), fingerprint)
+        self.assertNotEqual(rescore.scoring_fingerprint(dict(options, activity="run"), "log"), fingerprint)
+
+    def test_videos_need_an_activity(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            open(os.path.join(tmp, "session.mp4"), "wb").close()
+            output = os.path.join(tmp, "rescored.npz")
+            with self.assertRaises(rescore.MissingActivity):
+                rescore.rescore([tmp], output, workers=1)
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                rescore.main([tmp, "--output", output])
+            self.assertFalse(os.path.exists(output))
+
+    def test_key_includes_fingerprint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "session.mp4")
+            open(path, "wb").close()
+            self.assertNotEqual(rescore.recording_key(path, "abc"), rescore.recording_key(path, "def"))
+            self.assertTrue(rescore.recording_key(path, "abc").startswith(rescore.recording_key(path)))
+
+    def test_journal_ignores_truncated_line(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "journal.jsonl")
+            with open(path, "w") as journal:
+                journal.write(json.dumps({"key": "a", "error": None}) + "\n")
+                journal.write('{"key": "b", "err')
+            self.assertEqual(list(rescore.read_journal(path)), ["a"])
+
+    def test_rescore_session_logs_and_resume(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("first", "second"):
+                write_session_log(os.path.join(tmp, "logs", name), seconds=30)
+            output = os.path.join(tmp, "rescored.npz")
+            with contextlib.redirect_stdout(io.StringIO()):
+                stats = rescore.rescore([os.path.join(tmp, "logs")], output, workers=1)
+                self.assertEqual(stats["scored"], 2)
+                first = rescore.load_results(output)
+
+                # A second run finds everything in the journal
+                stats = rescore.rescore([os.path.join(tmp, "logs")], output, workers=1)
+                self.assertEqual(stats["scored"], 0)
+                self.assertEqual(rescore.load_results(output), first)
+
+                # Video-only options don't apply to logs; a different activity scores everything again
+                stats = rescore.rescore([os.path.join(tmp, "logs")], output, workers=1, classifier_stride=3)
+                self.assertEqual(stats["scored"], 0)
+                environ = dict(os.environ)
+                stats = rescore.rescore(
+                    [os.path.join(tmp, "logs")], output, workers=1, activity="standing_shoulder_abduction",
+                    threads_per_worker=3,
+                )
+                self.assertEqual(stats["scored"], 2)
+
+        # One worker scores in this process without changing its environment
+        self.assertEqual(dict(os.environ), environ)
+        self.assertEqual(rescore._worker, {})
+
+        self.assertEqual([record["kind"] for record in first], ["log", "log"])
+        self.assertTrue(all(record["error"] is None for record in first))
+        self.assertGreater(first[0]["repetition_count"], 0)
+        self.assertEqual(len(first[0]["rep_rom_scores"]), first[0]["repetition_count"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+"""
+Unit tests for rolling motion-projection moments
+"""
+import statistics
+import unittest
+from collections import deque
+
+import numpy as np
+
+from motion_signal import RollingMoments, get_direction
+
+
+def projections(dx, dy):
+    return dx, dy, (dx + dy) / np.sqrt(2), (dx - dy) / np.sqrt(2)
+
+
+class TestRollingMoments(unittest.TestCase):
+    """Compare against per-frame statistics.variance over deques"""
+
+    def test_variance_matches_statistics(self):
+        rng = np.random.default_rng(3)
+        moments = RollingMoments(window=100, channels=4)
+        history = [deque(maxlen=100) for _ in range(4)]
+        for dx, dy in rng.normal(0, 5, (450, 2)) + 100.0:
+            sample = projections(dx, dy)
+            moments.append(sample)
+            for channel, value in zip(history, sample):
+                channel.append(value)
+            if len(history[0]) > 3:
+                expected = [statistics.variance(channel) for channel in history]
+                np.testing.assert_allclose(moments.variance(), expected, rtol=1e-9)
+        self.assertEqual(len(moments), 100)
+
+    def test_direction_matches_get_direction(self):
+        rng = np.random.default_rng(11)
+        moments = RollingMoments(window=100, channels=4)
+        history = [deque(maxlen=100) for _ in range(4)]
+        smoothed_dx = smoothed_dy = 0.0
+        frames = np.arange(1200)
+        # Alternating horizontal / vertical / diagonal swings with EMA smoothing, as in the engine
+        raw = np.stack([
+            30 * np.sin(frames / 8.0) * (frames // 300 % 2 == 0),
+            30 * np.sin(frames / 11.0) * (frames // 200 % 2 == 1),
+        ], axis=1) + rng.normal(0, 1, (frames.size, 2))
+        for dx, dy in raw:
+            smoothed_dx = 0.1 * dx + 0.9 * smoothed_dx
+            smoothed_dy = 0.1 * dy + 0.9 * smoothed_dy
+            sample = projections(smoothed_dx, smoothed_dy)
+            moments.append(sample)
+            for channel, value in zip(history, sample):
+                channel.append(value)
+            if len(history[0]) > 3:
+                variances = [statistics.variance(channel) for channel in history]
+                expected = get_direction(np.argmax(variances), *sample)
+                self.assertEqual(moments.dominant_direction()[1], expected)
+
+    def test_constant_signal_has_zero_variance(self):
+        moments = RollingMoments(window=10, channels=4)
+        for value in np.linspace(-3, 3, 25):
+            moments.append(projections(value, 2 * value))
+        for _ in range(10):
+            moments.append(projections(0.5, 0.5))
+        np.testing.assert_allclose(moments.variance(), 0.0, atol=1e-12)
+        self.assertEqual(moments.dominant_direction(), (0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
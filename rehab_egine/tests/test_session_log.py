@@ -0,0 +1,128 @@
+"""
+Unit tests for the columnar session log and its replay through the counter
+"""
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from session_log import SessionLog, SessionLogWriter
+
+
+def write_log(path, frames, block=4, classes=("a", "b", "c")):
+    rng = np.random.default_rng(3)
+    rows = []
+    with SessionLogWriter(path, classes, frame_width=320, frame_height=240, block=block, activity="run") as writer:
+        for index in range(frames):
+            image = rng.uniform(size=(33, 4)) if index % 5 else None
+            world = rng.normal(size=(33, 4)) if index % 5 else None
+            scores = rng.uniform(size=len(classes)) if index >= 2 else None
+            writer.append(1000.0 + index / 30.0, image, world, scores)
+            rows.append((1000.0 + index / 30.0, image, world, scores))
+    return rows
+
+
+class TestSessionLog(unittest.TestCase):
+    """Round trip, partial logs and empty logs"""
+
+    def test_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            rows = write_log(tmp, 11)
+            log = SessionLog(tmp)
+            self.assertEqual(len(log), 11)
+            self.assertEqual(log.meta["activity"], "run")
+            self.assertEqual((log.frame_width, log.frame_height), (320, 240))
+            self.assertIsInstance(log.image_landmarks, np.memmap)
+            self.assertEqual(log.class_scores.shape, (11, 3))
+            for index, (timestamp, image, world, scores) in enumerate(rows):
+                got = log.frame(index)
+                self.assertEqual(got[0], timestamp)
+                for expected, actual in zip((image, world, scores), got[1:]):
+                    if expected is None:
+                        self.assertIsNone(actual)
+                    else:
+                        np.testing.assert_allclose(actual, expected, rtol=1e-6)
+            self.assertEqual(log.frame(3)[1].dtype, np.float64)
+            del log
+
+    def test_unclosed_log_reads_complete_rows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = SessionLogWriter(tmp, ["a", "b"], block=4)
+            for index in range(10):
+                writer.append(float(index), np.zeros((33, 4)), np.ones((33, 4)), [0.2, 0.8])
+            # Two blocks reached disk; the last two rows are still buffered
+            log = SessionLog(tmp)
+            self.assertEqual(len(log), 8)
+            np.testing.assert_array_equal(log.timestamps, np.arange(8.0))
+            del log
+            writer.close()
+            with open(os.path.join(tmp, "meta.json")) as meta_file:
+                self.assertEqual(json.load(meta_file)["frames"], 10)
+
+    def test_empty_log(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            SessionLogWriter(tmp, ["a"]).close()
+            log = SessionLog(tmp)
+            self.assertEqual(len(log), 0)
+            self.assertEqual(log.world_landmarks.shape, (0, 33, 4))
+
+    def test_classifier_windows(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            rows = write_log(tmp, 25)
+            windows = SessionLog(tmp).classifier_windows(size=4)
+        # Frames without a skeleton add no row, like in the counter
+        detected = [world for _, image, world, _ in rows if image is not None]
+        self.assertEqual(windows.shape, (len(detected) - 3, 4, 132))
+        np.testing.assert_allclose(windows[2, 1], detected[3].ravel(), rtol=1e-6)
+
+    def test_rejects_unknown_version(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            SessionLogWriter(tmp, ["a"]).close()
+            meta_path = os.path.join(tmp, "meta.json")
+            with open(meta_path) as meta_file:
+                meta = json.load(meta_file)
+            meta["version"] = 99
+            with open(meta_path, "w") as meta_file:
+                json.dump(meta, meta_file)
+            with self.assertRaises(ValueError):
+                SessionLog(tmp)
+
+
+class TestReplaySessionLog(unittest.TestCase):
+    """A logged session replays to the same counts without the model"""
+
+    def test_replay_matches_live_session(self):
+        import engine
+        from synthetic_session import synthetic_base, synthetic_landmarks
+
+        fps = 30.0
+        rng = np.random.default_rng(7)
+        base = synthetic_base(rng)
+        scores = np.eye(len(engine.classifierClasses))[engine.activitiesName.index("standing_shoulder_abduction")]
+
+        def fixed_scores(window):
+            return scores
+
+        activity = "standing_shoulder_abduction"
+        live = engine.ExerciseCounter(activity, classifier_stride=3, predict=fixed_scores)
+        with tempfile.TemporaryDirectory() as tmp:
+            writer = engine.open_session_log(tmp, live, (480, 640, 3))
+            for index in range(int(40 * fps)):
+                image, world = synthetic_landmarks(index, fps, rng, base)
+                live.process_frame(index / fps, image, world)
+                writer.append(index / fps, image, world, live.class_scores)
+            writer.close()
+            live.close()
+
+            replayed = engine.replay_session_log(tmp)
+
+        expected = live.summary()
+        self.assertGreater(expected["repetition_count"], 0)
+        self.assertEqual(replayed["repetition_count"], expected["repetition_count"])
+        np.testing.assert_allclose(replayed["rep_rom_scores"], expected["rep_rom_scores"], atol=1e-3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Unit tests for the rehab engine session manager
+"""
+import threading
+import unittest
+
+from session_manager import SessionError, SessionManager
+
+
+def blocking_runner(session):
+    """Runs until the session is stopped, like process_video"""
+    session.stop_event.wait(5)
+    return {
+        "repetition_count": 3,
+        "stop_reason": "manual_stop",
+        "rep_sparc_scores": [-1.5],
+        "rep_rom_scores": [90.0],
+        "repetition_times": [2.0],
+    }
+
+
+class TestSessionManager(unittest.TestCase):
+    """Test session scheduling, limits and results"""
+
+    def setUp(self):
+        self.manager = SessionManager(blocking_runner, max_sessions=2)
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_sessions_are_independent(self):
+        first = self.manager.start("squats", source="a.mp4")
+        second = self.manager.start("run", source="b.mp4")
+        self.assertNotEqual(first.session_id, second.session_id)
+
+        stopped = self.manager.stop(first.session_id)
+        status = stopped.snapshot()
+        self.assertFalse(status["is_running"])
+        self.assertEqual(status["current_reps"], 3)
+        self.assertEqual(status["rep_rom_scores"], [90.0])
+        self.assertTrue(self.manager.get(second.session_id).snapshot()["is_running"])
+
+    def test_capacity_limit(self):
+        self.manager.start("squats", source="a.mp4")
+        self.manager.start("squats", source="b.mp4")
+        with self.assertRaises(SessionError) as ctx:
+            self.manager.start("squats", source="c.mp4")
+        self.assertEqual(ctx.exception.status_code, 503)
+
+    def test_single_camera_session(self):
+        self.manager.start("squats")
+        with self.assertRaises(SessionError) as ctx:
+            self.manager.start("run")
+        self.assertEqual(ctx.exception.status_code, 409)
+        self.assertEqual(ctx.exception.details["current_activity"], "squats")
+
+    def test_default_session_is_latest(self):
+        self.manager.start("squats", source="a.mp4")
+        latest = self.manager.start("run", source="b.mp4")
+        self.assertIs(self.manager.get(), latest)
+        self.assertIs(self.manager.stop(), latest)
+
+    def test_push_session_runs_beside_camera(self):
+        self.manager.start("squats")
+        pushed = self.manager.start(
+            "run", input_mode="push", prepare=lambda s: setattr(s, "ingestor", "attached")
+        )
+        self.assertEqual(pushed.ingestor, "attached")
+        self.assertFalse(pushed.uses_camera)
+
+        pushed.update_progress({"repetition_count": 2, "repetition_times": [1.0, 1.2]})
+        status = pushed.snapshot()
+        self.assertTrue(status["is_running"])
+        self.assertEqual(status["input_mode"], "push")
+        self.assertEqual(status["current_reps"], 2)
+
+    def test_slow_stop_keeps_camera_busy(self):
+        release = threading.Event()
+
+        def slow_runner(session):
+            # Ignores the stop request until released, like a camera read that hangs
+            release.wait(5)
+            return {"repetition_count": 1}
+
+        manager = SessionManager(slow_runner, max_sessions=2)
+        session = manager.start("squats")
+        manager.stop(session.session_id, timeout=0.05)
+        status = session.snapshot()
+        self.assertTrue(status["is_running"])
+        self.assertTrue(status["stopping"])
+        with self.assertRaises(SessionError) as ctx:
+            manager.start("run")
+        self.assertEqual(ctx.exception.message, "Engine is still stopping")
+
+        release.set()
+        session.future.result(timeout=2)
+        status = session.snapshot()
+        self.assertFalse(status["is_running"])
+        self.assertFalse(status["stopping"])
+        self.assertEqual(status["stop_reason"], "manual_stop")
+        self.assertEqual(status["current_reps"], 1)
+        manager.start("run")
+        manager.shutdown()
+
+    def test_stop_when_not_running(self):
+        with self.assertRaises(SessionError):
+            self.manager.stop()
+
+    def test_runner_error_is_recorded(self):
+        done = threading.Event()
+
+        def failing_runner(session):
+            try:
+                raise RuntimeError("camera unavailable")
+            finally:
+                done.set()
+
+        manager = SessionManager(failing_runner, max_sessions=1)
+        session = manager.start("squats")
+        done.wait(2)
+        session.future.result(timeout=2)
+        self.assertEqual(session.snapshot()["stop_reason"], "error")
+        self.assertFalse(session.snapshot()["is_running"])
+        manager.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
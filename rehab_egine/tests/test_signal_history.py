@@ -0,0 +1,61 @@
+"""
+Unit tests for the bounded per-frame signal history
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from motion_signal import SignalHistory
+
+
+class TestSignalHistory(unittest.TestCase):
+    """Ring retention, unbounded mode and spilling to disk"""
+
+    def test_ring_keeps_latest_samples(self):
+        history = SignalHistory(limit=5)
+        for value in range(3):
+            history.append(value)
+        np.testing.assert_array_equal(history.recent(), [0, 1, 2])
+        for value in range(3, 12):
+            history.append(value)
+        self.assertEqual(len(history), 12)
+        np.testing.assert_array_equal(history.recent(), [7, 8, 9, 10, 11])
+        np.testing.assert_array_equal(history.to_array(), [7, 8, 9, 10, 11])
+
+    def test_unbounded_keeps_everything(self):
+        history = SignalHistory(limit=None)
+        values = np.random.default_rng(0).normal(size=500)
+        for value in values:
+            history.append(value)
+        np.testing.assert_array_equal(history.to_array(), values)
+
+    def test_spill_recovers_whole_session(self):
+        values = np.random.default_rng(1).normal(size=1000)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "motion.f64")
+            history = SignalHistory(limit=64, spill_path=path, spill_block=100)
+            for value in values[:550]:
+                history.append(value)
+            # Partial blocks are flushed on read
+            np.testing.assert_array_equal(history.to_array(), values[:550])
+            for value in values[550:]:
+                history.append(value)
+            history.close()
+            np.testing.assert_array_equal(history.recent(), values[-64:])
+            spilled = history.to_array()
+            np.testing.assert_array_equal(spilled, values)
+            self.assertEqual(os.path.getsize(path), values.size * 8)
+            del spilled
+
+    def test_empty(self):
+        self.assertEqual(SignalHistory(limit=10).recent().size, 0)
+        with tempfile.TemporaryDirectory() as tmp:
+            history = SignalHistory(limit=10, spill_path=os.path.join(tmp, "empty.f64"))
+            self.assertEqual(history.to_array().size, 0)
+            history.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
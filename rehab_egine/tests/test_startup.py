@@ -0,0 +1,37 @@
+"""
+Unit tests for deferred imports at engine startup
+"""
+import sys
+import unittest
+
+from bench_startup import measure_startup
+from lazy_import import LazyModule
+
+
+class TestLazyModule(unittest.TestCase):
+    """The proxy imports on first attribute access"""
+
+    def test_imports_on_first_access(self):
+        module = LazyModule("json")
+        self.assertFalse(module.is_loaded)
+        self.assertEqual(module.dumps([1]), "[1]")
+        self.assertTrue(module.is_loaded)
+        self.assertIs(module.loads, sys.modules["json"].loads)
+
+    def test_missing_module_raises_on_access(self):
+        module = LazyModule("no_such_module_for_rehab_tests")
+        with self.assertRaises(ImportError):
+            module.anything
+
+
+class TestEngineImport(unittest.TestCase):
+    """Importing the API must not pull in TensorFlow, MediaPipe or plotting libraries"""
+
+    def test_engine_api_import_is_light(self):
+        result = measure_startup(load_model=False)
+        self.assertEqual(result["heavy_modules"], [])
+        self.assertIsNone(result["model_seconds"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+"""
+Unit tests for the background video recorder
+"""
+import os
+import tempfile
+import threading
+import unittest
+
+import numpy as np
+
+from video_recorder import VideoRecorder, load_landmark_sidecar
+
+
+class FakeWriter:
+    def __init__(self, path, fps, frame_size, gate=None):
+        self.path = path
+        self.fps = fps
+        self.frame_size = frame_size
+        self.frames = []
+        self.released = False
+        self.gate = gate
+
+    def write(self, frame):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.frames.append(int(frame[0, 0, 0]))
+
+    def release(self):
+        self.released = True
+
+
+def frame(value, height=4, width=6):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+class TestVideoRecorder(unittest.TestCase):
+    """Frame-rate measurement, timestamp placement and back-pressure"""
+
+    def setUp(self):
+        self.writers = []
+
+    def factory(self, path, fps, frame_size):
+        writer = FakeWriter(path, fps, frame_size)
+        self.writers.append(writer)
+        return writer
+
+    def test_writes_at_measured_fps(self):
+        recorder = VideoRecorder("session.mp4", max_queue=64, probe_seconds=1.0, writer_factory=self.factory).start()
+        for index in range(40):
+            recorder.submit(frame(index % 250), 100.0 + index / 20.0)
+        stats = recorder.close()
+        writer = self.writers[0]
+        self.assertAlmostEqual(writer.fps, 20.0)
+        self.assertEqual(writer.frame_size, (6, 4))
+        self.assertEqual(writer.frames, list(range(40)))
+        self.assertTrue(writer.released)
+        self.assertEqual(stats["written"], 40)
+        self.assertEqual(stats["repeated"], 0)
+
+    def test_gaps_are_filled_and_bursts_skipped(self):
+        recorder = VideoRecorder("session.mp4", probe_seconds=0.3, writer_factory=self.factory).start()
+        # 10 fps probe, then a 0.3 s gap and two frames arriving at once
+        times = [0.0, 0.1, 0.2, 0.3, 0.6, 0.62, 0.7]
+        for index, timestamp in enumerate(times):
+            recorder.submit(frame(index), timestamp)
+        stats = recorder.close()
+        self.assertAlmostEqual(stats["fps"], 10.0)
+        self.assertEqual(self.writers[0].frames, [0, 1, 2, 3, 3, 3, 4, 6])
+        self.assertEqual(stats["repeated"], 2)
+        self.assertEqual(stats["skipped"], 1)
+
+    def test_short_recording_uses_fallback_fps(self):
+        recorder = VideoRecorder("session.mp4", fallback_fps=8.0, writer_factory=self.factory).start()
+        recorder.submit(frame(1), 5.0)
+        stats = recorder.close()
+        self.assertEqual(stats["fps"], 8.0)
+        self.assertEqual(self.writers[0].frames, [1])
+
+    def test_slow_writer_drops_instead_of_blocking(self):
+        gate = threading.Event()
+        writers = []
+
+        def slow_factory(path, fps, frame_size):
+            writers.append(FakeWriter(path, fps, frame_size, gate=gate))
+            return writers[-1]
+
+        recorder = VideoRecorder("session.mp4", max_queue=4, probe_seconds=0.0, fallback_fps=30.0,
+                                 writer_factory=slow_factory).start()
+        for index in range(50):
+            recorder.submit(frame(index), index / 30.0)
+        self.assertGreater(recorder.dropped, 0)
+        gate.set()
+        stats = recorder.close()
+        self.assertEqual(stats["submitted"], 50)
+        # The newest frame always reaches the file
+        self.assertEqual(writers[0].frames[-1], 49)
+
+    def test_copy_protects_reused_buffers(self):
+        recorder = VideoRecorder("session.mp4", probe_seconds=10.0, writer_factory=self.factory).start()
+        shared = frame(1)
+        recorder.submit(shared, 0.0, copy=True)
+        shared[:] = 2
+        recorder.submit(shared, 0.5, copy=True)
+        recorder.close()
+        self.assertEqual(self.writers[0].frames[0], 1)
+
+    def test_raw_mode_writes_landmark_sidecar(self):
+        rng = np.random.default_rng(0)
+        image = rng.uniform(size=(33, 4))
+        world = rng.normal(size=(33, 4))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "session.mp4")
+            recorder = VideoRecorder(path, mode="raw", writer_factory=self.factory).start()
+            recorder.submit(frame(1), 10.0, image, world)
+            recorder.submit(frame(2), 10.5, None, None)
+            recorder.close()
+            seconds, image_landmarks, world_landmarks = load_landmark_sidecar(recorder.sidecar_path)
+        np.testing.assert_allclose(seconds, [0.0, 0.5])
+        np.testing.assert_allclose(image_landmarks[0], image, rtol=1e-6)
+        np.testing.assert_allclose(world_landmarks[0], world, rtol=1e-6)
+        self.assertTrue(np.isnan(image_landmarks[1]).all())
+
+    def test_sidecar_keeps_landmarks_of_dropped_frames(self):
+        gate = threading.Event()
+        writers = []
+
+        def slow_factory(path, fps, frame_size):
+            writers.append(FakeWriter(path, fps, frame_size, gate=gate))
+            return writers[-1]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "session.mp4")
+            recorder = VideoRecorder(path, mode="raw", max_queue=2, probe_seconds=0.0, fallback_fps=10.0,
+                                     writer_factory=slow_factory).start()
+            for index in range(20):
+                recorder.submit(frame(index), 3.0 + index / 10.0, np.full((33, 4), index), None)
+            self.assertGreater(recorder.dropped, 0)
+            gate.set()
+            recorder.close()
+            seconds, image_landmarks, _ = load_landmark_sidecar(recorder.sidecar_path)
+        np.testing.assert_allclose(seconds, np.arange(20) / 10.0, atol=1e-5)
+        np.testing.assert_array_equal(image_landmarks[:, 0, 0], np.arange(20))
+        # Video slots are on the same clock: the last frame lands in the last row's slot
+        self.assertEqual(len(writers[0].frames), 20)
+        self.assertEqual(writers[0].frames[-1], 19)
+
+    def test_close_timeout_leaves_finalizing_to_the_writer(self):
+        gate = threading.Event()
+        writers = []
+
+        def slow_factory(path, fps, frame_size):
+            writers.append(FakeWriter(path, fps, frame_size, gate=gate))
+            return writers[-1]
+
+        recorder = VideoRecorder("session.mp4", max_queue=2, probe_seconds=0.0, fallback_fps=10.0,
+                                 writer_factory=slow_factory).start()
+        thread = recorder._thread
+        for index in range(5):
+            recorder.submit(frame(index), index / 10.0)
+        recorder.close(timeout=0.1)
+        self.assertTrue(thread.is_alive())
+        self.assertFalse(writers[0].released)
+        recorder.submit(frame(9), 1.0)
+        gate.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertTrue(writers[0].released)
+        self.assertNotIn(9, writers[0].frames)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            VideoRecorder("session.mp4", mode="overlay")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,229 @@
+import queue
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from pipeline import END, StageQueue
+from pose_features import LANDMARK_DIMS, NUM_LANDMARKS
+
+RECORD_MODES = ("composite", "raw")
+
+# One sidecar row: seconds since the first frame, then image and world landmarks
+SIDECAR_COLUMNS = 1 + 2 * NUM_LANDMARKS * LANDMARK_DIMS
+
+
+def mp4_writer(path, fps, frame_size):
+    """Default writer: an mp4v cv2.VideoWriter."""
+    return cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'mp4v'), fps, frame_size)
+
+
+def sidecar_row(elapsed, image_landmarks, world_landmarks):
+    """Pack one frame's landmarks into a float32 sidecar row; missing landmarks are NaN."""
+    row = np.full(SIDECAR_COLUMNS, np.nan, dtype=np.float32)
+    row[0] = elapsed
+    block = NUM_LANDMARKS * LANDMARK_DIMS
+    if image_landmarks is not None:
+        row[1:1 + block] = np.asarray(image_landmarks, dtype=np.float32).ravel()[:block]
+    if world_landmarks is not None:
+        row[1 + block:] = np.asarray(world_landmarks, dtype=np.float32).ravel()[:block]
+    return row
+
+
+def load_landmark_sidecar(path):
+    """Read a landmark sidecar back as ``(seconds, image_landmarks, world_landmarks)``; the landmarks are (N, 33, 4)."""
+    rows = np.fromfile(path, dtype=np.float32).reshape(-1, SIDECAR_COLUMNS)
+    block = NUM_LANDMARKS * LANDMARK_DIMS
+    shape = (-1, NUM_LANDMARKS, LANDMARK_DIMS)
+    return rows[:, 0], rows[:, 1:1 + block].reshape(shape), rows[:, 1 + block:].reshape(shape)
+
+
+class VideoRecorder:
+    """
+    Records session video on a writer thread, off the engine's hot loop.
+
+    ``submit`` timestamps a frame and hands it over through a bounded queue
+    without blocking; when the writer falls behind the oldest queued frame is
+    dropped. The first ``probe_seconds`` of frames measure the real frame rate
+    and the file is opened at that rate. After that each frame is placed by
+    its timestamp: the previous frame is held over a gap left by dropped
+    frames and a frame is skipped when frames arrive faster than the file's
+    rate, so the video plays back at real speed.
+
+    In "raw" mode the caller submits the unannotated camera frame with its
+    landmarks, which go to a float32 sidecar next to the video
+    (``<path>.landmarks.f32``, see ``load_landmark_sidecar``) so overlays can
+    be redrawn later. "composite" records the frame as shown on screen.
+    Sidecar rows are written by ``submit`` itself, so every submitted frame
+    keeps its landmarks even when its image is dropped; rows and video share
+    the first submitted frame as time zero.
+
+    Args:
+        path (str): Output video path.
+        mode (str): "composite" or "raw".
+        max_queue (int): Frames buffered for the writer thread.
+        probe_seconds (float): How long to measure the frame rate before opening the file.
+        fallback_fps (float): Rate used when too few frames arrived to measure one.
+        fps_range (tuple): Bounds for the measured rate.
+        writer_factory (callable): ``writer_factory(path, fps, (width, height))``
+            returning an object with ``write(frame)`` and ``release()``.
+    """
+
+    def __init__(self, path, mode="composite", max_queue=32, probe_seconds=1.0, fallback_fps=8.0,
+                 fps_range=(1.0, 60.0), writer_factory=mp4_writer):
+        if mode not in RECORD_MODES:
+            raise ValueError(f"Unknown record mode '{mode}'. Options: {', '.join(RECORD_MODES)}")
+        self.path = path
+        self.mode = mode
+        self.sidecar_path = path + ".landmarks.f32" if mode == "raw" else None
+        self.probe_seconds = probe_seconds
+        self.fallback_fps = fallback_fps
+        self.fps_range = fps_range
+        self.writer_factory = writer_factory
+        self.fps = None
+        self.submitted = 0
+        self.written = 0
+        self.repeated = 0
+        self.skipped = 0
+        self.error = None
+        self._queue = StageQueue("recorder", maxsize=max_queue, drop_stale=True)
+        self._halt = threading.Event()
+        self._thread = None
+        self._writer = None
+        self._sidecar = None
+        self._origin = None
+        self._probe = []
+        self._last_frame = None
+
+    def start(self):
+        if self._thread is None:
+            if self.sidecar_path is not None:
+                self._sidecar = open(self.sidecar_path, "wb")
+            self._thread = threading.Thread(target=self._run, name="rehab-recorder", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, frame, timestamp=None, image_landmarks=None, world_landmarks=None, copy=False):
+        """Queue one frame for writing; never blocks. ``copy`` if the caller keeps drawing on ``frame``."""
+        if self._thread is None or self._halt.is_set():
+            return
+        if timestamp is None:
+            timestamp = time.time()
+        if self._origin is None:
+            self._origin = timestamp
+        elapsed = timestamp - self._origin
+        self.submitted += 1
+        if self._sidecar is not None:
+            self._sidecar.write(sidecar_row(elapsed, image_landmarks, world_landmarks).tobytes())
+        self._queue.put((elapsed, frame.copy() if copy else frame))
+
+    @property
+    def dropped(self):
+        return self._queue.dropped
+
+    def _run(self):
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=0.1)
+                except queue.Empty:
+                    # close() gave up on queueing the end marker; everything queued has been written
+                    if self._halt.is_set():
+                        break
+                    continue
+                if item is END:
+                    break
+                self._accept(*item)
+            if self._writer is None and self._probe:
+                self._open(self._measure_fps())
+        except Exception as exc:
+            print(f"[Recorder] Writer failed: {exc}")
+            self.error = exc
+            self._halt.set()
+        finally:
+            # Finalized here, not in close(), so a close() that times out never races the last writes
+            if self._writer is not None:
+                self._writer.release()
+                self._writer = None
+                self._last_frame = None
+
+    def _accept(self, elapsed, frame):
+        if self._writer is not None:
+            self._place(elapsed, frame)
+            return
+        self._probe.append((elapsed, frame))
+        if elapsed >= self.probe_seconds:
+            self._open(self._measure_fps())
+
+    def _measure_fps(self):
+        span = self._probe[-1][0] - self._probe[0][0]
+        if len(self._probe) < 2 or span <= 0:
+            return self.fallback_fps
+        low, high = self.fps_range
+        return float(min(max((len(self._probe) - 1) / span, low), high))
+
+    def _open(self, fps):
+        height, width = self._probe[0][1].shape[:2]
+        self.fps = fps
+        self._writer = self.writer_factory(self.path, fps, (width, height))
+        print(f"[Recorder] Writing {self.mode} video at {fps:.1f} fps to {self.path}")
+        probe, self._probe = self._probe, []
+        for elapsed, frame in probe:
+            self._place(elapsed, frame)
+
+    def _place(self, elapsed, frame):
+        """Write ``frame`` at the output slot its timestamp falls in, holding the previous frame over any gap."""
+        slot = int(round(elapsed * self.fps))
+        if slot < self.written:
+            self.skipped += 1
+            return
+        if self._last_frame is None:
+            # The first submitted frame was dropped: hold the first written one back to time zero
+            self._last_frame = frame
+        while self.written < slot:
+            self._writer.write(self._last_frame)
+            self.written += 1
+            self.repeated += 1
+        self._writer.write(frame)
+        self.written += 1
+        self._last_frame = frame
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "fps": self.fps,
+            "submitted": self.submitted,
+            "dropped": self.dropped,
+            "written": self.written,
+            "repeated": self.repeated,
+            "skipped": self.skipped,
+        }
+
+    def close(self, timeout=10.0):
+        """Flush queued frames, finalize the file and return the recording stats."""
+        if self._thread is None:
+            return self.stats()
+        thread, self._thread = self._thread, None
+        if self._sidecar is not None:
+            self._sidecar.close()
+            self._sidecar = None
+        # Stop waiting for room for the end marker once the timeout is up; the thread then ends on an empty queue
+        give_up = threading.Timer(timeout, self._halt.set)
+        give_up.start()
+        deadline = time.monotonic() + timeout
+        self._queue.put(END, self._halt)
+        thread.join(max(deadline - time.monotonic(), 0.0))
+        give_up.cancel()
+        if thread.is_alive():
+            print(f"[Recorder] Still writing after {timeout:.0f}s; the writer thread will finalize {self.path}")
+        self._halt.set()
+        stats = self.stats()
+        print(f"[Recorder] {stats}")
+        return stats
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()